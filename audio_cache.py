@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Iterable, Iterator, Optional
+
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", ".audio_cache")
+AUDIO_CACHE_MAX_MB = float(os.getenv("AUDIO_CACHE_MAX_MB", "200"))
+
+
+def audio_key(text: str, voice_id: str, model_id: str, output_format: str = "mp3") -> str:
+    """Content address of a synthesized clip: the same text, voice, model and format always give the same key."""
+    payload = json.dumps([text, voice_id, model_id, output_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Synthesized speech on local disk, one file per key, capped at max_bytes.
+
+    Reads refresh the file's mtime, and once the directory grows past the cap
+    the least recently used clips are removed. Files are written under a
+    temporary name and renamed when complete, so readers in other processes
+    never see a partial clip.
+    """
+
+    def __init__(self, directory: str = AUDIO_CACHE_DIR, max_bytes: int = int(AUDIO_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.audio")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        self._commit(key, [data])
+
+    def tee(self, key: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass chunks through to the caller and store the clip once the stream has been fully read."""
+        received = []
+        for chunk in chunks:
+            received.append(chunk)
+            yield chunk
+        self._commit(key, received)
+
+    def _commit(self, key: str, chunks):
+        tmp = os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".audio"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".audio"))
@@ -0,0 +1,142 @@
+import os
+import threading
+from concurrent.futures import Future
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import tracing
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+
+
+class BackendError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class HttpBackend:
+    """Talks to server.py over one pooled keep-alive session.
+
+    Reads are retried with exponential backoff on connection errors and 5xx;
+    order execution is not, since it is not idempotent.
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL, timeout: float = 5.0, retries: int = 3,
+                 backoff: float = 0.2, pool_size: int = 32):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET"}))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @tracing.traced("http.inventory")
+    def get_inventory(self, product_id: str) -> Optional[dict]:
+        res = self.session.get(f"{self.base_url}/inventory", params={"product_id": product_id}, timeout=self.timeout)
+        if res.status_code != 200:
+            return None
+        return res.json()
+
+    @tracing.traced("http.predictions")
+    def get_predictions(self, patient_id: str) -> List[dict]:
+        res = self.session.get(f"{self.base_url}/patient/{patient_id}/predictions", timeout=self.timeout)
+        res.raise_for_status()
+        return res.json()
+
+    @tracing.traced("http.execute_order")
+    def execute_order(self, patient_id: str, product_id: str, quantity: int) -> dict:
+        payload = {"patient_id": patient_id, "product_id": product_id, "quantity": quantity}
+        res = self.session.post(f"{self.base_url}/order/execute", json=payload, timeout=self.timeout)
+        if res.status_code != 200:
+            raise BackendError(res.status_code, res.json().get('detail'))
+        return res.json()
+
+
+class InProcessBackend:
+    """Calls the server.py storage functions directly, skipping the HTTP hop.
+
+    server.py passes its own module: when it runs as a script, `import server`
+    would load a second copy with its own inventory cache, pools and outbox.
+    """
+
+    def __init__(self, server=None):
+        if server is None:
+            import server
+        self.server = server
+
+    def get_inventory(self, product_id: str) -> Optional[dict]:
+        return self.server.get_inventory_item(product_id)
+
+    def get_predictions(self, patient_id: str) -> List[dict]:
+        return self.server.get_patient_predictions(patient_id)
+
+    def execute_order(self, patient_id: str, product_id: str, quantity: int) -> dict:
+        from fastapi import HTTPException
+        try:
+            return self.server.place_order(patient_id, product_id, quantity)
+        except HTTPException as e:
+            raise BackendError(e.status_code, e.detail)
+
+
+class MemoizedBackend:
+    """Per-batch wrapper: each inventory and predictions lookup hits the backend once.
+
+    Concurrent lookups of the same key wait for the first one. Failed lookups
+    are not remembered. Stock levels may be stale within the batch; the atomic
+    decrement in execute_order (never memoized) is what guards against overselling.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def _memo(self, key, fn):
+        with self._lock:
+            future = self._results.get(key)
+            leader = future is None
+            if leader:
+                future = self._results[key] = Future()
+        if leader:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                with self._lock:
+                    del self._results[key]
+                future.set_exception(e)
+        return future.result()
+
+    def get_inventory(self, product_id: str) -> Optional[dict]:
+        return self._memo(("inventory", product_id), lambda: self.backend.get_inventory(product_id))
+
+    def get_predictions(self, patient_id: str) -> List[dict]:
+        return self._memo(("predictions", patient_id), lambda: self.backend.get_predictions(patient_id))
+
+    def execute_order(self, patient_id: str, product_id: str, quantity: int) -> dict:
+        return self.backend.execute_order(patient_id, product_id, quantity)
+
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def get_backend(mode: str = None):
+    """Shared client for the mode in BACKEND_MODE ('http' or 'inprocess')."""
+    mode = mode or os.getenv("BACKEND_MODE", "http")
+    if mode not in _backends:
+        with _lock:
+            if mode not in _backends:
+                if mode == "inprocess":
+                    _backends[mode] = InProcessBackend()
+                elif mode == "http":
+                    _backends[mode] = HttpBackend()
+                else:
+                    raise ValueError(f"Unknown BACKEND_MODE: {mode}")
+    return _backends[mode]
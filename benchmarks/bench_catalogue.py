@@ -0,0 +1,128 @@
+"""Binary mapped catalogue vs. the JSON artifact and vs. parsing the spreadsheet with pandas.
+
+For a synthetic catalogue: time to open, time per name lookup, time to list all
+names, and the private (unshared) memory a worker holds after opening it and
+looking up every product. Mapped pages are shared between workers, so they do
+not count towards a worker's private memory.
+
+    python -m benchmarks.bench_catalogue [--products 100000] [--excel-rows 20000]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import catalogue
+from benchmarks import synthetic
+
+# Runs in a fresh interpreter; prints private kB after loading and reading every product
+MEMORY_PROBE = """
+import json, sys
+import catalogue
+
+def private_kb():
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            return sum(int(line.split()[1]) for line in f if line.startswith(("Private_Clean", "Private_Dirty")))
+    except OSError:
+        return 0
+
+kind, path = sys.argv[1], sys.argv[2]
+before = private_kb()
+if kind == "json":
+    with open(path) as f:
+        data = json.load(f)
+    index = {record["name"]: record for record in data["records"]}
+    touched = [index[record["name"]]["stock_level"] for record in data["records"]]
+else:
+    loaded = catalogue.Catalogue(path)
+    touched = [loaded.get(name)["stock_level"] for name in loaded.names()]
+print(private_kb() - before)
+"""
+
+
+def make_records(n: int) -> list:
+    products = synthetic.make_products(n)
+    return [{
+        "name": row.name, "pzn": row.pzn, "price": float(row.price), "package_size": str(row.package_size),
+        "listed": True, "in_inventory": True, "prescription_required": row.prescription_required,
+        "stock_level": int(row.stock_level),
+    } for row in products.itertuples()]
+
+
+def best_ms(fn, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def private_kb(kind: str, path: str) -> int:
+    result = subprocess.run([sys.executable, "-c", MEMORY_PROBE, kind, path], capture_output=True, text=True, check=True)
+    return int(result.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--excel-rows", type=int, default=20_000, help="rows in the pandas comparison (0 skips it)")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    records = make_records(args.products)
+    data = {"format": catalogue.FORMAT_VERSION, "version": "0" * 16, "sources": [], "records": records}
+    names = [record["name"] for record in records]
+    queries = random.Random(5).choices(names, k=args.lookups)
+
+    with tempfile.TemporaryDirectory() as directory:
+        binary_path = os.path.join(directory, "catalogue.bin")
+        json_path = os.path.join(directory, "catalogue.json")
+        catalogue.write(data, binary_path)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+        def load_json():
+            with open(json_path, encoding="utf-8") as f:
+                loaded = json.load(f)
+            return {record["name"]: record for record in loaded["records"]}
+
+        index = load_json()
+        mapped = catalogue.Catalogue(binary_path)
+        rows = [
+            ("json", os.path.getsize(json_path), best_ms(load_json),
+             best_ms(lambda: [dict(index[q]) for q in queries], 3), best_ms(lambda: list(index), 3),
+             private_kb("json", json_path)),
+            ("binary", os.path.getsize(binary_path), best_ms(lambda: catalogue.Catalogue(binary_path)),
+             best_ms(lambda: [mapped.get(q) for q in queries], 3), best_ms(mapped.names, 3),
+             private_kb("binary", binary_path)),
+        ]
+
+        print(f"{args.products} products, {args.lookups} lookups")
+        print(f"{'format':>8} {'file MB':>8} {'open ms':>9} {'lookup us':>10} {'names ms':>9} {'private MB':>11}")
+        for kind, size, open_ms, lookup_ms, names_ms, kb in rows:
+            print(f"{kind:>8} {size / 1e6:>8.1f} {open_ms:>9.2f} {lookup_ms * 1000 / args.lookups:>10.2f} "
+                  f"{names_ms:>9.1f} {kb / 1024:>11.1f}")
+
+        if args.excel_rows:
+            import pandas as pd
+            from openpyxl import Workbook
+
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            sheet.append(["product id", "product name", "pzn", "price rec", "package size", "descriptions"])
+            for i, record in enumerate(records[:args.excel_rows]):
+                sheet.append([i, record["name"], record["pzn"], record["price"], record["package_size"], ""])
+            excel_path = os.path.join(directory, "products-export.xlsx")
+            workbook.save(excel_path)
+            print(f"pd.read_excel of {args.excel_rows} products (what each entry point used to do): "
+                  f"{best_ms(lambda: pd.read_excel(excel_path), 1):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
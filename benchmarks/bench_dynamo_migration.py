@@ -0,0 +1,72 @@
+"""Items/s of the PatientState backfill: sequential put_item vs. parallel batch writes.
+
+DynamoDB is moto's in-process stand-in with a fixed round trip added to every
+request (a botocore hook sleeps before signing), so batching and parallelism
+are measured against a network-like cost rather than moto's own CPU time.
+
+    python -m benchmarks.bench_dynamo_migration [--items 5000] [--latency-ms 15] [--workers 1 8 16]
+"""
+import argparse
+import tempfile
+import time
+
+import migrate_to_dynamo
+from benchmarks.moto_aws import create_table, mocked_aws
+from migrate_to_dynamo import convert_decimal, write_items
+
+
+def make_patients(n: int):
+    return [{
+        'patient_id': f"PAT{i:07d}",
+        'orders': [{'product_name': 'NORSAN Omega-3 Total', 'purchase_date': '2024-03-14 00:00:00', 'quantity': 2, 'dosage_frequency': 'Once daily'}],
+        'refill_predictions': [{'product_name': 'NORSAN Omega-3 Total', 'predicted_date': '2024-04-12', 'action': 'Alert in 4 days'}],
+    } for i in range(n)]
+
+
+def latency_resource_factory(latency: float):
+    def factory():
+        resource = migrate_to_dynamo.dynamodb_resource()
+        resource.meta.client.meta.events.register('before-sign.dynamodb.*', lambda **kwargs: time.sleep(latency))
+        return resource
+    return factory
+
+
+def recreate_table(dynamodb):
+    if 'PatientState' in dynamodb.meta.client.list_tables()['TableNames']:
+        dynamodb.Table('PatientState').delete()
+    create_table(dynamodb, 'PatientState', 'patient_id')
+
+
+def sequential(items, factory) -> float:
+    """The previous migrate_patients loop: one put_item per item on one thread."""
+    table = factory().Table('PatientState')
+    start = time.perf_counter()
+    for item in items:
+        table.put_item(Item=convert_decimal(item))
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=15)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 16])
+    args = parser.parse_args()
+
+    items = make_patients(args.items)
+    factory = latency_resource_factory(args.latency_ms / 1000)
+
+    print(f"{args.items} patient items, {args.latency_ms:.0f} ms per request")
+    print(f"{'mode':>20} {'items/s':>9}")
+    with mocked_aws() as dynamodb, tempfile.TemporaryDirectory() as checkpoint_dir:
+        recreate_table(dynamodb)
+        print(f"{'sequential put_item':>20} {sequential(items, factory):>9.0f}")
+        for workers in args.workers:
+            recreate_table(dynamodb)
+            rate = write_items('PatientState', items, 'patient_id', workers=workers, checkpoint_dir=checkpoint_dir,
+                               resource_factory=factory)
+            print(f"{f'batch x{workers} workers':>20} {rate:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Graph throughput with each orchestrator backend transport.
+
+Modes:
+  http-unpooled  previous behaviour, a new requests.get/post connection per call
+  http           pooled keep-alive HttpBackend
+  inprocess      server.py storage functions called directly
+
+The LLM is stubbed, inventory comes from a temporary CSV and patient records from
+an in-memory table, so the run is offline.
+
+    python -m benchmarks.bench_graph_transport [--orders 300] [--threads 1]
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+import pandas as pd
+import requests
+import uvicorn
+
+import backend_client
+import orchestrator
+import server
+from patient_store import PatientRepository
+from benchmarks.bench_intake_prompt import use_catalogue
+
+PORT = 8766
+NAMES = pd.read_excel("db/products-export.xlsx")["product name"].tolist()
+
+
+class MemoryPatientTable:
+    def query(self, **kwargs):
+        return {"Items": [{"sk": "SUMMARY"}]}
+
+
+def install_storage(csv_path: str):
+    server.inventory.table = None
+    server.inventory.csv_path = csv_path
+    server.patients = PatientRepository(MemoryPatientTable())
+
+
+def write_inventory(directory: str) -> str:
+    path = os.path.join(directory, "mock_inventory.csv")
+    pd.DataFrame({"product name": NAMES, "prescription_required": "No", "stock_level": 10**9}).to_csv(path, index=False)
+    return path
+
+
+def serve(csv_path: str):
+    install_storage(csv_path)
+    uvicorn.run(server.app, host="127.0.0.1", port=PORT, log_level="warning")
+
+
+def stub_llm():
+    def create(messages, **kwargs):
+        # Echo the first product in the (shortlisted) prompt back as the extraction
+        first = messages[1]["content"].split("Inventory: - ")[1].split("\n")[0]
+        content = json.dumps({"patient_id": "PAT001", "product_id": first, "quantity": 1})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+    orchestrator.groq_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def run_orders(n: int, threads: int) -> float:
+    def one(i):
+        state = {"raw_input": f"Hi, I am PAT001 and I need {NAMES[i % len(NAMES)]}", "patient_id": "Unknown",
+                 "product_id": "Unknown", "quantity": 1, "is_rx_required": False, "stock_level": 0,
+                 "status": "STARTING", "messages": [], "cot_logic": []}
+        result = orchestrator.app.invoke(state)
+        assert result["status"] == "COMPLETED", result["cot_logic"]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, range(n)))
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    use_catalogue(NAMES)
+    stub_llm()
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_inventory(tmp)
+        install_storage(csv_path)
+        process = multiprocessing.Process(target=serve, args=(csv_path,), daemon=True)
+        process.start()
+        for _ in range(100):
+            try:
+                requests.get(f"http://127.0.0.1:{PORT}/patient/PAT001/predictions")
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+
+        unpooled = backend_client.HttpBackend(f"http://127.0.0.1:{PORT}")
+        unpooled.session = requests  # module-level functions open a new connection per call
+        backend_client._backends.update({
+            "http-unpooled": unpooled,
+            "http": backend_client.HttpBackend(f"http://127.0.0.1:{PORT}"),
+            "inprocess": backend_client.InProcessBackend(),
+        })
+
+        print(f"{args.orders} orders, {args.threads} thread(s)")
+        print(f"{'mode':>14} {'graphs/s':>9}")
+        try:
+            for mode in ("http-unpooled", "http", "inprocess"):
+                os.environ["BACKEND_MODE"] = mode
+                print(f"{mode:>14} {run_orders(args.orders, args.threads):>9.0f}")
+        finally:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Prompt size and intake latency with and without the catalogue shortlist.
+
+Offline (default) it reports estimated prompt tokens per request for the real
+catalogue and synthetic 1k/10k catalogues. With --live and GROQ_API_KEY set it
+runs intake_node against Groq and reports billed prompt tokens and latency.
+
+    python -m benchmarks.bench_intake_prompt [--live] [--shortlist 20]
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+import pandas as pd
+
+import orchestrator
+from benchmarks.bench_product_index import make_catalogue
+from product_index import ProductIndex
+
+REQUESTS = [
+    "Hi, I am PAT001 and I need refill of Panthenol spray",
+    "PAT002 here, two bottles of NORSAN Omega-3 Total please",
+    "I am PAT004 and need my Mucosolvan capsules",
+    "Paracetamol 500 for PAT005",
+    "PAT010 would like Sinupret juice",
+    "Can PAT003 get the Vividrin eye drops again?",
+]
+
+
+def estimate_tokens(messages) -> int:
+    # Roughly 4 characters per token for Llama-3 on mixed German/English text
+    return sum(len(m["content"]) for m in messages) // 4
+
+
+def use_catalogue(names):
+    orchestrator.PRODUCT_NAMES = names
+    orchestrator.PRODUCT_LIST_STR = orchestrator.format_product_list(names)
+    orchestrator.PRODUCT_INDEX = ProductIndex(names)
+
+
+def prompt_for(raw_input: str, shortlist_size: int):
+    if shortlist_size:
+        names = [name for name, _ in orchestrator.PRODUCT_INDEX.match(raw_input, k=shortlist_size)]
+        product_list = orchestrator.format_product_list(names)
+    else:
+        product_list = orchestrator.PRODUCT_LIST_STR
+    return orchestrator.intake_messages(raw_input, "PAT001", product_list)
+
+
+def offline(shortlist_size: int):
+    catalogues = {"real": pd.read_excel("db/products-export.xlsx")["product name"].tolist()}
+    for size in (1_000, 10_000):
+        catalogues[f"synthetic-{size}"] = make_catalogue(size)
+
+    print(f"{'catalogue':>16} {'full tokens':>12} {'shortlist tokens':>17} {'reduction':>10}")
+    for label, names in catalogues.items():
+        use_catalogue(names)
+        full = statistics.mean(estimate_tokens(prompt_for(r, 0)) for r in REQUESTS)
+        short = statistics.mean(estimate_tokens(prompt_for(r, shortlist_size)) for r in REQUESTS)
+        print(f"{label:>16} {full:>12.0f} {short:>17.0f} {full / short:>9.1f}x")
+
+
+def live(shortlist_size: int):
+    use_catalogue(pd.read_excel("db/products-export.xlsx")["product name"].tolist())
+    print(f"{'mode':>10} {'prompt tokens/req':>18} {'intake ms (mean)':>17} {'fallbacks':>10}")
+    for label, size in (("full", 0), ("shortlist", shortlist_size)):
+        orchestrator.INTAKE_SHORTLIST_SIZE = size
+        for key in orchestrator.LLM_USAGE:
+            orchestrator.LLM_USAGE[key] = 0
+        timings = []
+        for raw in REQUESTS:
+            start = time.perf_counter()
+            orchestrator.intake_node({"raw_input": raw, "cot_logic": []})
+            timings.append((time.perf_counter() - start) * 1000)
+        usage = orchestrator.LLM_USAGE
+        print(f"{label:>10} {usage['prompt_tokens'] / len(REQUESTS):>18.0f} {statistics.mean(timings):>17.0f} {usage['shortlist_fallbacks']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="call Groq (needs GROQ_API_KEY)")
+    parser.add_argument("--shortlist", type=int, default=20)
+    args = parser.parse_args()
+    if args.live:
+        live(args.shortlist)
+    else:
+        offline(args.shortlist)
+
+
+if __name__ == "__main__":
+    main()
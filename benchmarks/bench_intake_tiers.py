@@ -0,0 +1,88 @@
+"""Accuracy and latency of the tiered intake over benchmarks/sample_requests.jsonl.
+
+Each sample is labelled with the expected patient, product and quantity. The
+requests run through intake_node twice: with the rule-based fast path (tier 1)
+and with everything sent to the LLM. Offline (default) the LLM is a stub that
+sleeps --llm-ms and returns the label, so only tier 1 accuracy is meaningful;
+with --live and GROQ_API_KEY set, Groq answers tier 2.
+
+    python -m benchmarks.bench_intake_tiers [--live] [--llm-ms 450]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+import pandas as pd
+
+import intake_rules
+import orchestrator
+from benchmarks.bench_intake_prompt import use_catalogue
+
+SAMPLES = os.path.join(os.path.dirname(__file__), "sample_requests.jsonl")
+FIELDS = ("patient_id", "product_id", "quantity")
+
+
+def load_samples():
+    with open(SAMPLES, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def stub_llm(samples, delay: float):
+    labels = {s["text"]: {field: s[field] for field in FIELDS} for s in samples}
+
+    def extract(raw, patient, shortlist):
+        time.sleep(delay)
+        return labels[raw], False
+
+    orchestrator.llm_extract = extract
+
+
+def run(samples, threshold: float):
+    intake_rules.FAST_PATH_SCORE = threshold
+    for tier in orchestrator.INTAKE_TIERS.values():
+        tier.update(hits=0, latency_s=0.0)
+    per_tier = {}
+    for sample in samples:
+        before = {tier: t["hits"] for tier, t in orchestrator.INTAKE_TIERS.items()}
+        start = time.perf_counter()
+        state = orchestrator.intake_node(orchestrator.initial_state(sample["text"]))
+        elapsed = (time.perf_counter() - start) * 1000
+        tier = next(t for t, v in orchestrator.INTAKE_TIERS.items() if v["hits"] > before[t])
+        correct = all(state[field] == sample[field] for field in FIELDS)
+        per_tier.setdefault(tier, []).append((correct, elapsed))
+    return per_tier
+
+
+def report(label, per_tier, total):
+    every = [ms for results in per_tier.values() for _, ms in results]
+    print(f"{label}: mean intake {statistics.mean(every):.1f} ms, p50 {statistics.median(every):.1f} ms")
+    print(f"  {'tier':>6} {'hits':>5} {'hit rate':>9} {'accuracy':>9} {'mean ms':>8}")
+    for tier, results in per_tier.items():
+        accuracy = sum(c for c, _ in results) / len(results)
+        print(f"  {tier:>6} {len(results):>5} {len(results) / total:>8.0%} {accuracy:>8.0%} {statistics.mean(ms for _, ms in results):>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--llm-ms", type=float, default=450, help="stub LLM latency when offline")
+    args = parser.parse_args()
+
+    samples = load_samples()
+    use_catalogue(pd.read_excel("db/products-export.xlsx")["product name"].tolist())
+    if not args.live:
+        stub_llm(samples, args.llm_ms / 1000)
+
+    print(f"{len(samples)} labelled requests, fast path score >= {intake_rules.FAST_PATH_SCORE:.0f}, "
+          f"margin {intake_rules.FAST_PATH_MARGIN:.0f}, {'Groq' if args.live else 'stub LLM'}")
+    report("tiered", run(samples, intake_rules.FAST_PATH_SCORE), len(samples))
+    report("LLM only", run(samples, 101), len(samples))
+
+
+if __name__ == "__main__":
+    main()
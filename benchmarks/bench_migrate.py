@@ -0,0 +1,110 @@
+"""Streaming bulk migrate_data vs. the previous read_excel + iterrows loader.
+
+Writes a synthetic order history workbook (same layout as db/Consumer Order
+History 1.xlsx) and a products export, then loads both into fresh databases.
+
+    python -m benchmarks.bench_migrate [--orders 200000] [--products 5000] [--legacy-max 200000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+import migrate_data
+from benchmarks.bench_refill_engine import synthetic_history
+
+
+def write_workbooks(directory: str, n_orders: int, n_products: int):
+    orders_df, products_df = synthetic_history(n_orders, n_products=n_products)
+    rng = np.random.default_rng(5)
+
+    history_path = os.path.join(directory, "history.xlsx")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(["Consumer Order History - Pharmaceutical Products"])
+    sheet.append([])
+    sheet.append(["Patient Demographics and Purchase Data"])
+    sheet.append([])
+    sheet.append(['Patient ID', 'Patient Age', 'Patient Gender', 'Purchase Date', 'Product Name', 'Quantity',
+                  'Total Price (EUR)', 'Dosage Frequency', 'Prescription Required'])
+    rx = rng.choice(['Yes', 'No'], n_products)
+    rx_by_name = dict(zip(products_df['name'], rx))
+    for row in orders_df.itertuples(index=False):
+        sheet.append([row.patient_id, 50, 'F', pd.Timestamp(row.purchase_date).to_pydatetime(), row.product_name,
+                      int(row.quantity), 9.99, row.dosage_frequency, rx_by_name[row.product_name]])
+    workbook.save(history_path)
+
+    products_path = os.path.join(directory, "products.xlsx")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Products")
+    sheet.append(['product id', 'product name', 'pzn', 'price rec', 'package size', 'descriptions'])
+    for i, (name, size) in enumerate(zip(products_df['name'], products_df['package_size'])):
+        sheet.append([i, name, f"{i:08d}", 9.99, size, "Synthetic product"])
+    workbook.save(products_path)
+    return history_path, products_path
+
+
+def legacy_migrate(history_path: str, products_path: str):
+    """The previous migrate_data body: full read_excel, a DataFrame scan per product, one INSERT per row."""
+    conn = migrate_data.init_db(with_indexes=False)
+    products_df = pd.read_excel(products_path)
+    history_df = pd.read_excel(history_path, header=4)
+    rx_map = history_df[['Product Name', 'Prescription Required']].drop_duplicates()
+    for _, row in products_df.iterrows():
+        rx_req = rx_map[rx_map['Product Name'] == row['product name']]['Prescription Required'].values
+        rx_val = rx_req[0] if len(rx_req) > 0 else 'No'
+        try:
+            conn.execute("""
+            INSERT INTO products (name, pzn, price, package_size, prescription_required)
+            VALUES (?, ?, ?, ?, ?)
+            """, (row['product name'], row['pzn'], row['price rec'], row['package size'], rx_val))
+        except sqlite3.IntegrityError:
+            pass
+    for _, row in history_df.iterrows():
+        conn.execute("""
+        INSERT INTO orders (patient_id, product_name, purchase_date, quantity, dosage_frequency)
+        VALUES (?, ?, ?, ?, ?)
+        """, (row['Patient ID'], row['Product Name'], str(row['Purchase Date']), int(row['Quantity']), row['Dosage Frequency']))
+    conn.commit()
+    conn.close()
+
+
+def timed(directory: str, name: str, fn, *args) -> float:
+    migrate_data.DB_PATH = os.path.join(directory, f"{name}.db")
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--legacy-max", type=int, default=200_000, help="skip the legacy loader above this many orders")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        history_path, products_path = write_workbooks(directory, args.orders, args.products)
+        print(f"{args.orders} orders, {args.products} products (workbooks written in {time.perf_counter() - start:.1f} s)")
+
+        bulk = timed(directory, "bulk", migrate_data.migrate_data, history_path, products_path)
+        print(f"{'bulk':>8} {bulk:>8.2f} s")
+        if args.orders <= args.legacy_max:
+            legacy = timed(directory, "legacy", legacy_migrate, history_path, products_path)
+            print(f"{'legacy':>8} {legacy:>8.2f} s  ({legacy / bulk:.1f}x)")
+
+            query = "SELECT patient_id, product_name, purchase_date, quantity, dosage_frequency FROM orders ORDER BY id"
+            same = [sqlite3.connect(os.path.join(directory, f"{name}.db")).execute(query).fetchall() for name in ("bulk", "legacy")]
+            rx = "SELECT name, prescription_required FROM products ORDER BY id"
+            same_rx = [sqlite3.connect(os.path.join(directory, f"{name}.db")).execute(rx).fetchall() for name in ("bulk", "legacy")]
+            print(f"identical orders: {same[0] == same[1]}, identical Rx flags: {same_rx[0] == same_rx[1]}")
+
+
+if __name__ == "__main__":
+    main()
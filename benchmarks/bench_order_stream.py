@@ -0,0 +1,72 @@
+"""Time to first feedback: blocking invoke vs per-node streaming.
+
+The Groq call and storage lookups are replaced with sleeps of the given
+latencies, so the run is offline. "first event" is when the intake node's
+reasoning reaches the caller; with invoke nothing arrives before the full run.
+
+    python -m benchmarks.bench_order_stream [--orders 20] [--llm-ms 400] [--storage-ms 40]
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+import orchestrator
+import order_stream
+
+
+class SlowBackend:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def get_inventory(self, product_id):
+        time.sleep(self.delay)
+        return {"prescription_required": "No", "stock_level": 100}
+
+    def get_predictions(self, patient_id):
+        time.sleep(self.delay)
+        return []
+
+    def execute_order(self, patient_id, product_id, quantity):
+        time.sleep(self.delay)
+        return {"status": "success"}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=20)
+    parser.add_argument("--llm-ms", type=float, default=400)
+    parser.add_argument("--storage-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    def slow_extract(raw, patient, shortlist):
+        time.sleep(args.llm_ms / 1000)
+        return {"patient_id": "PAT001", "product_id": "Panthenol Spray", "quantity": 1}, False
+
+    orchestrator.llm_extract = slow_extract
+    backend = SlowBackend(args.storage_ms / 1000)
+    config = {"configurable": {"backend": backend}}
+    raw = "Hi, I am PAT001 and I need a refill of Panthenol Spray"
+
+    invoke, first, total = [], [], []
+    for _ in range(args.orders):
+        start = time.perf_counter()
+        orchestrator.app.invoke(orchestrator.initial_state(raw), config=config)
+        invoke.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        for i, event in enumerate(order_stream.iter_events(raw, backend=backend)):
+            if i == 0:
+                first.append((time.perf_counter() - start) * 1000)
+        total.append((time.perf_counter() - start) * 1000)
+
+    print(f"{args.orders} orders, LLM {args.llm_ms:.0f} ms, storage {args.storage_ms:.0f} ms per call")
+    print(f"invoke  first feedback p50 {statistics.median(invoke):7.1f} ms (= full run)")
+    print(f"stream  first feedback p50 {statistics.median(first):7.1f} ms, full run p50 {statistics.median(total):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
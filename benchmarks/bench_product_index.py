@@ -0,0 +1,84 @@
+"""Compare ProductIndex.match with the old per-request linear RapidFuzz scan.
+
+Run from the repository root:
+    python -m benchmarks.bench_product_index
+"""
+import random
+import statistics
+import time
+
+from rapidfuzz import process, fuzz
+
+from product_index import ProductIndex
+
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = 200
+
+SYLLABLES = ["pan", "the", "nol", "nor", "san", "ome", "ga", "vi", "dri", "mu", "co", "sol", "van",
+             "pa", "ra", "ce", "ta", "mol", "ibe", "ro", "gast", "lo", "pe", "ram", "cet", "iri", "zin",
+             "sin", "pret", "dul", "lax", "ma", "gne", "sium", "hya", "lu", "ron", "ur", "ea"]
+FORMS = ["Tabletten", "Kapseln", "Spray", "Augentropfen", "Saft", "Creme", "Salbe", "Tropfen", "Lotion", "Gel"]
+MAKERS = ["ratiopharm", "HEXAL", "1 A Pharma", "Verla", "Hevert", "apodiscounter", "STADA", "AL"]
+
+
+def make_catalogue(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        brand = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        name = f"{brand}{rng.choice(['®', ''])} {rng.choice(FORMS)} {rng.choice(MAKERS)} {rng.randint(1, 50) * 10} mg"
+        if rng.random() < 0.3:
+            name += ", Lösung zum Einnehmen"
+        names.add(name)
+    return sorted(names)
+
+
+def make_queries(names, n: int, seed: int = 11):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        target = rng.choice(names)
+        brand = target.split(" ")[0].replace("®", "")
+        form = next(f for f in FORMS if f in target)
+        maker = next(m for m in MAKERS if f" {m} " in target)
+        queries.append((f"Hi, I am PAT{rng.randint(1, 999):03d} and I need a refill of {brand} {form.lower()} {maker}", target))
+    return queries
+
+
+def linear_scan(names, text):
+    # The previous intake_node behaviour: rebuild the choices dict and scan everything
+    choices = {name: name.split(',')[0].replace('®', '') for name in names}
+    match = process.extractOne(text, choices, scorer=fuzz.partial_ratio)
+    return match[2] if match else None
+
+
+def time_per_query(fn, queries):
+    timings = []
+    hits = 0
+    for text, target in queries:
+        start = time.perf_counter()
+        found = fn(text)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += found == target
+    return statistics.mean(timings), hits / len(queries)
+
+
+def main():
+    print(f"{'names':>8} {'build ms':>9} {'linear ms/q':>12} {'index ms/q':>11} {'speedup':>8} {'acc lin':>8} {'acc idx':>8}")
+    for size in SIZES:
+        names = make_catalogue(size)
+        queries = make_queries(names, QUERIES)
+        # The linear scan is slow at 100k; a smaller sample keeps the run short
+        linear_queries = queries if size < 100_000 else queries[:20]
+
+        start = time.perf_counter()
+        index = ProductIndex(names)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        lin_ms, lin_acc = time_per_query(lambda q: linear_scan(names, q), linear_queries)
+        idx_ms, idx_acc = time_per_query(lambda q: (index.match(q, k=1) or [(None, 0)])[0][0], queries)
+        print(f"{size:>8} {build_ms:>9.0f} {lin_ms:>12.2f} {idx_ms:>11.2f} {lin_ms / idx_ms:>7.1f}x {lin_acc:>8.2f} {idx_acc:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Vectorized refill engine vs. the previous per-group loop on synthetic histories.
+
+    python -m benchmarks.bench_refill_engine [--sizes 1000000 2000000] [--legacy-max 50000]
+"""
+import argparse
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from data_prep import CURRENT_DATE, compute_refill_predictions, extract_unit_count, map_dosage
+
+DOSAGES = ['Once daily', 'Twice daily', 'Three times daily', 'As needed']
+PACKAGE_SIZES = ['130 g', '200 ml', '120 st', '30x0.5 ml', '60 st', '28x3 g', '1 st', '100 st']
+
+
+def synthetic_history(n_orders: int, n_patients: int = None, n_products: int = 500, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    n_patients = n_patients or max(10, n_orders // 8)
+    products_df = pd.DataFrame({
+        'name': [f"Product {i:05d}" for i in range(n_products)],
+        'package_size': rng.choice(PACKAGE_SIZES, n_products),
+    })
+    # Patients re-order a small set of products, so groups have several purchases each
+    patient = rng.integers(0, n_patients, n_orders)
+    product = (patient * 7 + rng.integers(0, 3, n_orders)) % n_products
+    days_back = rng.integers(0, 365, n_orders)
+    orders_df = pd.DataFrame({
+        'patient_id': [f"PAT{p:07d}" for p in patient],
+        'product_name': products_df['name'].to_numpy()[product],
+        'purchase_date': (pd.Timestamp(CURRENT_DATE) - pd.to_timedelta(days_back, unit='D')).astype(str),
+        'quantity': rng.integers(1, 4, n_orders),
+        'dosage_frequency': rng.choice(DOSAGES, n_orders),
+    })
+    return orders_df, products_df
+
+
+def legacy_refill_predictions(orders_df, products_df, current_date=CURRENT_DATE):
+    """The previous calculate_probabilistic_refills loop, minus the database I/O."""
+    orders_df = orders_df.copy()
+    orders_df['purchase_date'] = pd.to_datetime(orders_df['purchase_date'])
+    predictions = []
+    for (pid, pname), group in orders_df.groupby(['patient_id', 'product_name']):
+        group = group.sort_values('purchase_date')
+        last_order = group.iloc[-1]
+        p_info = products_df[products_df['name'] == pname].iloc[0]
+        unit_count = extract_unit_count(p_info['package_size'])
+        theoretical_dosage = map_dosage(last_order['dosage_frequency'])
+        theoretical_days = (unit_count * last_order['quantity']) / theoretical_dosage
+        if len(group) > 1:
+            intervals = group['purchase_date'].diff().dt.days.dropna()
+            avg_observed_interval = intervals.mean()
+            final_days_estimate = (0.7 * avg_observed_interval) + (0.3 * theoretical_days)
+        else:
+            final_days_estimate = theoretical_days
+        predicted_date = last_order['purchase_date'] + timedelta(days=int(final_days_estimate))
+        days_diff = (predicted_date - current_date).days
+        if days_diff < 0: action = 'OVERDUE - Trigger Outreach'
+        elif days_diff <= 5: action = f'Alert in {days_diff} days'
+        else: action = 'No action needed yet'
+        if action != 'No action needed yet':
+            predictions.append({'patient_id': pid, 'product_name': pname,
+                                'predicted_date': str(predicted_date.date()), 'action': action})
+    return pd.DataFrame(predictions, columns=['patient_id', 'product_name', 'predicted_date', 'action'])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 1_000_000, 2_000_000])
+    parser.add_argument("--legacy-max", type=int, default=50_000, help="largest history the old loop is run on")
+    args = parser.parse_args()
+
+    print(f"{'orders':>10} {'groups':>9} {'vectorized s':>13} {'legacy s':>9} {'speedup':>8} {'identical':>10}")
+    for size in args.sizes:
+        orders_df, products_df = synthetic_history(size)
+        fast, fast_s = timed(compute_refill_predictions, orders_df, products_df)
+        groups = orders_df.groupby(['patient_id', 'product_name']).ngroups
+        if size <= args.legacy_max:
+            slow, slow_s = timed(legacy_refill_predictions, orders_df, products_df)
+            identical = fast.equals(slow)
+            print(f"{size:>10} {groups:>9} {fast_s:>13.2f} {slow_s:>9.2f} {slow_s / fast_s:>7.0f}x {str(identical):>10}")
+        else:
+            print(f"{size:>10} {groups:>9} {fast_s:>13.2f} {'-':>9} {'-':>8} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
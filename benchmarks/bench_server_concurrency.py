@@ -0,0 +1,154 @@
+"""p50/p99 latency of server.py under 200 concurrent clients.
+
+The app runs under uvicorn in a child process and every client holds its own
+keep-alive connection, so time spent queued behind a blocked server loop is
+included. The clients speak HTTP/1.1 over raw asyncio streams because httpx's
+async pool, not the server, saturates first at this concurrency. DynamoDB is replaced by an in-memory table that
+sleeps for a fixed round trip. "blocking" reproduces the previous behaviour
+(storage called on the event loop); "executor" is the current run_storage path.
+
+    python -m benchmarks.bench_server_concurrency [--clients 200] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+import httpx
+import uvicorn
+
+import server
+from patient_store import PatientRepository
+
+PRODUCT = "NORSAN Omega-3 Total"
+
+
+class SlowTable:
+    def __init__(self, latency: float, items: dict):
+        self.latency = latency
+        self.items = items
+        self._lock = threading.Lock()
+
+    def get_item(self, Key, **kwargs):
+        time.sleep(self.latency)
+        item = self.items.get(next(iter(Key.values())))
+        return {"Item": dict(item)} if item else {}
+
+    def query(self, **kwargs):
+        time.sleep(self.latency)
+        return {"Items": list(self.items.values())}
+
+    def update_item(self, Key, ExpressionAttributeValues, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            item = self.items[Key["product_id"]]
+            item["stock_level"] += ExpressionAttributeValues[":neg"]
+            return {"Attributes": {"stock_level": item["stock_level"]}}
+
+
+def install_tables(latency: float):
+    server.inventory.table = SlowTable(latency, {PRODUCT: {"product_id": PRODUCT, "prescription_required": "No", "stock_level": Decimal(10**9)}})
+    server.inventory.cache_ttl = 0
+    server.patients = PatientRepository(SlowTable(latency, {"SUMMARY": {"patient_id": "PAT001", "sk": "SUMMARY"}}))
+
+
+async def run_inline(fn, *args):
+    return fn(*args)
+
+
+class KeepAliveClient:
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: dict = None) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+        self.writer.write(head.encode() + payload)
+        await self.writer.drain()
+        headers = (await self.reader.readuntil(b"\r\n\r\n")).decode()
+        length = next(int(line.split(":")[1]) for line in headers.split("\r\n") if line.lower().startswith("content-length"))
+        await self.reader.readexactly(length)
+        return int(headers.split(" ")[1])
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def client_session(port: int, product: str, requests_per_client: int, latencies: list):
+    quoted = httpx.QueryParams({"product_id": product})
+    order = {"patient_id": "PAT001", "product_id": product, "quantity": 1}
+    calls = [
+        ("GET", f"/inventory?{quoted}", None),
+        ("GET", "/patient/PAT001/predictions", None),
+        ("POST", "/order/execute", order),
+    ]
+    client = KeepAliveClient(port)
+    try:
+        for i in range(requests_per_client):
+            start = time.perf_counter()
+            status = await client.request(*calls[i % len(calls)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert status == 200, status
+    finally:
+        client.close()
+
+
+def serve(mode: str, latency: float, port: int):
+    install_tables(latency)
+    if mode == "blocking":
+        server.run_storage = run_inline
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def start_server(mode: str, latency: float, port: int) -> multiprocessing.Process:
+    process = multiprocessing.Process(target=serve, args=(mode, latency, port), daemon=True)
+    process.start()
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/patient/PAT001/predictions")
+            break
+        except httpx.TransportError:
+            time.sleep(0.1)
+    return process
+
+
+async def run_mode(clients: int, requests_per_client: int, product: str, port: int):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client_session(port, product, requests_per_client, latencies) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return statistics.median(latencies), p99, len(latencies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=3, help="requests per client")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.requests} requests each, {args.latency_ms:.0f} ms per storage call, {server.STORAGE_WORKERS} storage workers")
+    print(f"{'mode':>10} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for mode in ("blocking", "executor"):
+        process = start_server(mode, args.latency_ms / 1000, args.port)
+        try:
+            p50, p99, rps = asyncio.run(run_mode(args.clients, args.requests, PRODUCT, args.port))
+        finally:
+            process.terminate()
+            process.join()
+        print(f"{mode:>10} {p50:>9.0f} {p99:>9.0f} {rps:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
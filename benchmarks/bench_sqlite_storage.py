@@ -0,0 +1,161 @@
+"""/agent/order and /admin/proactive_refills under concurrent load on main.py.
+
+main.py runs under uvicorn in a child process with a stub three-node graph (no
+LLM) so every order is only checkpoint writes. Half of the clients place
+orders, the other half page through refill alerts with filters. Modes:
+
+  per-call        previous storage: a new connection per request, checkpoints in the same file
+  pooled          db.ConnectionPool, checkpoints in the same file
+  pooled+split    db.ConnectionPool, checkpoints in their own file (CHECKPOINT_DB_PATH)
+
+    python -m benchmarks.bench_sqlite_storage [--clients 64] [--requests 20] [--predictions 200000]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import operator
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Annotated, List, Optional, TypedDict
+
+import httpx
+import uvicorn
+from langgraph.graph import END, StateGraph
+
+import db
+import main as api
+import migrate_data
+from benchmarks.bench_server_concurrency import KeepAliveClient
+
+PORT = 8767
+ACTIONS = ['OVERDUE - Trigger Outreach', 'Alert in 2 days', 'Alert in 5 days']
+
+
+class OrderState(TypedDict):
+    input_text: str
+    patient_id: Optional[str]
+    product_name: Optional[str]
+    quantity: int
+    status: str
+    reason: str
+    agent_thought: Annotated[List[str], operator.add]
+
+
+def stub_workflow():
+    workflow = StateGraph(OrderState)
+    workflow.add_node("intake", lambda state: {"product_name": "NORSAN Omega-3 Total", "agent_thought": ["intake"]})
+    workflow.add_node("validator", lambda state: {"status": "approved", "agent_thought": ["validator"]})
+    workflow.add_node("action", lambda state: {"status": "completed", "agent_thought": ["action"]})
+    workflow.set_entry_point("intake")
+    workflow.add_edge("intake", "validator")
+    workflow.add_edge("validator", "action")
+    workflow.add_edge("action", END)
+    return workflow
+
+
+class PerCallConnections:
+    """The previous handlers: sqlite3.connect() per request, default journal settings."""
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        pass
+
+
+def build_database(path: str, predictions: int):
+    migrate_data.DB_PATH = path
+    conn = migrate_data.init_db()
+    conn.executemany(
+        "INSERT INTO refill_predictions (patient_id, product_name, predicted_date, action) VALUES (?, ?, ?, ?)",
+        ((f"PAT{i % 20000:06d}", f"Product {i // 20000}", f"2024-03-{1 + i % 28:02d}", ACTIONS[i % 3]) for i in range(predictions)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def serve(mode: str, directory: str):
+    path = os.path.join(directory, "pharmacy.db")
+    api.workflow = stub_workflow()
+    if mode == "per-call":
+        api.pool = PerCallConnections(path)
+        db.connect = lambda p: sqlite3.connect(p, check_same_thread=False)
+    else:
+        api.pool = db.ConnectionPool(path)
+    db.CHECKPOINT_DB_PATH = os.path.join(directory, "checkpoints.db") if mode == "pooled+split" else path
+    uvicorn.run(api.app, host="127.0.0.1", port=PORT, log_level="warning", backlog=4096)
+
+
+async def client_session(kind: str, index: int, requests: int, latencies: dict):
+    client = KeepAliveClient(PORT)
+    try:
+        for i in range(requests):
+            if kind == "order":
+                call = ("POST", "/agent/order", {"message": "2x NORSAN Omega-3 Total", "patient_id": f"PAT{index:06d}"})
+            else:
+                call = ("GET", f"/admin/proactive_refills?limit=100&action_type=alert&patient_id=PAT{(index * 31 + i) % 20000:06d}", None)
+            start = time.perf_counter()
+            status = await client.request(*call)
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+            assert status == 200, status
+    finally:
+        client.close()
+
+
+async def run_load(clients: int, requests: int):
+    latencies = {"order": [], "alerts": []}
+    start = time.perf_counter()
+    await asyncio.gather(*(client_session("order" if i % 2 else "alerts", i, requests, latencies) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    return latencies, (clients * requests) / elapsed
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * p) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--predictions", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients x {args.requests} requests, {args.predictions} refill predictions")
+    print(f"{'mode':>14} {'order p50':>10} {'order p99':>10} {'alerts p50':>11} {'alerts p99':>11} {'req/s':>7}")
+    for mode in ("per-call", "pooled", "pooled+split"):
+        with tempfile.TemporaryDirectory() as directory:
+            build_database(os.path.join(directory, "pharmacy.db"), args.predictions)
+            process = multiprocessing.Process(target=serve, args=(mode, directory), daemon=True)
+            process.start()
+            for _ in range(100):
+                try:
+                    httpx.get(f"http://127.0.0.1:{PORT}/admin/proactive_refills?limit=1")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            try:
+                latencies, rps = asyncio.run(run_load(args.clients, args.requests))
+            finally:
+                process.terminate()
+                process.join()
+        order, alerts = latencies["order"], latencies["alerts"]
+        print(f"{mode:>14} {statistics.median(order):>10.1f} {percentile(order, 0.99):>10.1f} "
+              f"{statistics.median(alerts):>11.1f} {percentile(alerts, 0.99):>11.1f} {rps:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
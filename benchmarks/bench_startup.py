@@ -0,0 +1,68 @@
+"""Cold-start cost of the entry points, measured with `python -X importtime`.
+
+Each module is imported in a fresh interpreter. "import ms" is the cumulative
+import time of the module itself; the slowest dependencies are listed by their
+cumulative time. "first order ready" additionally builds what the first
+request needs (catalogue, product index, compiled graph), with the catalogue
+artifact present and, for comparison, rebuilt from the spreadsheets.
+
+    python -m benchmarks.bench_startup [--modules orchestrator order_stream server] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+FIRST_ORDER = "import orchestrator; orchestrator.PRODUCT_INDEX; orchestrator.app"
+
+
+def importtime(code: str, env: dict = None):
+    """{module: cumulative import ms} for one fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            env=dict(os.environ, **(env or {})), check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative_us) / 1000
+    return modules
+
+
+def wall_ms(code: str, env: dict = None) -> float:
+    timer = f"import time; _start = time.perf_counter(); {code}; print((time.perf_counter() - _start) * 1000)"
+    result = subprocess.run([sys.executable, "-c", timer], capture_output=True, text=True,
+                            env=dict(os.environ, **(env or {})), check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=["orchestrator", "order_stream", "order_batch", "server"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    env = {"GROQ_API_KEY": os.getenv("GROQ_API_KEY", "offline")}
+    print(f"{'module':>14} {'import ms':>10}   slowest dependencies (cumulative ms)")
+    for module in args.modules:
+        runs = [importtime(f"import {module}", env) for _ in range(args.runs)]
+        total = statistics.median(modules[module] for modules in runs)
+        # site is imported by the interpreter itself, before -c runs
+        heavy = sorted(((ms, name) for name, ms in runs[-1].items() if name not in (module, "site")), reverse=True)[:args.top]
+        print(f"{module:>14} {total:>10.0f}   " + ", ".join(f"{name} {ms:.0f}" for ms, name in heavy))
+
+    with tempfile.TemporaryDirectory() as directory:
+        cold = dict(env, CATALOGUE_PATH=os.path.join(directory, "catalogue.bin"))
+        wall_ms("import catalogue; catalogue.load()", dict(env))  # make sure the default artifact exists
+        first = [wall_ms(FIRST_ORDER, env) for _ in range(args.runs)]
+        rebuilt = [wall_ms(FIRST_ORDER, cold) for _ in range(1)]
+        os.remove(cold["CATALOGUE_PATH"])
+    print(f"first order ready: {statistics.median(first):.0f} ms with the catalogue artifact, "
+          f"{rebuilt[0]:.0f} ms when it has to be rebuilt from the spreadsheets")
+
+
+if __name__ == "__main__":
+    main()
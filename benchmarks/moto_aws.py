@@ -0,0 +1,31 @@
+"""moto stand-ins for AWS, shared by the tests (conftest.py) and the benchmarks.
+
+    mocked_aws()    every boto3 client created inside the block talks to moto;
+                    yields a DynamoDB resource
+    create_table()  on-demand table with string keys
+"""
+import os
+from contextlib import contextmanager
+
+import boto3
+from moto import mock_aws
+
+REGION = 'us-east-1'
+
+
+@contextmanager
+def mocked_aws():
+    for key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(key, "testing")
+    with mock_aws():
+        yield boto3.resource('dynamodb', region_name=REGION)
+
+
+def create_table(dynamodb, name: str, hash_key: str, range_key: str = None):
+    keys = [(hash_key, 'HASH')] + ([(range_key, 'RANGE')] if range_key else [])
+    return dynamodb.create_table(
+        TableName=name,
+        KeySchema=[{'AttributeName': attr, 'KeyType': kind} for attr, kind in keys],
+        AttributeDefinitions=[{'AttributeName': attr, 'AttributeType': 'S'} for attr, _ in keys],
+        BillingMode='PAY_PER_REQUEST',
+    )
@@ -0,0 +1,75 @@
+"""Offline stand-ins for the external services, for benchmarks.
+
+    StubLLM   replaces orchestrator.llm_extract: sleeps a fixed latency and answers
+              with the regex patient id and the best fuzzy product match
+    aws()     moto-backed DynamoDB (Inventory, PatientRecords) and SNS, wired into
+              server.py so the in-process backend uses them
+"""
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+import boto3
+import pandas as pd
+
+import orchestrator
+from benchmarks.bench_intake_prompt import use_catalogue
+from benchmarks.moto_aws import create_table, mocked_aws
+from patient_store import PatientRepository
+
+
+class StubLLM:
+    def __init__(self, latency_ms: float = 400):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def __call__(self, raw_input, detected_patient, shortlist):
+        self.calls += 1
+        time.sleep(self.latency)
+        patient = re.search(r'PAT\d+', raw_input, re.IGNORECASE)
+        product = shortlist[0] if shortlist else orchestrator.PRODUCT_INDEX.match(raw_input)[0][0]
+        return {"patient_id": patient.group(0).upper() if patient else "Unknown", "product_id": product, "quantity": 1}, False
+
+    @contextmanager
+    def installed(self, catalogue):
+        """Point the orchestrator at catalogue and route Groq calls to this stub."""
+        previous = (orchestrator.llm_extract, orchestrator.PRODUCT_NAMES, orchestrator.PRODUCT_LIST_STR, orchestrator.PRODUCT_INDEX)
+        use_catalogue(list(catalogue))
+        orchestrator.llm_extract = self
+        try:
+            yield self
+        finally:
+            orchestrator.llm_extract, orchestrator.PRODUCT_NAMES, orchestrator.PRODUCT_LIST_STR, orchestrator.PRODUCT_INDEX = previous
+
+
+@contextmanager
+def aws(products: pd.DataFrame, stock_level: int = 10**9):
+    """moto DynamoDB/SNS with every product in Inventory; yields the server module using them."""
+    with mocked_aws() as dynamodb, tempfile.TemporaryDirectory() as directory:
+        import server
+        from notifications import NotificationOutbox
+
+        inventory = create_table(dynamodb, 'Inventory', 'product_id')
+        records = create_table(dynamodb, 'PatientRecords', 'patient_id', 'sk')
+        with inventory.batch_writer() as batch:
+            for name, rx in zip(products['name'], products['prescription_required']):
+                batch.put_item(Item={'product_id': name, 'prescription_required': rx, 'stock_level': stock_level})
+        sns = boto3.client('sns', region_name='us-east-1')
+        topic_arn = sns.create_topic(Name='pharmacy-orders')['TopicArn']
+
+        previous = (server.inventory.table, server.inventory.csv_path, server.patients, server.outbox)
+        server.inventory.table = inventory
+        server.inventory.csv_path = os.path.join(directory, "missing.csv")
+        server.patients = PatientRepository(records)
+        server.outbox = NotificationOutbox(sns, topic_arn, path=os.path.join(directory, "outbox.db"))
+        try:
+            yield server
+        finally:
+            server.outbox.close()
+            server.inventory.table, server.inventory.csv_path, server.patients, server.outbox = previous
+            server.inventory.invalidate()
@@ -0,0 +1,251 @@
+"""End-to-end benchmark suite with synthetic data and offline stand-ins.
+
+Scenarios:
+  single_order     one order at a time through the graph (stub LLM, moto DynamoDB/SNS,
+                   in-process backend): latency percentiles and time to first event
+  batch            order_batch.run_batch throughput over the same stack
+  refill_engine    data_prep full rebuild and an incremental run over a synthetic pharmacy.db
+  migration        migrate_data over synthetic Excel exports (capped at Excel's row limit)
+
+Results are written as JSON. Pass --baseline with an earlier result file to see
+the change per metric; the run exits with status 1 if any metric regressed by
+more than --tolerance. Metrics ending in _per_s are better when higher, all
+others (_ms, _s) when lower.
+
+    python -m benchmarks.suite [--size small|medium|large] [--scenarios single_order batch]
+                               [--llm-ms 400] [--output results.json] [--baseline old.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks import synthetic
+from benchmarks.bench_product_index import make_queries
+from benchmarks.stubs import StubLLM, aws
+
+import data_prep
+import migrate_data
+import order_batch
+import order_stream
+from backend_client import InProcessBackend
+
+SIZES = {
+    "small": {"products": 1_000, "orders": 10_000, "requests": 40, "batch": 200, "migrate_orders": 10_000},
+    "medium": {"products": 10_000, "orders": 1_000_000, "requests": 200, "batch": 1_000, "migrate_orders": 100_000},
+    "large": {"products": 100_000, "orders": 10_000_000, "requests": 500, "batch": 5_000, "migrate_orders": 1_000_000},
+}
+EXCEL_MAX_ROWS = 1_048_576 - 5  # minus the title rows of the order history export
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * p)) - 1)]
+
+
+def order_requests(products, n: int, seed: int = 13):
+    """Half exact product names (answered by the rules tier), half loose phrasing that needs the LLM."""
+    rng = random.Random(seed)
+    names = products.loc[products['prescription_required'] == 'No', 'name'].tolist()
+    loose = make_queries(names, n - n // 2, seed=seed)
+    requests = [f"Hi, I am PAT{rng.randint(1, 99999):05d} and I need 2 packs of {rng.choice(names)}" for _ in range(n // 2)]
+    requests += [query for query, _ in loose]
+    rng.shuffle(requests)
+    return requests
+
+
+@contextlib.contextmanager
+def order_stack(size: dict, llm_ms: float):
+    products = synthetic.make_products(size["products"])
+    llm = StubLLM(llm_ms)
+    with aws(products), llm.installed(products['name']):
+        yield products, InProcessBackend(), llm
+
+
+def single_order(size: dict, llm_ms: float) -> dict:
+    with order_stack(size, llm_ms) as (products, backend, llm):
+        requests = order_requests(products, size["requests"])
+        latencies, first_events, statuses = [], [], {}
+        for raw in requests:
+            start = time.perf_counter()
+            first = None
+            for event in order_stream.iter_events(raw, backend=backend):
+                if first is None:
+                    first = time.perf_counter() - start
+                final = event
+            latencies.append((time.perf_counter() - start) * 1000)
+            first_events.append(first * 1000)
+            statuses[final['status']] = statuses.get(final['status'], 0) + 1
+    return {
+        "orders": len(requests),
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_p95_ms": percentile(latencies, 0.95),
+        "latency_p99_ms": percentile(latencies, 0.99),
+        "first_event_p50_ms": statistics.median(first_events),
+        "llm_calls": llm.calls,
+        "statuses": statuses,
+    }
+
+
+def batch(size: dict, llm_ms: float) -> dict:
+    with order_stack(size, llm_ms) as (products, backend, llm):
+        requests = order_requests(products, size["batch"])
+        start = time.perf_counter()
+        results = order_batch.run_batch(requests, backend=backend)
+        elapsed = time.perf_counter() - start
+    return {
+        "orders": len(results),
+        "concurrency": order_batch.BATCH_CONCURRENCY,
+        "elapsed_s": elapsed,
+        "orders_per_s": len(results) / elapsed,
+        "completed": sum(r['status'] == "COMPLETED" for r in results),
+        "llm_calls": llm.calls,
+    }
+
+
+def refill_engine(size: dict, llm_ms: float) -> dict:
+    products = synthetic.make_products(size["products"])
+    orders = synthetic.make_orders(size["orders"], products)
+    # 1% new orders for the incremental run, from the same patients
+    new_orders = synthetic.make_orders(max(1, size["orders"] // 100), products, n_patients=max(10, size["orders"] // 8), seed=4)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pharmacy.db")
+        synthetic.load_sqlite(path, products, orders)
+        previous, data_prep.DB_PATH = data_prep.DB_PATH, path
+        try:
+            start = time.perf_counter()
+            data_prep.calculate_probabilistic_refills(full=True)
+            full = time.perf_counter() - start
+
+            conn = sqlite3.connect(path)
+            synthetic.append_orders(conn, new_orders)
+            conn.close()
+            start = time.perf_counter()
+            data_prep.calculate_probabilistic_refills()
+            incremental = time.perf_counter() - start
+        finally:
+            data_prep.DB_PATH = previous
+    return {
+        "orders": len(orders),
+        "full_s": full,
+        "full_orders_per_s": len(orders) / full,
+        "incremental_orders": len(new_orders),
+        "incremental_s": incremental,
+    }
+
+
+def migration(size: dict, llm_ms: float) -> dict:
+    from benchmarks.bench_migrate import write_workbooks
+
+    n_orders = min(size["migrate_orders"], EXCEL_MAX_ROWS)
+    with tempfile.TemporaryDirectory() as directory:
+        history_path, products_path = write_workbooks(directory, n_orders, min(size["products"], 10_000))
+        previous, migrate_data.DB_PATH = migrate_data.DB_PATH, os.path.join(directory, "pharmacy.db")
+        try:
+            start = time.perf_counter()
+            migrate_data.migrate_data(history_path, products_path)
+            elapsed = time.perf_counter() - start
+        finally:
+            migrate_data.DB_PATH = previous
+    return {"orders": n_orders, "elapsed_s": elapsed, "rows_per_s": n_orders / elapsed}
+
+
+SCENARIOS = {"single_order": single_order, "batch": batch, "refill_engine": refill_engine, "migration": migration}
+
+
+def metadata(size_name: str, size: dict, llm_ms: float) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "size": size_name,
+        "parameters": dict(size, llm_ms=llm_ms),
+    }
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """(scenario, metric, baseline, current, change) for every timing metric in both; positive change is worse."""
+    rows = []
+    for scenario, metrics in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario, {})
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if not (metric.endswith("_per_s") or metric.endswith("_ms") or metric.endswith("_s")):
+                continue
+            # Positive change = worse, whichever direction the metric goes
+            change = (old - value) / old if metric.endswith("_per_s") else (value - old) / old
+            rows.append((scenario, metric, old, value, change))
+    return rows
+
+
+def print_comparison(rows: list, tolerance: float) -> bool:
+    regressed = False
+    print(f"{'scenario':>14} {'metric':>22} {'baseline':>12} {'current':>12} {'change':>8}")
+    for scenario, metric, old, value, change in rows:
+        flag = ""
+        if change > tolerance:
+            flag, regressed = "  REGRESSION", True
+        print(f"{scenario:>14} {metric:>22} {old:>12.2f} {value:>12.2f} {(value - old) / old:>+7.0%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--products", type=int, help="override the size preset")
+    parser.add_argument("--orders", type=int, help="override the size preset")
+    parser.add_argument("--llm-ms", type=float, default=400, help="stub LLM latency")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression per metric")
+    args = parser.parse_args()
+
+    size = dict(SIZES[args.size])
+    if args.products:
+        size["products"] = args.products
+    if args.orders:
+        size["orders"] = args.orders
+
+    results = {"meta": metadata(args.size, size, args.llm_ms), "scenarios": {}}
+    for name in args.scenarios:
+        print(f"Running {name}...", file=sys.stderr)
+        # Node banners and loader progress would drown the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["scenarios"][name] = SCENARIOS[name](size, args.llm_ms)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if print_comparison(compare(results, baseline), args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Synthetic catalogues and order histories in the migrate_data.py schema.
+
+    products: name, pzn, price, package_size, prescription_required, stock_level
+    orders:   patient_id, product_name, purchase_date, quantity, dosage_frequency
+
+Generation is vectorized, so 10M orders take seconds rather than minutes.
+"""
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import migrate_data
+from benchmarks.bench_product_index import make_catalogue
+from benchmarks.bench_refill_engine import DOSAGES, PACKAGE_SIZES
+from data_prep import CURRENT_DATE
+
+INSERT_CHUNK = 200_000
+
+
+def make_products(n: int, rx_share: float = 0.3, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'name': make_catalogue(n, seed=seed),
+        'pzn': [f"{i:08d}" for i in range(n)],
+        'price': rng.integers(199, 4999, n) / 100,
+        'package_size': rng.choice(PACKAGE_SIZES, n),
+        'prescription_required': np.where(rng.random(n) < rx_share, 'Yes', 'No'),
+        'stock_level': rng.integers(50, 500, n),
+    })
+
+
+def make_orders(n: int, products: pd.DataFrame, n_patients: int = None, seed: int = 3) -> pd.DataFrame:
+    """Patients re-order a few products each, so every patient/product pair has several purchases."""
+    rng = np.random.default_rng(seed)
+    n_patients = n_patients or max(10, n // 8)
+    n_products = len(products)
+    patient = rng.integers(0, n_patients, n)
+    product = (patient * 7 + rng.integers(0, 3, n)) % n_products
+    days_back = rng.integers(0, 365, n)
+    dates = (np.datetime64(CURRENT_DATE.date()) - days_back.astype('timedelta64[D]')).astype(str)
+    return pd.DataFrame({
+        'patient_id': patient_ids(patient),
+        'product_name': products['name'].to_numpy()[product],
+        'purchase_date': dates,
+        'quantity': rng.integers(1, 4, n),
+        'dosage_frequency': rng.choice(DOSAGES, n),
+    })
+
+
+def patient_ids(numbers) -> np.ndarray:
+    return np.char.add('PAT', np.char.zfill(np.asarray(numbers).astype(str), 7))
+
+
+def load_sqlite(path: str, products: pd.DataFrame, orders: pd.DataFrame):
+    """A pharmacy.db at path with the given products and orders, indexed like a migrated one."""
+    if os.path.exists(path):
+        os.remove(path)
+    previous, migrate_data.DB_PATH = migrate_data.DB_PATH, path
+    try:
+        conn = migrate_data.init_db(with_indexes=False)
+    finally:
+        migrate_data.DB_PATH = previous
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    columns = ['name', 'pzn', 'price', 'package_size', 'prescription_required', 'stock_level']
+    with conn:
+        conn.executemany(f"INSERT INTO products ({', '.join(columns)}) VALUES (?, ?, ?, ?, ?, ?)",
+                         zip(*(products[c].tolist() for c in columns)))
+    append_orders(conn, orders)
+    migrate_data.create_indexes(conn)
+    conn.close()
+
+
+def append_orders(conn: sqlite3.Connection, orders: pd.DataFrame):
+    columns = ['patient_id', 'product_name', 'purchase_date', 'quantity', 'dosage_frequency']
+    for start in range(0, len(orders), INSERT_CHUNK):
+        chunk = orders.iloc[start:start + INSERT_CHUNK]
+        with conn:
+            conn.executemany(f"INSERT INTO orders ({', '.join(columns)}) VALUES (?, ?, ?, ?, ?)",
+                             zip(*(chunk[c].tolist() for c in columns)))
@@ -0,0 +1,312 @@
+import csv
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+# Pre-built product catalogue: the products export and the inventory CSV merged
+# into one versioned binary file, so every entry point loads the catalogue the
+# same way and without pandas. Built by `python catalogue.py` (the Docker images
+# do this at build time); load() also rebuilds it whenever a source file is newer
+# than the artifact.
+#
+# The file is memory-mapped read-only, so gunicorn/uvicorn workers on one host
+# share a single copy through the page cache. Layout (little-endian):
+#   header    magic, format, row count, version, sources JSON length, index slots,
+#             names length
+#   sources   JSON list of the source paths it was built from
+#   rows      fixed-width records; strings are (offset, length) into the heap
+#   index     open-addressing hash table, crc32(name) -> row number + 1 (0 = empty)
+#   heap      UTF-8 strings: all names first, NUL-separated in row order, then the rest
+
+CATALOGUE_PATH = os.getenv("CATALOGUE_PATH", "catalogue.bin")
+PRODUCTS_XLSX = "db/products-export.xlsx"
+INVENTORY_CSV = "mock_inventory.csv"
+FORMAT_VERSION = 2
+
+MAGIC = b"RXCAT\x00\x00\x00"
+HEADER = struct.Struct("<8sII16sIII")
+# name, pzn, package size, Rx flag (heap offset + length each), price, stock level, flags
+ROW = struct.Struct("<IHIHIHIHdiB")
+SLOT = struct.Struct("<I")
+NO_STRING = 0xFFFF
+IN_INVENTORY, LISTED = 1, 2
+
+
+def _read_products(path: str) -> Dict[str, dict]:
+    from migrate_data import iter_excel_chunks
+
+    products = {}
+    if not os.path.exists(path):
+        return products
+    for chunk in iter_excel_chunks(path):
+        for row in chunk:
+            name = row['product name']
+            if name is None:
+                continue
+            products[name] = {
+                "name": name,
+                "pzn": str(row['pzn']) if row.get('pzn') is not None else None,
+                "price": row.get('price rec'),
+                "package_size": row.get('package size'),
+            }
+    return products
+
+
+def _read_inventory(path: str) -> Dict[str, dict]:
+    inventory = {}
+    if not os.path.exists(path):
+        return inventory
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            inventory[row['product name']] = {
+                "prescription_required": row['prescription_required'],
+                "stock_level": int(float(row['stock_level'])),
+            }
+    return inventory
+
+
+def build(products_path: str = PRODUCTS_XLSX, inventory_path: str = INVENTORY_CSV) -> dict:
+    """Merge the sources: export rows in file order, then names only the inventory CSV knows."""
+    products = _read_products(products_path)
+    inventory = _read_inventory(inventory_path)
+    records = []
+    for name in list(products) + [name for name in inventory if name not in products]:
+        record = dict(products.get(name) or {"name": name, "pzn": None, "price": None, "package_size": None})
+        stock = inventory.get(name)
+        record["listed"] = name in products
+        record["in_inventory"] = stock is not None
+        record["prescription_required"] = stock["prescription_required"] if stock else "No"
+        record["stock_level"] = stock["stock_level"] if stock else 100
+        records.append(record)
+    digest = hashlib.sha256(json.dumps(records, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return {"format": FORMAT_VERSION, "version": digest, "sources": [products_path, inventory_path], "records": records}
+
+
+def _slots(count: int) -> int:
+    # Power of two, at most half full
+    slots = 8
+    while slots < count * 2:
+        slots *= 2
+    return slots
+
+
+def _name_hash(encoded: bytes) -> int:
+    return zlib.crc32(encoded)
+
+
+def write(data: dict, path: str = CATALOGUE_PATH):
+    """Serialize build() output to path (atomically, so mapped readers keep the old file)."""
+    records = data["records"]
+    sources = json.dumps(data["sources"]).encode()
+    slots = _slots(len(records))
+    heap = bytearray()
+    strings: Dict[bytes, int] = {}
+
+    def string(value):
+        if value is None:
+            return 0, NO_STRING
+        encoded = str(value).encode()
+        if encoded not in strings:
+            strings[encoded] = len(heap)
+            heap.extend(encoded)
+        return strings[encoded], len(encoded)
+
+    # Names go first, so names() can decode them in one go
+    name_offsets = []
+    for record in records:
+        if "\0" in record["name"]:
+            raise ValueError(f"Product name contains a NUL character: {record['name']!r}")
+        if name_offsets:
+            heap += b"\0"
+        name_offsets.append(len(heap))
+        heap += record["name"].encode()
+    names_len = len(heap)
+
+    rows = bytearray()
+    index = [0] * slots
+    for number, record in enumerate(records):
+        name = record["name"].encode()
+        flags = (IN_INVENTORY if record["in_inventory"] else 0) | (LISTED if record.get("listed", True) else 0)
+        price = float(record["price"]) if record["price"] is not None else math.nan
+        rows += ROW.pack(name_offsets[number], len(name), *string(record["pzn"]), *string(record["package_size"]),
+                         *string(record["prescription_required"]), price, record["stock_level"], flags)
+        slot = _name_hash(name) & (slots - 1)
+        while index[slot]:
+            slot = (slot + 1) & (slots - 1)
+        index[slot] = number + 1
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(records), data["version"].encode(), len(sources), slots, names_len))
+        f.write(sources)
+        f.write(rows)
+        f.write(struct.pack(f"<{slots}I", *index))
+        f.write(heap)
+    os.replace(tmp, path)
+
+
+def _stale(path: str, sources: List[str]) -> bool:
+    try:
+        built = os.stat(path).st_mtime_ns
+    except OSError:
+        return True
+    return any(os.path.exists(source) and os.stat(source).st_mtime_ns > built for source in sources)
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class Catalogue:
+    """Read-only view over a mapped catalogue file; rows are decoded on access."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.stamp = _stamp(path)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is not a catalogue file")
+        magic, fmt, self._count, version, sources_len, self._slots, self._names_len = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a format {FORMAT_VERSION} catalogue file")
+        self.version = version.decode()
+        self.sources = json.loads(self._map[HEADER.size:HEADER.size + sources_len])
+        self._rows = HEADER.size + sources_len
+        self._index = self._rows + self._count * ROW.size
+        self._heap = self._index + self._slots * SLOT.size
+
+    def __len__(self):
+        return self._count
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        if length == NO_STRING:
+            return None
+        start = self._heap + offset
+        return self._map[start:start + length].decode()
+
+    def _row(self, number: int) -> tuple:
+        return ROW.unpack_from(self._map, self._rows + number * ROW.size)
+
+    def row(self, number: int) -> dict:
+        (name, name_len, pzn, pzn_len, size, size_len, rx, rx_len,
+         price, stock_level, flags) = self._row(number)
+        return {
+            "name": self._string(name, name_len),
+            "pzn": self._string(pzn, pzn_len),
+            "price": None if math.isnan(price) else price,
+            "package_size": self._string(size, size_len),
+            "listed": bool(flags & LISTED),
+            "in_inventory": bool(flags & IN_INVENTORY),
+            "prescription_required": self._string(rx, rx_len),
+            "stock_level": stock_level,
+        }
+
+    def find(self, name: str) -> Optional[int]:
+        """Row number for name, or None."""
+        encoded = name.encode()
+        mask = self._slots - 1
+        slot = _name_hash(encoded) & mask
+        while True:
+            (entry,) = SLOT.unpack_from(self._map, self._index + slot * SLOT.size)
+            if not entry:
+                return None
+            offset, length = self._row(entry - 1)[:2]
+            start = self._heap + offset
+            if length == len(encoded) and self._map[start:start + length] == encoded:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def get(self, name: str) -> Optional[dict]:
+        number = self.find(name)
+        return None if number is None else self.row(number)
+
+    def __contains__(self, name: str) -> bool:
+        return self.find(name) is not None
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self.row(number) for number in range(self._count))
+
+    @property
+    def records(self) -> List[dict]:
+        return list(self)
+
+    def names(self, in_inventory: bool = False, listed: bool = False) -> List[str]:
+        if not self._count:
+            return []
+        names = self._map[self._heap:self._heap + self._names_len].decode().split("\0")
+        required = (IN_INVENTORY if in_inventory else 0) | (LISTED if listed else 0)
+        if not required:
+            return names
+        # The flags byte of every row, as one strided slice
+        flags = self._map[self._rows + ROW.size - 1:self._index:ROW.size]
+        return [name for name, flag in zip(names, flags) if flag & required == required]
+
+
+def default_path(products_path: str = PRODUCTS_XLSX, inventory_path: str = INVENTORY_CSV) -> str:
+    """CATALOGUE_PATH for the default sources; a per-sources file in the temp directory otherwise."""
+    if (products_path, inventory_path) == (PRODUCTS_XLSX, INVENTORY_CSV):
+        return CATALOGUE_PATH
+    key = "|".join(os.path.abspath(p) for p in (products_path, inventory_path))
+    return os.path.join(tempfile.gettempdir(), f"catalogue-{hashlib.sha256(key.encode()).hexdigest()[:12]}.bin")
+
+
+def _open(path: str, sources: List[str]) -> Optional[Catalogue]:
+    """The artifact at path, unless it is missing, older than a source, built from other sources or another format."""
+    if _stale(path, sources):
+        return None
+    try:
+        opened = Catalogue(path)
+    except (OSError, ValueError):
+        return None
+    return opened if opened.sources == sources else None
+
+
+_loaded: Dict[str, Catalogue] = {}
+_lock = threading.Lock()
+
+
+def load(path: str = None, products_path: str = PRODUCTS_XLSX, inventory_path: str = INVENTORY_CSV) -> Catalogue:
+    """The catalogue for these sources, mapped once per process.
+
+    Each call re-stats the artifact and its sources: a newer source rebuilds it,
+    and a file replaced by another process is mapped again.
+    """
+    path = path or default_path(products_path, inventory_path)
+    sources = [products_path, inventory_path]
+    with _lock:
+        current = _loaded.get(path)
+        if current is not None and current.stamp == _stamp(current.path) and not _stale(current.path, sources):
+            return current
+        opened = _open(path, sources)
+        if opened is None:
+            data = build(products_path, inventory_path)
+            target = path
+            try:
+                write(data, target)
+            except OSError as e:
+                target = os.path.join(tempfile.gettempdir(), os.path.basename(path))
+                print(f"Catalogue artifact could not be written to {path} ({e}); using {target}.")
+                write(data, target)
+            opened = Catalogue(target)
+        # A replaced Catalogue is not closed here: other threads may still be reading it.
+        # Its map is released with the last reference.
+        _loaded[path] = opened
+        return opened
+
+
+if __name__ == "__main__":
+    data = build()
+    write(data)
+    print(f"Catalogue {data['version']}: {len(data['records'])} products written to {CATALOGUE_PATH}")
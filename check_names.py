@@ -1,12 +1,11 @@
-import pandas as pd
+import catalogue
 
 try:
-    df = pd.read_excel('db/products-export.xlsx')
+    products = catalogue.load()
     print("--- From Excel ---")
-    print(df['product name'].head(10).tolist())
+    print(products.names(listed=True)[:10])
     
-    df_csv = pd.read_csv('mock_inventory.csv')
     print("--- From CSV ---")
-    print(df_csv['product name'].head(10).tolist())
+    print(products.names(in_inventory=True)[:10])
 except Exception as e:
     print(e)
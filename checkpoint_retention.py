@@ -0,0 +1,201 @@
+import argparse
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every process runs the loop
+    fcntl = None
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+import db
+
+# Retention for the LangGraph SqliteSaver tables (checkpoints, writes).
+#  - threads whose latest status is a HOLD keep their full history (approve_hold resumes them)
+#  - every other thread is compacted to its latest checkpoint once idle for CHECKPOINT_GRACE_SECONDS
+#  - threads idle longer than CHECKPOINT_TTL_HOURS (holds: CHECKPOINT_HOLD_TTL_HOURS) are deleted
+# Work happens on its own WAL connection in short transactions, so request
+# handlers using the saver are never blocked for long. The background loop runs
+# in one process per database (an fcntl lock next to it), however many gunicorn
+# workers call start(). The one-off full VACUUM that switches an existing file to
+# incremental auto_vacuum locks the whole database, so it is never run in the
+# background; run `python checkpoint_retention.py --vacuum` in a maintenance window.
+
+CHECKPOINT_TTL_HOURS = float(os.getenv("CHECKPOINT_TTL_HOURS", "72"))
+CHECKPOINT_HOLD_TTL_HOURS = float(os.getenv("CHECKPOINT_HOLD_TTL_HOURS", str(24 * 30)))
+CHECKPOINT_GRACE_SECONDS = float(os.getenv("CHECKPOINT_GRACE_SECONDS", "300"))
+CHECKPOINT_RETENTION_INTERVAL = float(os.getenv("CHECKPOINT_RETENTION_INTERVAL", "900"))
+# PRESCRIPTION_MISSING orders wait for a pharmacist (main.py /admin/approve_hold)
+HOLD_STATUSES = ("hold", "PRESCRIPTION_MISSING")
+
+THREADS_PER_TRANSACTION = 200
+VACUUM_PAGES_PER_STEP = 2000
+
+
+class CheckpointRetention:
+    def __init__(self, path: str = db.CHECKPOINT_DB_PATH, ttl_hours: float = CHECKPOINT_TTL_HOURS,
+                 hold_ttl_hours: float = CHECKPOINT_HOLD_TTL_HOURS, grace_seconds: float = CHECKPOINT_GRACE_SECONDS,
+                 hold_statuses=HOLD_STATUSES):
+        self.path = path
+        self.ttl = timedelta(hours=ttl_hours)
+        self.hold_ttl = timedelta(hours=hold_ttl_hours)
+        self.grace = timedelta(seconds=grace_seconds)
+        self.hold_statuses = set(hold_statuses)
+        self.serde = JsonPlusSerializer()
+        self.last_report = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+
+    def _used_bytes(self, conn):
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size, page_count * page_size, free_pages, page_count
+
+    def _latest(self, conn, thread_id):
+        row = conn.execute(
+            "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+            "ORDER BY checkpoint_id DESC LIMIT 1", (thread_id,)).fetchone()
+        if row is None:
+            return None, None
+        checkpoint = self.serde.loads_typed((row[0], row[1]))
+        updated = datetime.fromisoformat(checkpoint['ts'])
+        return checkpoint.get('channel_values', {}).get('status'), updated
+
+    def _plan(self, conn, now):
+        """(threads to delete, threads to compact) based on each thread's latest checkpoint."""
+        expire, compact = [], []
+        threads = conn.execute("SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id").fetchall()
+        for thread_id, count in threads:
+            status, updated = self._latest(conn, thread_id)
+            if updated is None:
+                continue
+            idle = now - updated
+            if status in self.hold_statuses:
+                if idle > self.hold_ttl:
+                    expire.append(thread_id)
+            elif idle > self.ttl:
+                expire.append(thread_id)
+            elif count > 1 and idle > self.grace:
+                compact.append(thread_id)
+        return expire, compact
+
+    def _delete(self, conn, expire, compact):
+        checkpoints = writes = 0
+        for start in range(0, len(expire), THREADS_PER_TRANSACTION):
+            batch = [(t,) for t in expire[start:start + THREADS_PER_TRANSACTION]]
+            with conn:
+                checkpoints += conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", batch).rowcount
+                writes += conn.executemany("DELETE FROM writes WHERE thread_id = ?", batch).rowcount
+        for start in range(0, len(compact), THREADS_PER_TRANSACTION):
+            batch = [(t,) for t in compact[start:start + THREADS_PER_TRANSACTION]]
+            with conn:
+                # Everything older than the latest checkpoint of each namespace (the latest one holds the full state)
+                for table in ("checkpoints", "writes"):
+                    deleted = conn.executemany(f"""
+                    DELETE FROM {table} WHERE thread_id = ?1 AND checkpoint_id < (
+                        SELECT MAX(c.checkpoint_id) FROM checkpoints c
+                        WHERE c.thread_id = ?1 AND c.checkpoint_ns = {table}.checkpoint_ns
+                    )
+                    """, batch).rowcount
+                    if table == "checkpoints":
+                        checkpoints += deleted
+                    else:
+                        writes += deleted
+        return checkpoints, writes
+
+    def _vacuum(self, conn, full: bool = False):
+        # Incremental auto_vacuum returns free pages to the OS in short steps; files created
+        # without it need one full VACUUM first, which only an explicit maintenance run does
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if full:
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+            elif self._used_bytes(conn)[2]:
+                print("Checkpoint retention: free pages stay in the file until "
+                      "`python checkpoint_retention.py --vacuum` enables incremental vacuum.")
+            return
+        while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0 and not self._stop.is_set():
+            conn.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def run_once(self, now: Optional[datetime] = None, full_vacuum: bool = False) -> dict:
+        now = now or datetime.now(timezone.utc)
+        conn = db.connect(self.path)
+        try:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'checkpoints'").fetchone() is None:
+                return {}
+            used_before, file_before, _, _ = self._used_bytes(conn)
+            expire, compact = self._plan(conn, now)
+            checkpoints, writes = self._delete(conn, expire, compact)
+            self._vacuum(conn, full=full_vacuum)
+            used_after, file_after, _, _ = self._used_bytes(conn)
+        finally:
+            conn.close()
+
+        report = {
+            "threads_expired": len(expire),
+            "threads_compacted": len(compact),
+            "checkpoints_deleted": checkpoints,
+            "writes_deleted": writes,
+            "reclaimed_bytes": used_before - used_after,
+            "file_bytes_before": file_before,
+            "file_bytes_after": file_after,
+        }
+        self.last_report = report
+        print(f"Checkpoint retention: expired {len(expire)} threads, compacted {len(compact)}, "
+              f"deleted {checkpoints} checkpoints / {writes} writes, reclaimed {report['reclaimed_bytes'] / 1e6:.1f} MB "
+              f"(file {file_before / 1e6:.1f} -> {file_after / 1e6:.1f} MB)")
+        return report
+
+    # --- Background loop ---
+
+    def _loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Checkpoint retention failed: {e}")
+
+    def _acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        lock_file = open(f"{self.path}.retention.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def start(self, interval: float = CHECKPOINT_RETENTION_INTERVAL) -> bool:
+        """Start the background loop unless another process already runs it for this database."""
+        if not self._acquire():
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="checkpoint-retention", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lock_file is not None:
+            # Closing drops the lock, so another worker can take over
+            self._lock_file.close()
+            self._lock_file = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vacuum", action="store_true",
+                        help="full VACUUM to enable incremental vacuum (locks the database while it runs)")
+    args = parser.parse_args()
+    CheckpointRetention().run_once(full_vacuum=args.vacuum)
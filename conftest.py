@@ -0,0 +1,12 @@
+import pytest
+
+from benchmarks.moto_aws import mocked_aws
+
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    """moto-backed AWS for the test; yields a DynamoDB resource (other boto3 clients are mocked too)."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mocked_aws() as resource:
+        yield resource
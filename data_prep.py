@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 import re
 import sqlite3
-from datetime import timedelta, datetime
+from datetime import datetime
+
+from migrate_data import create_prediction_key_index
 
 DB_PATH = "pharmacy.db"
 CURRENT_DATE = datetime(2024, 3, 27)
@@ -15,73 +18,214 @@ def extract_unit_count(package_size):
     if match_num: return int(match_num.group(1))
     return 10
 
+DOSES_PER_DAY = {'Once daily': 1, 'Twice daily': 2, 'Three times daily': 3, 'As needed': 1}
+GROUP_KEYS = ['patient_id', 'product_name']
+
 def map_dosage(dosage_str):
-    mapping = {'Once daily': 1, 'Twice daily': 2, 'Three times daily': 3, 'As needed': 1}
-    return mapping.get(dosage_str, 1)
+    return DOSES_PER_DAY.get(dosage_str, 1)
+
+def purchase_stats(orders_df):
+    """Per (patient, product): last purchase, interval count/sum in days, and the last order's quantity and dosage."""
+    orders = orders_df.dropna(subset=GROUP_KEYS)
+    orders = orders.sort_values(GROUP_KEYS + ['purchase_date'], kind='mergesort')
+
+    # 1. Days between consecutive purchases of the same product by the same patient
+    orders['gap'] = orders.groupby(GROUP_KEYS, sort=False)['purchase_date'].diff().dt.days
+    intervals = orders.groupby(GROUP_KEYS, sort=False)['gap'].agg(['count', 'sum'])
+
+    # 2. The most recent order of every group carries the date, quantity and dosage used for the estimate
+    last = orders.drop_duplicates(GROUP_KEYS, keep='last').set_index(GROUP_KEYS)
+    intervals = intervals.reindex(last.index)
+    stats = pd.DataFrame({
+        'last_purchase': last['purchase_date'],
+        'interval_count': intervals['count'],
+        'interval_sum': intervals['sum'],
+        'last_quantity': last['quantity'],
+        'last_dosage': last['dosage_frequency'],
+    })
+    return stats.reset_index()
+
+def predict_refills(stats, products_df, current_date=CURRENT_DATE):
+    """Vectorized refill estimate and action for every row of purchase_stats()."""
+    unit_counts = products_df.drop_duplicates('name').set_index('name')['package_size'].map(extract_unit_count)
+    unit_count = stats['product_name'].map(unit_counts).fillna(10)
+    theoretical_days = (unit_count * stats['last_quantity']) / stats['last_dosage'].map(DOSES_PER_DAY).fillna(1)
+
+    # Use Observed Interval when there are repeat purchases (it accounts for 'As needed' behavior)
+    # We use a 70/30 weight towards observed behavior
+    observed = stats['interval_sum'] / stats['interval_count'].where(stats['interval_count'] > 0)
+    final_days_estimate = (0.7 * observed + 0.3 * theoretical_days).where(stats['interval_count'] > 0, theoretical_days)
+
+    predicted_date = stats['last_purchase'] + pd.to_timedelta(np.trunc(final_days_estimate), unit='D')
+    days_diff = (predicted_date - current_date).dt.days
+    action = np.select(
+        [days_diff < 0, days_diff <= 5],
+        ['OVERDUE - Trigger Outreach', 'Alert in ' + days_diff.astype(str) + ' days'],
+        'No action needed yet',
+    )
+
+    return pd.DataFrame({
+        'patient_id': stats['patient_id'],
+        'product_name': stats['product_name'],
+        'predicted_date': predicted_date.dt.strftime('%Y-%m-%d'),
+        'action': action,
+    })
+
+def compute_refill_predictions(orders_df, products_df, current_date=CURRENT_DATE):
+    orders_df = orders_df.assign(purchase_date=pd.to_datetime(orders_df['purchase_date']))
+    predictions = predict_refills(purchase_stats(orders_df), products_df, current_date)
+    return predictions[predictions['action'] != 'No action needed yet'].reset_index(drop=True)
+
+# --- Incremental Refill Engine ---
+# refill_stats keeps running per-(patient, product) statistics and
+# refill_engine_state the id of the last order folded into them, so a nightly
+# run only reads orders added since then and rewrites only their predictions.
+
+STATS_COLUMNS = ['patient_id', 'product_name', 'last_purchase', 'interval_count', 'interval_sum', 'last_quantity', 'last_dosage']
+ORDER_COLUMNS = "o.id, o.patient_id, o.product_name, o.purchase_date, o.quantity, o.dosage_frequency"
+
+def init_refill_state(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS refill_stats (
+        patient_id TEXT,
+        product_name TEXT,
+        last_purchase TEXT,
+        interval_count INTEGER,
+        interval_sum REAL,
+        last_quantity INTEGER,
+        last_dosage TEXT,
+        PRIMARY KEY (patient_id, product_name)
+    )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS refill_engine_state (key TEXT PRIMARY KEY, value TEXT)")
+    create_prediction_key_index(conn)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS refill_keys (patient_id TEXT, product_name TEXT)")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS refill_current (patient_id TEXT, product_name TEXT, PRIMARY KEY (patient_id, product_name))")
+
+def _rows(df, columns):
+    # tolist() hands sqlite3 plain Python scalars instead of numpy ones
+    return list(zip(*(df[c].tolist() for c in columns)))
+
+def _load_orders(conn, join_keys=False, after_id=None):
+    query = f"SELECT {ORDER_COLUMNS} FROM orders o"
+    params = ()
+    if join_keys:
+        query += " JOIN refill_keys k ON k.patient_id = o.patient_id AND k.product_name = o.product_name"
+    if after_id is not None:
+        query += " WHERE o.id > ?"
+        params = (after_id,)
+    orders_df = pd.read_sql_query(query + " ORDER BY o.id", conn, params=params)
+    orders_df['purchase_date'] = pd.to_datetime(orders_df['purchase_date'])
+    return orders_df
 
-def calculate_probabilistic_refills():
+def _set_affected_keys(conn, keys_df):
+    conn.execute("DELETE FROM refill_keys")
+    conn.executemany("INSERT INTO refill_keys (patient_id, product_name) VALUES (?, ?)", _rows(keys_df, GROUP_KEYS))
+
+def _high_water_mark(conn):
+    row = conn.execute("SELECT value FROM refill_engine_state WHERE key = 'last_order_id'").fetchone()
+    return int(row[0]) if row else None
+
+def _save(conn, stats, products_df, last_order_id, full):
+    predictions = predict_refills(stats, products_df)
+    predictions = predictions[predictions['action'] != 'No action needed yet']
+
+    # Predictions are updated in place rather than deleted and re-inserted, so an
+    # alert keeps its id across runs and the keyset cursor in refill_alerts holds
+    conn.execute("DELETE FROM refill_current")
+    conn.executemany("INSERT INTO refill_current (patient_id, product_name) VALUES (?, ?)", _rows(predictions, GROUP_KEYS))
+    stale = """
+    DELETE FROM refill_predictions WHERE NOT EXISTS (
+        SELECT 1 FROM refill_current c
+        WHERE c.patient_id = refill_predictions.patient_id AND c.product_name = refill_predictions.product_name
+    )
+    """
+    if full:
+        conn.execute("DELETE FROM refill_stats")
+        conn.execute(stale)
+    else:
+        conn.execute(stale + """
+        AND EXISTS (
+            SELECT 1 FROM refill_keys k
+            WHERE k.patient_id = refill_predictions.patient_id AND k.product_name = refill_predictions.product_name
+        )
+        """)
+
+    stats = stats.assign(last_purchase=stats['last_purchase'].astype(str))
+    conn.executemany(f"""
+    INSERT OR REPLACE INTO refill_stats ({', '.join(STATS_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, _rows(stats, STATS_COLUMNS))
+    conn.executemany("""
+    INSERT INTO refill_predictions (patient_id, product_name, predicted_date, action)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (patient_id, product_name) DO UPDATE SET predicted_date = excluded.predicted_date, action = excluded.action
+    """, _rows(predictions, ['patient_id', 'product_name', 'predicted_date', 'action']))
+    conn.execute("INSERT OR REPLACE INTO refill_engine_state (key, value) VALUES ('last_order_id', ?)", (str(last_order_id),))
+    return len(predictions)
+
+def fold_new_orders(old_stats, new_orders):
+    """Combine stored stats with orders that all come after the stored last purchase."""
+    new_stats = purchase_stats(new_orders)
+    first_new = new_orders.groupby(GROUP_KEYS)['purchase_date'].min().rename('first_new').reset_index()
+    merged = new_stats.merge(first_new, on=GROUP_KEYS).merge(old_stats, on=GROUP_KEYS, how='left', suffixes=('', '_old'))
+
+    has_old = merged['last_purchase_old'].notna()
+    # The gap from the previously stored last purchase to the first new one is one more interval
+    bridge = (merged['first_new'] - merged['last_purchase_old']).dt.days
+    merged['interval_count'] = merged['interval_count'] + merged['interval_count_old'].fillna(0).astype(int) + has_old.astype(int)
+    merged['interval_sum'] = merged['interval_sum'] + merged['interval_sum_old'].fillna(0) + bridge.fillna(0)
+    return merged[STATS_COLUMNS]
+
+def calculate_probabilistic_refills(full=False):
     conn = sqlite3.connect(DB_PATH)
-    
-    # Load orders and products
-    orders_df = pd.read_sql_query("SELECT * FROM orders", conn)
+    init_refill_state(conn)
     products_df = pd.read_sql_query("SELECT name, package_size FROM products", conn)
-    
-    orders_df['purchase_date'] = pd.to_datetime(orders_df['purchase_date'])
-    
-    # 1. Group by patient and product to find intervals
-    predictions = []
-    
-    for (pid, pname), group in orders_df.groupby(['patient_id', 'product_name']):
-        group = group.sort_values('purchase_date')
-        last_order = group.iloc[-1]
-        
-        # Get product details
-        p_info = products_df[products_df['name'] == pname].iloc[0]
-        unit_count = extract_unit_count(p_info['package_size'])
-        theoretical_dosage = map_dosage(last_order['dosage_frequency'])
-        theoretical_days = (unit_count * last_order['quantity']) / theoretical_dosage
-        
-        # Calculate Observed Interval if multiple orders exist
-        if len(group) > 1:
-            # Average days between purchases
-            intervals = group['purchase_date'].diff().dt.days.dropna()
-            avg_observed_interval = intervals.mean()
-            
-            # Use Observed Interval (it accounts for 'As needed' behavior)
-            # We use a 70/30 weight towards observed behavior
-            final_days_estimate = (0.7 * avg_observed_interval) + (0.3 * theoretical_days)
-            logic_used = "Probabilistic (Observed Behavior)"
-        else:
-            final_days_estimate = theoretical_days
-            logic_used = "Theoretical (Fixed Dosage)"
-            
-        predicted_date = last_order['purchase_date'] + timedelta(days=int(final_days_estimate))
-        
-        # Determine Action
-        days_diff = (predicted_date - CURRENT_DATE).days
-        if days_diff < 0: action = 'OVERDUE - Trigger Outreach'
-        elif days_diff <= 5: action = f'Alert in {days_diff} days'
-        else: action = 'No action needed yet'
-        
-        if action != 'No action needed yet':
-            predictions.append({
-                'patient_id': pid,
-                'product_name': pname,
-                'predicted_date': str(predicted_date.date()),
-                'action': action
-            })
-
-    # Save to Database
-    conn.execute("DELETE FROM refill_predictions")
-    for pred in predictions:
-        conn.execute("""
-        INSERT INTO refill_predictions (patient_id, product_name, predicted_date, action)
-        VALUES (?, ?, ?, ?)
-        """, (pred['patient_id'], pred['product_name'], pred['predicted_date'], pred['action']))
-    
+    last_order_id = _high_water_mark(conn)
+
+    if full or last_order_id is None:
+        # Full rebuild over the entire order history
+        orders_df = _load_orders(conn)
+        stats = purchase_stats(orders_df)
+        alerts = _save(conn, stats, products_df, orders_df['id'].max() if len(orders_df) else 0, full=True)
+        conn.commit()
+        conn.close()
+        print(f"Probabilistic Refill Engine complete. Processed {alerts} alerts.")
+        return
+
+    # Incremental: only orders past the high-water mark
+    new_orders = _load_orders(conn, after_id=last_order_id)
+    if new_orders.empty:
+        conn.close()
+        print("Probabilistic Refill Engine: no new orders.")
+        return
+
+    _set_affected_keys(conn, new_orders[GROUP_KEYS].drop_duplicates())
+    old_stats = pd.read_sql_query("""
+    SELECT s.* FROM refill_stats s
+    JOIN refill_keys k ON k.patient_id = s.patient_id AND k.product_name = s.product_name
+    """, conn)
+    old_stats['last_purchase'] = pd.to_datetime(old_stats['last_purchase'])
+
+    # Orders dated before the stored last purchase (back-filled history) invalidate the running
+    # intervals, so those keys are recomputed from their own full history
+    first_new = new_orders.groupby(GROUP_KEYS)['purchase_date'].min().rename('first_new').reset_index()
+    check = first_new.merge(old_stats[GROUP_KEYS + ['last_purchase']], on=GROUP_KEYS)
+    backdated = check.loc[check['first_new'] < check['last_purchase'], GROUP_KEYS]
+
+    in_order = new_orders.merge(backdated, on=GROUP_KEYS, how='left', indicator=True)
+    in_order = in_order[in_order['_merge'] == 'left_only'].drop(columns='_merge')
+    stats = fold_new_orders(old_stats, in_order)
+
+    if not backdated.empty:
+        _set_affected_keys(conn, backdated)
+        stats = pd.concat([stats, purchase_stats(_load_orders(conn, join_keys=True))], ignore_index=True)
+
+    _set_affected_keys(conn, new_orders[GROUP_KEYS].drop_duplicates())
+    alerts = _save(conn, stats, products_df, int(new_orders['id'].max()), full=False)
     conn.commit()
     conn.close()
-    print(f"Probabilistic Refill Engine complete. Processed {len(predictions)} alerts.")
+    print(f"Probabilistic Refill Engine complete. Updated {len(stats)} patient/product pairs from {len(new_orders)} new orders ({alerts} alerts).")
 
 if __name__ == "__main__":
-    calculate_probabilistic_refills()
+    import sys
+    calculate_probabilistic_refills(full="--full" in sys.argv)
@@ -0,0 +1,79 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = os.getenv("DB_PATH", "pharmacy.db")
+# Set to a different file to keep LangGraph checkpoints from contending with the refill tables
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", DB_PATH)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+# sqlite3 keeps this many prepared statements per connection, keyed by SQL text
+STATEMENT_CACHE_SIZE = 256
+
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    """A connection in WAL mode (readers never block the writer) with a busy timeout instead of 'database is locked'."""
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ConnectionPool:
+    """Fixed-size pool of configured connections, safe to share across threads.
+
+    Connections are opened lazily and reused, so the per-connection statement
+    cache keeps the hot queries prepared between requests. A borrower that
+    leaves a transaction open has it rolled back on return.
+    """
+
+    def __init__(self, path: str = DB_PATH, size: int = DB_POOL_SIZE, timeout: float = 30.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return connect(self.path)
+                except Exception:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No SQLite connection free after {self.timeout}s (pool size {self.size})")
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._lock:
+                self._opened -= 1
@@ -0,0 +1,99 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from product_index import DOSAGE_RE
+
+# Tier 1 of intake: regex + fuzzy match, no LLM. A request takes this path only
+# when everything is unambiguous: exactly one patient id, a top product score of
+# at least INTAKE_FAST_PATH_SCORE that beats the runner-up by INTAKE_FAST_PATH_MARGIN,
+# no other product scoring INTAKE_FAST_PATH_OTHER_SCORE or more, no negation or
+# cancel wording, at most one stated quantity and no other stray numbers. Anything
+# else goes to Groq. Set INTAKE_FAST_PATH_SCORE above 100 to send everything to Groq.
+
+FAST_PATH_SCORE = float(os.getenv("INTAKE_FAST_PATH_SCORE", "90"))
+FAST_PATH_MARGIN = float(os.getenv("INTAKE_FAST_PATH_MARGIN", "10"))
+FAST_PATH_OTHER_SCORE = float(os.getenv("INTAKE_FAST_PATH_OTHER_SCORE", "85"))
+
+PATIENT_RE = re.compile(r'PAT\d+', re.IGNORECASE)
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+    'a couple of': 2, 'ein': 1, 'eine': 1, 'zwei': 2, 'drei': 3, 'vier': 4, 'fünf': 5,
+}
+_NUMBER = r'(\d+|' + '|'.join(sorted(map(re.escape, NUMBER_WORDS), key=len, reverse=True)) + r')'
+_PACKS = r'(?:packs?|packages?|packets?|boxes|box|bottles?|tubes?|units?|pieces?|pcs|packungen?|packung|schachteln?|flaschen?|stück)'
+# A number not glued to a word or hyphen, so "Omega-3" or "B12" never reads as a quantity
+_FREE = r'(?<![\w-])'
+QUANTITY_PATTERNS = [
+    re.compile(rf'{_FREE}{_NUMBER}\s*{_PACKS}\b', re.IGNORECASE),  # "2 packs", "two bottles"
+    re.compile(rf'{_FREE}[x×]\s*(\d+)\b', re.IGNORECASE),  # "x3"
+    re.compile(rf'{_FREE}(\d+)\s*[x×](?!\w)', re.IGNORECASE),  # "3x", "3 x"
+    re.compile(r'\b(?:qty|quantity|menge)\s*[:=]?\s*(\d+)\b', re.IGNORECASE),  # "qty: 2"
+]
+_DIGITS_RE = re.compile(r'\d+')
+# "I do NOT want X, I want Y", "cancel my X order": the best match is not what should be ordered
+NEGATION_RE = re.compile(
+    r"\b(?:not|dont|no longer|never|cancel\w*|instead|rather|stop|nicht|kein\w*|storn\w*|statt|anstatt)\b|n['’]t\b",
+    re.IGNORECASE,
+)
+
+
+def _to_int(value: str) -> int:
+    value = value.lower()
+    return NUMBER_WORDS[value] if value in NUMBER_WORDS else int(value)
+
+
+def find_patients(text: str) -> List[str]:
+    return sorted({match.upper() for match in PATIENT_RE.findall(text)})
+
+
+def find_quantities(text: str) -> Tuple[List[int], str]:
+    """Quantities stated in the request, and the text left once they (and patient ids / strengths) are removed."""
+    rest = DOSAGE_RE.sub(' ', PATIENT_RE.sub(' ', text))
+    quantities = []
+    for pattern in QUANTITY_PATTERNS:
+        quantities.extend(_to_int(match.group(1)) for match in pattern.finditer(rest))
+        rest = pattern.sub(' ', rest)
+    return quantities, rest
+
+
+def parse_quantity(text: str, default: int = 1) -> Optional[int]:
+    """The stated quantity, default when none is given, None when the request states several."""
+    quantities = set(find_quantities(text)[0])
+    if len(quantities) > 1:
+        return None
+    return quantities.pop() if quantities else default
+
+
+def fast_path(text: str, matches: List[Tuple[str, float]], threshold: Optional[float] = None,
+              margin: Optional[float] = None, other_score: Optional[float] = None) -> Tuple[Optional[dict], str]:
+    """(extraction, reason). extraction is None when the request has to go to the LLM; reason says why."""
+    threshold = FAST_PATH_SCORE if threshold is None else threshold
+    margin = FAST_PATH_MARGIN if margin is None else margin
+    other_score = FAST_PATH_OTHER_SCORE if other_score is None else other_score
+    negation = NEGATION_RE.search(text)
+    if negation:
+        return None, f"negation or cancel wording '{negation.group(0)}'"
+    patients = find_patients(text)
+    if len(patients) != 1:
+        return None, "no patient id" if not patients else "several patient ids"
+    if not matches or matches[0][1] < threshold:
+        score = matches[0][1] if matches else 0
+        return None, f"best product match {score:.0f}% is below {threshold:.0f}%"
+    product, score = matches[0]
+    if len(matches) > 1 and score - matches[1][1] < margin:
+        return None, f"'{product}' and '{matches[1][0]}' match almost equally"
+    others = [name for name, other in matches[1:] if other >= other_score]
+    if others:
+        return None, f"'{others[0]}' is mentioned as well"
+
+    quantities, rest = find_quantities(text)
+    if len(set(quantities)) > 1:
+        return None, "several quantities"
+    # Numbers left over are either part of the product name or something we cannot interpret
+    product_numbers = set(_DIGITS_RE.findall(product))
+    stray = [n for n in _DIGITS_RE.findall(rest) if n not in product_numbers]
+    if stray:
+        return None, f"unexplained number {stray[0]}"
+    return {"patient_id": patients[0], "product_id": product, "quantity": quantities[0] if quantities else 1}, f"matched {score:.0f}%"
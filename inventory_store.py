@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, Optional
+
+from botocore.exceptions import ClientError
+
+import catalogue
+import db
+import tracing
+
+# Units taken from the CSV fallback, in a SQLite file shared by every worker process
+# on the host (default: beside the CSV, "<csv>.taken.db")
+TAKEN_PATH = os.getenv("INVENTORY_TAKEN_PATH")
+
+
+class ItemNotFound(Exception):
+    pass
+
+
+class InsufficientStock(Exception):
+    def __init__(self, available: int):
+        super().__init__(f"Insufficient stock. Available: {available}")
+        self.available = available
+
+
+class InventoryRepository:
+    """Single access point for inventory reads and stock updates.
+
+    DynamoDB is the source of truth. get_item results are cached for a short
+    TTL and dropped on every update made through this repository. The local
+    CSV fallback is read through the shared catalogue artifact (catalogue.py),
+    remapped only when the CSV's mtime changes. Stock taken locally is kept as
+    per-product amounts subtracted from whatever level the CSV has, so a reload
+    (e.g. data_prep rewriting the file) never hands it back. Those amounts live
+    in SQLite and are checked and updated under BEGIN IMMEDIATE, so gunicorn
+    workers on one host cannot oversell the fallback between them either.
+    """
+
+    def __init__(self, table=None, csv_path: str = "mock_inventory.csv", cache_ttl: float = 2.0,
+                 reload_check_interval: float = 1.0, taken_path: Optional[str] = None):
+        self.table = table
+        self.csv_path = csv_path
+        self.taken_path = taken_path or TAKEN_PATH or f"{csv_path}.taken.db"
+        self.cache_ttl = cache_ttl
+        self.reload_check_interval = reload_check_interval
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._local: Optional[catalogue.Catalogue] = None
+        self._taken_conn = None
+        self._local_mtime = None
+        self._last_reload_check = 0.0
+        self._cache: Dict[str, tuple] = {}
+
+    # --- Local CSV store ---
+
+    def _load_local(self):
+        return catalogue.load(inventory_path=self.csv_path)
+
+    def _refresh_local(self):
+        if self._local_mtime is not None and time.monotonic() - self._last_reload_check < self.reload_check_interval:
+            return
+        # Concurrent callers wait here for the first load instead of reading an empty store
+        with self._reload_lock:
+            if self._local_mtime is not None and time.monotonic() - self._last_reload_check < self.reload_check_interval:
+                return
+            self._last_reload_check = time.monotonic()
+            try:
+                mtime = os.stat(self.csv_path).st_mtime_ns
+            except OSError:
+                return
+            if mtime != self._local_mtime:
+                local = self._load_local()
+                with self._lock:
+                    self._local = local
+                    self._local_mtime = mtime
+
+    def _taken_db(self):
+        # Opened on first fallback use; callers hold self._lock
+        if self._taken_conn is None:
+            conn = db.connect(self.taken_path)
+            conn.execute("CREATE TABLE IF NOT EXISTS taken (product_id TEXT PRIMARY KEY, quantity INTEGER NOT NULL)")
+            conn.commit()
+            self._taken_conn = conn
+        return self._taken_conn
+
+    def _local_item(self, product_id: str) -> Optional[dict]:
+        record = self._local.get(product_id) if self._local is not None else None
+        if record is None or not record["in_inventory"]:
+            return None
+        row = self._taken_db().execute("SELECT quantity FROM taken WHERE product_id = ?", (product_id,)).fetchone()
+        return {
+            "product_id": product_id,
+            "prescription_required": record["prescription_required"],
+            "stock_level": max(0, record["stock_level"] - (row[0] if row else 0)),
+        }
+
+    def get_local(self, product_id: str) -> Optional[dict]:
+        self._refresh_local()
+        with self._lock:
+            return self._local_item(product_id)
+
+    # --- DynamoDB with TTL cache ---
+
+    def _get_remote(self, product_id: str):
+        if self.cache_ttl > 0:
+            cached = self._cache.get(product_id)
+            hit = bool(cached and cached[1] > time.monotonic())
+            tracing.record_cache("inventory", hit)
+            if hit:
+                return cached[0]
+        with tracing.span("dynamodb.get_item"):
+            response = self.table.get_item(Key={'product_id': product_id})
+        item = response.get('Item')
+        if self.cache_ttl > 0:
+            self._cache[product_id] = (item, time.monotonic() + self.cache_ttl)
+        return item
+
+    def invalidate(self, product_id: str = None):
+        if product_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(product_id, None)
+
+    def get(self, product_id: str) -> Optional[dict]:
+        if self.table is not None:
+            try:
+                item = self._get_remote(product_id)
+                if item:
+                    return item
+            except Exception as e:
+                print(f"DynamoDB Access Error: {e}. Falling back to CSV.")
+        return self.get_local(product_id)
+
+    def decrement_stock(self, product_id: str, quantity: int) -> int:
+        """Atomically take `quantity` units and return the remaining stock.
+
+        DynamoDB does the check and the decrement in one conditional ADD, so
+        parallel orders can never oversell and no prior read is needed.
+        Raises ItemNotFound or InsufficientStock.
+        """
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+
+        if self.table is not None:
+            try:
+                response = self.table.update_item(
+                    Key={'product_id': product_id},
+                    UpdateExpression="ADD stock_level :neg",
+                    ConditionExpression="attribute_exists(product_id) AND stock_level >= :q",
+                    ExpressionAttributeValues={':neg': Decimal(-quantity), ':q': Decimal(quantity)},
+                    ReturnValues="UPDATED_NEW",
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                )
+                self.invalidate(product_id)
+                return int(response['Attributes']['stock_level'])
+            except ClientError as e:
+                self.invalidate(product_id)
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    print(f"DynamoDB Update Error: {e}. Updating local stock.")
+                elif e.response.get('Item'):
+                    # Condition failed on an existing item: not enough stock
+                    raise InsufficientStock(int(e.response['Item'].get('stock_level', {}).get('N', 0)))
+                # Otherwise the product is not in DynamoDB; the CSV fallback may still carry it
+            except Exception as e:
+                print(f"DynamoDB Update Error: {e}. Updating local stock.")
+
+        self._refresh_local()
+        with self._lock:
+            conn = self._taken_db()
+            # Takes the write lock before reading, so other processes wait instead of reading the same level
+            conn.execute("BEGIN IMMEDIATE")
+            with conn:
+                item = self._local_item(product_id)
+                if item is None:
+                    raise ItemNotFound(product_id)
+                if item['stock_level'] < quantity:
+                    raise InsufficientStock(item['stock_level'])
+                conn.execute("""
+                INSERT INTO taken (product_id, quantity) VALUES (?, ?)
+                ON CONFLICT (product_id) DO UPDATE SET quantity = quantity + excluded.quantity
+                """, (product_id, quantity))
+            return item['stock_level'] - quantity
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+
+def normalize_request(text: str) -> str:
+    """Cache key text: case, punctuation and spacing differences do not change the extraction."""
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    return ' '.join(text.split())
+
+
+# --- Cache Tiers ---
+
+class MemoryCache:
+    """Thread-safe in-process LRU with per-entry TTL."""
+    name = "memory"
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, version: str = ""):
+        with self._lock:
+            self._data[key] = (value, time.time() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def purge(self, version: str = ""):
+        # Keys already embed the catalogue version, so a stale version means nothing is reusable
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache:
+    """Persistent tier shared by every worker on the host."""
+    name = "sqlite"
+
+    def __init__(self, path: str = "llm_cache.db", ttl: float = 86400, max_rows: int = 100_000):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            version TEXT,
+            expires_at REAL,
+            last_used REAL
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value, version: str = ""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, version, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), version, now + self.ttl, now),
+            )
+            # LRU eviction once the table outgrows its cap (checked every 100 writes)
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """, (self.max_rows,))
+            self._conn.commit()
+
+    def purge(self, version: str = ""):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE version != ? OR expires_at < ?", (version, time.time()))
+            self._conn.commit()
+
+
+# --- Catalogue Versioning ---
+
+def file_fingerprint(path: str) -> str:
+    try:
+        st = os.stat(path)
+        return f"{path}:{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        return f"{path}:missing"
+
+
+class CatalogueVersion:
+    """Hash of everything the intake prompt depends on: the product names and the inventory CSV (re-stat'ed on every call)."""
+
+    def __init__(self, product_names: List[str], csv_path: str = "mock_inventory.csv"):
+        self.names_digest = hashlib.sha256("\n".join(product_names).encode()).hexdigest()
+        self.csv_path = csv_path
+
+    def current(self) -> str:
+        raw = f"{self.names_digest}|{file_fingerprint(self.csv_path)}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+# --- Response Cache ---
+
+class ResponseCache:
+    """Tiered read-through cache for LLM extractions keyed by request text + catalogue version."""
+
+    def __init__(self, tiers: List, version_fn: Callable[[], str] = lambda: ""):
+        self.tiers = tiers
+        self.version_fn = version_fn
+        self.hits = {tier.name: 0 for tier in tiers}
+        self.misses = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _key(self, text: str, version: str) -> str:
+        return hashlib.sha256(f"{version}|{normalize_request(text)}".encode()).hexdigest()
+
+    def _check_version(self) -> str:
+        version = self.version_fn()
+        if version != self._version:
+            with self._lock:
+                for tier in self.tiers:
+                    tier.purge(version)
+                self._version = version
+        return version
+
+    def get(self, text: str) -> Optional[dict]:
+        version = self._check_version()
+        key = self._key(text, version)
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                # Promote into the faster tiers in front of the one that hit
+                for faster in self.tiers[:i]:
+                    faster.set(key, value, version)
+                with self._lock:
+                    self.hits[tier.name] += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, text: str, value: dict):
+        version = self._check_version()
+        key = self._key(text, version)
+        for tier in self.tiers:
+            tier.set(key, value, version)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = dict(self.hits), self.misses
+        total = sum(hits.values()) + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (sum(hits.values()) / total) if total else 0.0,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one call of fn."""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], dict]):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if leader:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+        return future.result()
+
+
+def build_cache_from_env(version_fn: Callable[[], str]) -> Optional[ResponseCache]:
+    """LLM_CACHE_BACKEND is 'memory', 'sqlite', 'memory+sqlite' or 'off'."""
+    backend = os.getenv("LLM_CACHE_BACKEND", "memory")
+    if backend == "off":
+        return None
+    ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    tiers = []
+    if "memory" in backend:
+        tiers.append(MemoryCache(max_size=int(os.getenv("LLM_CACHE_SIZE", "1024")), ttl=ttl))
+    if "sqlite" in backend:
+        tiers.append(SQLiteCache(path=os.getenv("LLM_CACHE_PATH", "llm_cache.db"), ttl=ttl))
+    return ResponseCache(tiers, version_fn)
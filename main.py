@@ -1,20 +1,37 @@
 import sqlite3
-from fastapi import FastAPI, HTTPException
+import json
+from datetime import date
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 import os
-import operator
-from typing import TypedDict, Annotated, List, Optional
-from langgraph.graph import StateGraph, END
+from typing import Optional
 from langgraph.checkpoint.sqlite import SqliteSaver
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
 
 from dotenv import load_dotenv
+import backend_client
+import db
+import orchestrator
+import tracing
+from checkpoint_retention import CheckpointRetention, HOLD_STATUSES
+from migrate_data import create_indexes
+from refill_alerts import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, iter_alerts
 
 load_dotenv()
 
-DB_PATH = os.getenv("DB_PATH", "pharmacy.db")
+DB_PATH = db.DB_PATH
+
+# Shared WAL-mode connections for request handlers (see db.py)
+pool = db.ConnectionPool(DB_PATH)
+
+# Storage the graph's nodes use. This app serves no /inventory or /order/execute routes,
+# so by default nodes call the server.py storage functions in this process;
+# BACKEND_MODE=http sends them to a separately running server.py at API_BASE_URL.
+BACKEND_MODE = os.getenv("BACKEND_MODE", "inprocess")
+
+def graph_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id, "backend": backend_client.get_backend(BACKEND_MODE)}}
 
 # --- Structured Output Schema ---
 class ExtractedOrder(BaseModel):
@@ -22,6 +39,15 @@ class ExtractedOrder(BaseModel):
     product_name: str = Field(description="The name of the medicine requested")
     quantity: int = Field(default=1, description="The number of units requested")
 
+class OrderRequest(BaseModel):
+    message: str
+    patient_id: Optional[str] = None
+    thread_id: Optional[str] = None
+
+class ApprovalRequest(BaseModel):
+    thread_id: str
+    admin_notes: str = ""
+
 from contextlib import asynccontextmanager
 
 # --- Global Graph Variable ---
@@ -30,68 +56,99 @@ app_graph = None
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global app_graph
+    # Indexes behind the /admin/proactive_refills filters (no-op once they exist)
+    try:
+        with pool.connection() as conn:
+            create_indexes(conn)
+    except sqlite3.OperationalError as e:
+        print(f"Index setup skipped: {e}")
     # PERSISTENCE LAYER: Uses SQLite to store checkpointers
-    # Note: Using the context manager to ensure the connection is handled correctly
-    with SqliteSaver.from_conn_string(DB_PATH) as memory:
-        app_graph = workflow.compile(checkpointer=memory)
+    # WAL + busy timeout; CHECKPOINT_DB_PATH can move checkpoints to their own file
+    checkpoint_conn = db.connect(db.CHECKPOINT_DB_PATH)
+    # Compacts finished threads, expires old ones and vacuums in the background (see checkpoint_retention.py)
+    retention = CheckpointRetention(db.CHECKPOINT_DB_PATH)
+    try:
+        # Same agent graph as the Streamlit portal (orchestrator.py), checkpointed per thread_id
+        app_graph = orchestrator.build_workflow().compile(checkpointer=SqliteSaver(checkpoint_conn))
+        if not retention.start():
+            print("Checkpoint retention already runs in another worker.")
         yield
+    finally:
+        retention.stop()
+        checkpoint_conn.close()
+        pool.close()
 
 app = FastAPI(title="Sovereign Pharmacist API (Persistent & HIL)", lifespan=lifespan)
 
+# Graph runs are blocking (LLM + SQLite checkpoint writes), so these handlers are sync and run in the threadpool
 @app.post("/agent/order")
-async def process_order(order: OrderRequest):
+def process_order(order: OrderRequest):
     thread_id = order.thread_id or f"order_{os.urandom(4).hex()}"
-    config = {"configurable": {"thread_id": thread_id}}
+    config = graph_config(thread_id)
     
-    initial_state = {
-        "input_text": order.message,
-        "patient_id": order.patient_id,
-        "product_name": None,
-        "quantity": 1,
-        "status": "pending",
-        "reason": "",
-        "agent_thought": []
-    }
-    
-    result = app_graph.invoke(initial_state, config=config)
+    # Intake reads the patient id from the text, so a separately passed one is prepended
+    message = f"{order.patient_id}: {order.message}" if order.patient_id else order.message
+    result = app_graph.invoke(orchestrator.initial_state(message), config=config)
     
     return {
         "thread_id": thread_id,
         "status": result["status"],
-        "reason": result.get("reason", ""),
-        "agent_thought": result["agent_thought"]
+        "reason": result["cot_logic"][-1] if result["cot_logic"] else "",
+        "agent_thought": result["cot_logic"]
     }
 
 @app.post("/admin/approve_hold")
-async def approve_hold(req: ApprovalRequest):
-    """Sovereign Human-in-the-Loop: Pharmacist manually approves a 'HOLD' state."""
-    config = {"configurable": {"thread_id": req.thread_id}}
+def approve_hold(req: ApprovalRequest):
+    """Sovereign Human-in-the-Loop: Pharmacist manually approves a held order (e.g. PRESCRIPTION_MISSING)."""
+    config = graph_config(req.thread_id)
     
     # 1. Fetch current state
     state = app_graph.get_state(config)
-    if not state.values or state.values.get("status") != "hold":
+    if not state.values or state.values.get("status") not in HOLD_STATUSES:
         raise HTTPException(status_code=400, detail="No active HOLD order found for this thread.")
     
-    # 2. Force status to 'approved' and continue
-    app_graph.update_state(config, {"status": "approved", "agent_thought": [f"Pharmacist: {req.admin_notes}"]}, as_node="validator")
+    # 2. Clear the safety check as the pharmacist and continue
+    cot_logic = state.values["cot_logic"] + [f"Pharmacist: {req.admin_notes}"]
+    app_graph.update_state(config, {"status": "SAFETY_CLEARED", "cot_logic": cot_logic}, as_node="safety")
     
     # 3. Resume execution from the next node (Action)
     result = app_graph.invoke(None, config=config)
     
     return {
         "status": result["status"],
-        "agent_thought": result["agent_thought"]
+        "agent_thought": result["cot_logic"]
     }
 
+def stream_alerts(filters: dict):
+    with pool.connection() as conn:
+        for row in iter_alerts(conn, **filters):
+            yield json.dumps(row) + "\n"
+
 @app.get("/admin/proactive_refills")
-async def get_proactive_refills():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT patient_id as 'Patient ID', product_name as 'Product Name', predicted_date as 'Predicted Refill Date', action as 'Action' FROM refill_predictions")
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+def get_proactive_refills(
+    cursor: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    action_type: Optional[str] = Query(None, pattern="^(overdue|alert)$"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    patient_id: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """Refill alerts, `limit` per page; pass the returned `next_cursor` back as `cursor` for the next page.
+
+    format=ndjson streams every matching alert (filters apply, pagination does not).
+    """
+    filters = {"action_type": action_type, "date_from": date_from, "date_to": date_to, "patient_id": patient_id}
+    if format == "ndjson":
+        return StreamingResponse(stream_alerts(filters), media_type="application/x-ndjson")
+
+    with pool.connection() as conn:
+        return fetch_page(conn, cursor, limit, **filters)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: the agent graph (nodes, Groq, RapidFuzz) runs in this process."""
+    return PlainTextResponse(tracing.render_metrics(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
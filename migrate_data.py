@@ -1,10 +1,13 @@
 import sqlite3
-import pandas as pd
 import os
+from openpyxl import load_workbook
+
+import catalogue
 
 DB_PATH = "pharmacy.db"
+CHUNK_SIZE = int(os.getenv("MIGRATE_CHUNK_SIZE", "50000"))
 
-def init_db():
+def init_db(with_indexes=True):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
@@ -47,41 +50,84 @@ def init_db():
     """)
 
     conn.commit()
+    if with_indexes:
+        create_indexes(conn)
     return conn
 
-def migrate_data():
-    conn = init_db()
-    
-    # Load raw data from Excel/CSV
-    products_df = pd.read_excel('db/products-export.xlsx')
-    history_df = pd.read_excel('db/Consumer Order History 1.xlsx', header=4)
-    
-    # Clean and Insert Products
-    # Map 'prescription_required' from the history file or default to No
-    # For simplicity, we merge to get the Rx flag for each product
-    rx_map = history_df[['Product Name', 'Prescription Required']].drop_duplicates()
-    
-    for _, row in products_df.iterrows():
-        rx_req = rx_map[rx_map['Product Name'] == row['product name']]['Prescription Required'].values
-        rx_val = rx_req[0] if len(rx_req) > 0 else 'No'
-        
-        try:
-            conn.execute("""
-            INSERT INTO products (name, pzn, price, package_size, prescription_required)
+def create_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_patient_product_date ON orders (patient_id, product_name, purchase_date)")
+    # Filters of /admin/proactive_refills (refill_alerts.py)
+    create_prediction_key_index(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_refill_predictions_action ON refill_predictions (action)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_refill_predictions_date ON refill_predictions (predicted_date)")
+    conn.commit()
+
+def create_prediction_key_index(conn):
+    """One prediction per (patient, product): data_prep upserts on this key, so a row keeps its id (the alerts cursor)."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_refill_predictions_unique_key'").fetchone():
+        return
+    # Databases from before the index may hold duplicate keys; keep the newest row of each
+    conn.execute("DELETE FROM refill_predictions WHERE id NOT IN (SELECT MAX(id) FROM refill_predictions GROUP BY patient_id, product_name)")
+    conn.execute("CREATE UNIQUE INDEX idx_refill_predictions_unique_key ON refill_predictions (patient_id, product_name)")
+    conn.execute("DROP INDEX IF EXISTS idx_refill_predictions_key")
+
+def iter_excel_chunks(path, header_row=0, chunk_size=CHUNK_SIZE):
+    """Stream a sheet as lists of row dicts keyed by the header, without loading the whole workbook."""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        # Exports often carry no (or a wrong) dimension tag; without this openpyxl scans the sheet once just to size it
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(min_row=header_row + 1, values_only=True)
+        header = next(rows)
+        chunk = []
+        for values in rows:
+            if all(v is None for v in values):
+                continue
+            # Rows may stop at their last non-empty cell, so missing trailing columns read as None
+            chunk.append(dict(zip(header, values + (None,) * (len(header) - len(values)))))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+def migrate_data(history_path='db/Consumer Order History 1.xlsx', products_path='db/products-export.xlsx'):
+    conn = init_db(with_indexes=False)
+    # Bulk-load settings: WAL and no fsync per transaction; restored once the load is done
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    # 1. Stream the order history in chunks, one transaction per chunk.
+    # The first Rx flag seen for each product is kept for the products table.
+    rx_map = {}
+    order_count = 0
+    for chunk in iter_excel_chunks(history_path, header_row=4):
+        for row in chunk:
+            rx_map.setdefault(row['Product Name'], row['Prescription Required'])
+        with conn:
+            conn.executemany("""
+            INSERT INTO orders (patient_id, product_name, purchase_date, quantity, dosage_frequency)
             VALUES (?, ?, ?, ?, ?)
-            """, (row['product name'], row['pzn'], row['price rec'], row['package size'], rx_val))
-        except sqlite3.IntegrityError:
-            pass
+            """, [(row['Patient ID'], row['Product Name'], str(row['Purchase Date']), row['Quantity'], row['Dosage Frequency'])
+                  for row in chunk])
+        order_count += len(chunk)
 
-    # Insert Orders
-    for _, row in history_df.iterrows():
-        conn.execute("""
-        INSERT INTO orders (patient_id, product_name, purchase_date, quantity, dosage_frequency)
+    # 2. Products from the catalogue artifact, with the Rx flag from the history or default to No
+    products = catalogue.load(products_path=products_path)
+    with conn:
+        conn.executemany("""
+        INSERT OR IGNORE INTO products (name, pzn, price, package_size, prescription_required)
         VALUES (?, ?, ?, ?, ?)
-        """, (row['Patient ID'], row['Product Name'], str(row['Purchase Date']), row['Quantity'], row['Dosage Frequency']))
+        """, ((row['name'], row['pzn'], row['price'], row['package_size'], rx_map.get(row['name'], 'No'))
+              for row in products if row['listed']))
 
-    conn.commit()
-    print(f"Migration complete. Database created at {DB_PATH}")
+    # 3. Indexes are built once after the load rather than maintained row by row
+    create_indexes(conn)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    print(f"Migration complete. Loaded {order_count} orders. Database created at {DB_PATH}")
     conn.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+"""Move patients from the single-item PatientState table into the PatientRecords layout.
+
+The source is read with a parallel scan; every page is split into per-order,
+per-prediction and summary items (patient_store.patient_items) and batch
+written to the target. The last key of each scan segment is checkpointed, so
+an interrupted run resumes. The source table is left untouched; server.py keeps
+reading it for patients not copied yet until PATIENT_LEGACY_FALLBACK=0.
+
+    python migrate_patient_layout.py [--workers 8] [--segments 32] [--fresh]
+"""
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from migrate_to_dynamo import CHECKPOINT_DIR, MIGRATE_WORKERS, Checkpoint, Progress, dynamodb_resource
+from patient_store import LEGACY_PATIENT_TABLE, PATIENT_TABLE, patient_items
+
+COMPLETE = "complete"
+
+
+def relayout(source=LEGACY_PATIENT_TABLE, target=PATIENT_TABLE, workers=MIGRATE_WORKERS, segments=None,
+             checkpoint_dir=CHECKPOINT_DIR, resource_factory=dynamodb_resource):
+    """Copy every patient; returns the number of patients copied in this run."""
+    segments = segments or workers * 4
+    checkpoint_path = os.path.join(checkpoint_dir, f"{source}-to-{target}.json") if checkpoint_dir else None
+    checkpoint = Checkpoint(checkpoint_path, f"{source}->{target}", segments)
+    progress = Progress(f"{source} -> {target}", total=None)
+    local = threading.local()
+
+    def copy_segment(segment):
+        if not hasattr(local, 'tables'):
+            resource = resource_factory()
+            local.tables = resource.Table(source), resource.Table(target)
+        source_table, target_table = local.tables
+        kwargs = {'Segment': segment, 'TotalSegments': segments}
+        # The checkpoint holds the last scan key copied in this segment, or COMPLETE
+        last_key = checkpoint.done(segment)
+        if last_key:
+            kwargs['ExclusiveStartKey'] = last_key
+        while True:
+            page = source_table.scan(**kwargs)
+            with target_table.batch_writer(overwrite_by_pkeys=['patient_id', 'sk']) as batch:
+                for record in page['Items']:
+                    for item in patient_items(record):
+                        batch.put_item(Item=item)
+            last_key = page.get('LastEvaluatedKey')
+            checkpoint.advance(segment, last_key or COMPLETE)
+            progress.add(len(page['Items']))
+            if not last_key:
+                return
+            kwargs['ExclusiveStartKey'] = last_key
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="relayout") as pool:
+        futures = [pool.submit(copy_segment, s) for s in range(segments) if checkpoint.done(s) != COMPLETE]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    checkpoint.clear()
+    print(f"{source} -> {target}: {progress.written} patients copied ({progress.rate():.0f} patients/s).")
+    return progress.written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=LEGACY_PATIENT_TABLE)
+    parser.add_argument("--target", default=PATIENT_TABLE)
+    parser.add_argument("--workers", type=int, default=MIGRATE_WORKERS)
+    parser.add_argument("--segments", type=int, default=None, help="parallel scan segments (default: 4 per worker)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    if args.fresh:
+        path = os.path.join(args.checkpoint_dir, f"{args.source}-to-{args.target}.json")
+        if os.path.exists(path):
+            os.remove(path)
+    relayout(args.source, args.target, args.workers, args.segments, args.checkpoint_dir)
@@ -1,13 +1,31 @@
+import argparse
 import boto3
 import pandas as pd
 import os
 import json
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from decimal import Decimal
+from botocore.config import Config
+from patient_store import PATIENT_TABLE, patient_items
+import catalogue
 
-# Set up AWS
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-inventory_table = dynamodb.Table('Inventory')
-patient_state_table = dynamodb.Table('PatientState')
+# Set up AWS. DYNAMODB_ENDPOINT_URL points the migration at a local stand-in (DynamoDB Local, moto server)
+DYNAMODB_ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL")
+MIGRATE_WORKERS = int(os.getenv("MIGRATE_WORKERS", "8"))
+CHECKPOINT_DIR = os.getenv("MIGRATE_CHECKPOINT_DIR", ".migrate_checkpoints")
+CHUNK_SIZE = 500
+
+# Throttled and failed BatchWriteItem calls back off in the client; batch_writer itself
+# re-queues any UnprocessedItems a successful call hands back.
+boto_config = Config(max_pool_connections=max(10, MIGRATE_WORKERS), retries={'max_attempts': 10, 'mode': 'adaptive'})
+
+def dynamodb_resource():
+    # One per worker thread: boto3 resources are not thread-safe
+    return boto3.session.Session().resource('dynamodb', region_name='us-east-1',
+                                            endpoint_url=DYNAMODB_ENDPOINT_URL, config=boto_config)
 
 def convert_decimal(obj):
     if isinstance(obj, float):
@@ -18,39 +36,158 @@ def convert_decimal(obj):
         return [convert_decimal(v) for v in obj]
     return obj
 
-def migrate_inventory():
-    print("Migrating Inventory...")
-    # Load products
-    products_df = pd.read_excel('db/products-export.xlsx')
-    
-    # Load stock levels (if available)
-    try:
-        mock_inv = pd.read_csv('mock_inventory.csv')
-        stock_map = dict(zip(mock_inv['product name'], mock_inv['stock_level']))
-        rx_map = dict(zip(mock_inv['product name'], mock_inv['prescription_required']))
-    except:
-        stock_map = {}
-        rx_map = {}
+class Checkpoint:
+    """Per-segment count of items already written, saved as JSON after every chunk.
+
+    A checkpoint only applies to the same item set (same keys in the same order);
+    otherwise the run starts over.
+    """
+
+    def __init__(self, path, fingerprint, segments):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.segments = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('fingerprint') == fingerprint and saved.get('segment_count') == segments:
+                self.segments = {int(k): v for k, v in saved['segments'].items()}
+            else:
+                print(f"Ignoring checkpoint {path}: it was written for a different item set.")
+        self.segment_count = segments
+
+    def done(self, segment):
+        return self.segments.get(segment, 0)
+
+    def advance(self, segment, count):
+        with self._lock:
+            self.segments[segment] = count
+            if not self.path:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({'fingerprint': self.fingerprint, 'segment_count': self.segment_count, 'segments': self.segments}, f)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+class Progress:
+    def __init__(self, label, total, done=0, interval=2.0):
+        self.label = label
+        self.total = total
+        self.done = done
+        self.written = 0
+        self.interval = interval
+        self.start = self.last_report = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, count):
+        with self._lock:
+            self.done += count
+            self.written += count
+            now = time.perf_counter()
+            if now - self.last_report >= self.interval:
+                self.last_report = now
+                rate = self.written / (now - self.start)
+                if self.total is None:
+                    print(f"{self.label}: {self.done} items ({rate:.0f} items/s)")
+                else:
+                    eta = (self.total - self.done) / rate if rate else 0
+                    print(f"{self.label}: {self.done}/{self.total} items ({rate:.0f} items/s, ETA {eta:.0f}s)")
+
+    def rate(self):
+        return self.written / max(time.perf_counter() - self.start, 1e-9)
+
+def segment_of(key, segments):
+    # Stable across runs (unlike hash()), so checkpoints line up with the same segments
+    return zlib.crc32(str(key).encode()) % segments
+
+def item_fingerprint(items, key, sort_key=None):
+    keys = [[str(item[key]), str(item[sort_key])] if sort_key else str(item[key]) for item in items]
+    return f"{len(items)}:{zlib.crc32(json.dumps(keys).encode())}"
+
+def write_items(table_name, items, key, workers=MIGRATE_WORKERS, segments=None, checkpoint_dir=CHECKPOINT_DIR,
+                chunk_size=CHUNK_SIZE, resource_factory=dynamodb_resource, sort_key=None):
+    """Write items with parallel 25-item BatchWriteItem calls; returns items/s for this run.
+
+    Items are split into segments by partition key, and each segment is written in chunks by one
+    worker. Progress is checkpointed per segment, so re-running after an interruption
+    skips what was already written. The checkpoint is removed once all segments finish.
+    """
+    items = [convert_decimal(item) for item in items]
+    segments = segments or workers * 4
+    fingerprint = item_fingerprint(items, key, sort_key)
+    primary_key = [key, sort_key] if sort_key else [key]
+    checkpoint_path = os.path.join(checkpoint_dir, f"{table_name}.json") if checkpoint_dir else None
+    checkpoint = Checkpoint(checkpoint_path, fingerprint, segments)
 
-    for _, row in products_df.iterrows():
-        prod_name = row['product name']
+    # 1. Partition by key
+    by_segment = [[] for _ in range(segments)]
+    for item in items:
+        by_segment[segment_of(item[key], segments)].append(item)
+
+    already_done = sum(checkpoint.done(s) for s in range(segments))
+    if already_done:
+        print(f"Resuming {table_name} from checkpoint: {already_done}/{len(items)} items already written.")
+    progress = Progress(table_name, len(items), already_done)
+    local = threading.local()
+
+    def write_segment(segment):
+        if not hasattr(local, 'table'):
+            local.table = resource_factory().Table(table_name)
+        seg_items = by_segment[segment]
+        for offset in range(checkpoint.done(segment), len(seg_items), chunk_size):
+            chunk = seg_items[offset:offset + chunk_size]
+            with local.table.batch_writer(overwrite_by_pkeys=primary_key) as batch:
+                for item in chunk:
+                    batch.put_item(Item=item)
+            checkpoint.advance(segment, offset + len(chunk))
+            progress.add(len(chunk))
+
+    # 2. Write segments in parallel; a failure stops the run but keeps the checkpoint
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="migrate") as pool:
+        futures = [pool.submit(write_segment, s) for s in range(segments) if checkpoint.done(s) < len(by_segment[s])]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    checkpoint.clear()
+    rate = progress.rate()
+    print(f"{table_name}: {len(items)} items written ({progress.written} this run, {rate:.0f} items/s).")
+    return rate
+
+def inventory_items():
+    # Products with their stock levels and Rx flags, from the catalogue artifact
+    items = []
+    for row in catalogue.load():
+        if not row['listed']:
+            continue
         item = {
-            'product_id': prod_name,
-            'name': prod_name,
-            'pzn': str(row['pzn']),
-            'price': row['price rec'],
-            'package_size': row['package size'],
-            'prescription_required': rx_map.get(prod_name, 'No'),
-            'stock_level': stock_map.get(prod_name, 100)
+            'product_id': row['name'],
+            'name': row['name'],
+            'price': row['price'],
+            'package_size': row['package_size'],
+            'prescription_required': row['prescription_required'],
+            'stock_level': row['stock_level'],
         }
-        inventory_table.put_item(Item=convert_decimal(item))
-    print("Inventory migration complete.")
+        # Products without a PZN get no attribute rather than the string "None"
+        if row['pzn'] is not None:
+            item['pzn'] = row['pzn']
+        items.append(item)
+    return items
 
-def migrate_patients():
-    print("Migrating Patients...")
+def patient_records():
     # Load order history
     history_df = pd.read_excel('db/Consumer Order History 1.xlsx', header=4)
-    
+
     # Load predictions
     try:
         pred_df = pd.read_csv('pharmacy_refill_predictions.csv')
@@ -62,11 +199,11 @@ def migrate_patients():
     patients = {}
 
     # Process history
-    for _, row in history_df.iterrows():
+    for row in history_df.to_dict('records'):
         p_id = row['Patient ID']
         if p_id not in patients:
             patients[p_id] = {'patient_id': p_id, 'orders': [], 'refill_predictions': []}
-        
+
         order = {
             'product_name': row['Product Name'],
             'purchase_date': str(row['Purchase Date']),
@@ -76,11 +213,11 @@ def migrate_patients():
         patients[p_id]['orders'].append(order)
 
     # Process predictions
-    for _, row in all_preds.iterrows():
+    for row in all_preds.to_dict('records'):
         p_id = row['Patient ID']
         if p_id not in patients:
             patients[p_id] = {'patient_id': p_id, 'orders': [], 'refill_predictions': []}
-        
+
         pred = {
             'product_name': row['Product Name'],
             'predicted_date': row['Predicted Refill Date'],
@@ -88,12 +225,36 @@ def migrate_patients():
         }
         patients[p_id]['refill_predictions'].append(pred)
 
-    # Put in DynamoDB
-    for p_id, data in patients.items():
-        patient_state_table.put_item(Item=convert_decimal(data))
-    
+    return list(patients.values())
+
+def migrate_inventory(**kwargs):
+    print("Migrating Inventory...")
+    write_items('Inventory', inventory_items(), 'product_id', **kwargs)
+    print("Inventory migration complete.")
+
+def migrate_patients(**kwargs):
+    print("Migrating Patients...")
+    # One item per order / prediction plus a summary per patient (see patient_store.py)
+    items = [item for record in patient_records() for item in patient_items(record)]
+    write_items(PATIENT_TABLE, items, 'patient_id', sort_key='sk', **kwargs)
     print("Patient migration complete.")
 
 if __name__ == "__main__":
-    migrate_inventory()
-    migrate_patients()
+    parser = argparse.ArgumentParser(description="Backfill the Inventory and PatientRecords tables.")
+    parser.add_argument("--only", choices=["inventory", "patients"])
+    parser.add_argument("--workers", type=int, default=MIGRATE_WORKERS)
+    parser.add_argument("--segments", type=int, default=None, help="key partitions (default: 4 per worker)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--fresh", action="store_true", help="ignore existing checkpoints")
+    args = parser.parse_args()
+
+    if args.fresh:
+        for name in ("Inventory.json", f"{PATIENT_TABLE}.json"):
+            path = os.path.join(args.checkpoint_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+    options = {'workers': args.workers, 'segments': args.segments, 'checkpoint_dir': args.checkpoint_dir}
+    if args.only != "patients":
+        migrate_inventory(**options)
+    if args.only != "inventory":
+        migrate_patients(**options)
@@ -0,0 +1,169 @@
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import db
+import tracing
+
+OUTBOX_PATH = os.getenv("NOTIFICATION_OUTBOX_PATH", "notification_outbox.db")
+SNS_BATCH_SIZE = 10  # PublishBatch limit
+MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "10"))
+# How long a claimed batch belongs to one worker; longer than a publish_batch call can take
+LEASE_SECONDS = 60.0
+
+
+class NotificationOutbox:
+    """Durable outbox for SNS notifications, delivered by a background worker.
+
+    enqueue() only writes the message to a local SQLite table, so callers never
+    wait on SNS. The worker sends due messages with PublishBatch (10 per call),
+    deletes delivered ones and reschedules failures with exponential backoff and
+    jitter. Messages still pending at shutdown or after a crash are picked up on
+    the next start. Messages that fail MAX_ATTEMPTS times, or are rejected as a
+    sender fault, are kept with dead=1 for inspection. Several processes may
+    share one outbox file: each batch is claimed with a lease in a single
+    UPDATE, so only one of them publishes it.
+    """
+
+    def __init__(self, sns_client, topic_arn: str, path: str = OUTBOX_PATH, max_attempts: int = MAX_ATTEMPTS,
+                 base_delay: float = 0.5, max_delay: float = 60.0, idle_poll: float = 5.0):
+        self.sns = sns_client
+        self.topic_arn = topic_arn
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_poll = idle_poll
+
+        self._conn = db.connect(path)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject TEXT,
+            message TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            dead INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            lease_until REAL NOT NULL DEFAULT 0
+        )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "lease_until" not in columns:
+            # Outbox files created before leases
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (dead, next_attempt_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, message: str, subject: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO outbox (subject, message, next_attempt_at) VALUES (?, ?, ?)",
+                               (subject, message, time.time()))
+        self._wakeup.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE dead = 0").fetchone()[0]
+
+    def _has_due(self) -> bool:
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM outbox WHERE dead = 0 AND next_attempt_at <= ? AND lease_until < ? LIMIT 1",
+                (now, now)).fetchone() is not None
+
+    def _claim(self):
+        """Lease up to one batch of due messages to this worker; other processes skip them until the lease ends."""
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute("""
+            UPDATE outbox SET lease_until = ? WHERE id IN (
+                SELECT id FROM outbox WHERE dead = 0 AND next_attempt_at <= ? AND lease_until < ? ORDER BY id LIMIT ?
+            ) RETURNING id, subject, message, attempts
+            """, (now + LEASE_SECONDS, now, now, SNS_BATCH_SIZE)).fetchall()
+        return sorted(rows)
+
+    def _next_due_in(self) -> float:
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(MAX(next_attempt_at, lease_until)) FROM outbox WHERE dead = 0").fetchone()
+        if row[0] is None:
+            return self.idle_poll
+        return min(max(row[0] - time.time(), 0), self.idle_poll)
+
+    def _record(self, delivered, failed):
+        """failed: (id, attempts, error, permanent) tuples."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in delivered])
+            for message_id, attempts, error, permanent in failed:
+                attempts += 1
+                dead = permanent or attempts >= self.max_attempts
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+                self._conn.execute("UPDATE outbox SET attempts = ?, next_attempt_at = ?, dead = ?, last_error = ?, lease_until = 0 WHERE id = ?",
+                                   (attempts, now + delay, int(dead), error, message_id))
+                if dead:
+                    print(f"Notification {message_id} dropped after {attempts} attempts: {error}")
+
+    def flush_once(self) -> int:
+        """Send one batch of due messages; returns how many were taken from the queue."""
+        rows = self._claim()
+        if not rows:
+            return 0
+        entries = []
+        for message_id, subject, message, _ in rows:
+            entry = {'Id': str(message_id), 'Message': message}
+            if subject:
+                entry['Subject'] = subject
+            entries.append(entry)
+        attempts = {message_id: n for message_id, _, _, n in rows}
+        try:
+            with tracing.span("sns.publish_batch"):
+                response = self.sns.publish_batch(TopicArn=self.topic_arn, PublishBatchRequestEntries=entries)
+        except Exception as e:
+            print(f"SNS publish_batch failed: {e}. Retrying with backoff.")
+            self._record([], [(i, n, str(e), False) for i, n in attempts.items()])
+            return len(rows)
+        delivered = [int(entry['Id']) for entry in response.get('Successful', [])]
+        failed = [(int(entry['Id']), attempts[int(entry['Id'])], f"{entry.get('Code')}: {entry.get('Message')}",
+                   entry.get('SenderFault', False)) for entry in response.get('Failed', [])]
+        self._record(delivered, failed)
+        return len(rows)
+
+    # --- Background worker ---
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.flush_once():
+                    continue
+            except Exception as e:
+                print(f"Notification worker error: {e}")
+            self._wakeup.wait(self._next_due_in())
+            self._wakeup.clear()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="notification-outbox", daemon=True)
+                self._thread.start()
+
+    def stop(self, drain_timeout: float = 5.0):
+        """Try to deliver what is due for up to drain_timeout seconds, then stop; the rest stays queued."""
+        deadline = time.monotonic() + drain_timeout
+        while self._thread is not None and time.monotonic() < deadline and self._has_due():
+            time.sleep(0.05)
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop(drain_timeout=0)
+        self._conn.close()
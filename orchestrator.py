@@ -1,28 +1,106 @@
+from __future__ import annotations
+
 import os
-import requests
+import time
 import json
 import re
-import urllib.parse
-from typing import TypedDict, List, Optional, Literal
-from langgraph.graph import StateGraph, END
-from groq import Groq
-from rapidfuzz import process, fuzz
+import threading
+from typing import TYPE_CHECKING, Annotated, TypedDict, List, Optional, Literal
 from dotenv import load_dotenv
+import catalogue
+from product_index import ProductIndex
+import intake_rules
+import tracing
+from llm_cache import CatalogueVersion, SingleFlight, build_cache_from_env, normalize_request
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
 
 load_dotenv()
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
-# Load product names for NLU mapping
-import pandas as pd
-try:
-    df = pd.read_csv("mock_inventory.csv")
-    PRODUCT_NAMES = df['product name'].tolist()
-    PRODUCT_LIST_STR = "\n".join([f"- {name}" for name in PRODUCT_NAMES])
-except Exception as e:
-    print(f"Error loading inventory: {e}")
-    PRODUCT_LIST_STR = "Error loading product list."
+
+# Identical requests in flight at the same time (e.g. inside a batch) share one Groq call
+INTAKE_FLIGHTS = SingleFlight()
+
+# Prompt retrieval: only the top-N fuzzy candidates go into the Groq prompt (0 sends the full catalogue)
+INTAKE_SHORTLIST_SIZE = int(os.getenv("INTAKE_SHORTLIST_SIZE", "20"))
+
+# Running totals for the Groq intake call, used to compare prompt sizes and latency across settings
+LLM_USAGE = {"calls": 0, "prompt_tokens": 0, "latency_s": 0.0, "shortlist_fallbacks": 0}
+
+# Which intake tier answered each request and how long intake took:
+# rules (tier 1, no LLM), cache, llm (tier 2) or fuzzy (Groq failed).
+# Also exported as the "intake" span, with the tier as its status
+INTAKE_TIERS = {tier: {"hits": 0, "latency_s": 0.0} for tier in ("rules", "cache", "llm", "fuzzy")}
+
+# Guards LLM_USAGE and INTAKE_TIERS: batch and SSE requests update them from several threads
+_stats_lock = threading.Lock()
+
+def record_intake(tier: str, start: float):
+    elapsed = time.perf_counter() - start
+    with _stats_lock:
+        INTAKE_TIERS[tier]["hits"] += 1
+        INTAKE_TIERS[tier]["latency_s"] += elapsed
+
+def intake_stats() -> dict:
+    """Hit rate and mean intake latency per tier."""
+    with _stats_lock:
+        tiers = {tier: dict(t) for tier, t in INTAKE_TIERS.items()}
+    total = sum(t["hits"] for t in tiers.values())
+    return {
+        tier: {
+            "hits": t["hits"],
+            "hit_rate": t["hits"] / total if total else 0.0,
+            "mean_ms": t["latency_s"] / t["hits"] * 1000 if t["hits"] else 0.0,
+        }
+        for tier, t in tiers.items()
+    }
+
+# Expensive globals are created on first use, so importing this module stays cheap
+# (no langgraph, Groq or catalogue load until an order actually runs). Outside code
+# reads them as plain attributes (orchestrator.app, orchestrator.PRODUCT_INDEX, ...)
+# through the module __getattr__; code in this module goes through lazy(). Assigning
+# one of them (tests, benchmarks) replaces it as before.
+def _groq_client():
+    from groq import Groq
+    return Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+def _catalogue_version():
+    # Cache keys change whenever the catalogue does
+    return CatalogueVersion(lazy("PRODUCT_NAMES"), catalogue.INVENTORY_CSV)
+
+_LAZY = {
+    "groq_client": _groq_client,
+    # Product names for NLU mapping: everything the inventory knows about
+    "PRODUCT_NAMES": lambda: catalogue.load().names(in_inventory=True),
+    "PRODUCT_LIST_STR": lambda: format_product_list(lazy("PRODUCT_NAMES")),
+    # Built once per process; intake only scores the shortlist the index returns
+    "PRODUCT_INDEX": lambda: ProductIndex(lazy("PRODUCT_NAMES")),
+    "CATALOGUE_VERSION": _catalogue_version,
+    # Cache for Groq extractions
+    "LLM_CACHE": lambda: build_cache_from_env(lazy("CATALOGUE_VERSION").current),
+    "workflow": lambda: build_workflow(),
+    "app": lambda: lazy("workflow").compile(),
+}
+_lazy_lock = threading.RLock()
+
+def __getattr__(name):
+    factory = _LAZY.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = factory()
+    return globals()[name]
+
+def lazy(name: str):
+    g = globals()
+    return g[name] if name in g else __getattr__(name)
 
 # 1. Define the State
+def merge_lookups(current: dict, update: dict) -> dict:
+    # The lookup branches run in the same step and each adds its own key
+    return {**(current or {}), **(update or {})}
+
 class PharmacyState(TypedDict):
     raw_input: str
     patient_id: str
@@ -33,13 +111,79 @@ class PharmacyState(TypedDict):
     status: str
     messages: List[str]
     cot_logic: List[str]  # Chain of Thought logs
+    lookups: Annotated[dict, merge_lookups]  # inventory / predictions results for the safety decision
 
-# API Configuration
-API_BASE_URL = "http://127.0.0.1:8000"
+def initial_state(raw_input: str) -> PharmacyState:
+    return {
+        "raw_input": raw_input,
+        "patient_id": "Unknown",
+        "product_id": "Unknown",
+        "quantity": 1,
+        "is_rx_required": False,
+        "stock_level": 0,
+        "status": "STARTING",
+        "messages": [],
+        "cot_logic": [],
+        "lookups": {}
+    }
+
+def node_backend(config: Optional[RunnableConfig]):
+    """Backend passed in config["configurable"]["backend"] (e.g. a batch's MemoizedBackend), else the shared one."""
+    backend = ((config or {}).get("configurable") or {}).get("backend")
+    if backend is None:
+        from backend_client import get_backend
+        backend = get_backend()
+    return backend
+
+def format_product_list(names: List[str]) -> str:
+    return "\n".join([f"- {name}" for name in names])
+
+def intake_messages(raw_input: str, detected_patient: str, product_list_str: str):
+    return [
+        {"role": "system", "content": "You are an expert pharmacist AI. Output JSON ONLY."},
+        {"role": "user", "content": f"Match request to inventory:\nRequest: {raw_input}\nInventory: {product_list_str}\nReturn JSON: {{\"patient_id\": \"{detected_patient}\", \"product_id\": \"EXACT_NAME\", \"quantity\": 1}}"}
+    ]
+
+def groq_extract(raw_input: str, detected_patient: str, product_list_str: str) -> dict:
+    start = time.perf_counter()
+    with tracing.span("groq"):
+        completion = lazy("groq_client").chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=intake_messages(raw_input, detected_patient, product_list_str),
+            response_format={"type": "json_object"}
+        )
+    elapsed = time.perf_counter() - start
+    with _stats_lock:
+        LLM_USAGE["calls"] += 1
+        LLM_USAGE["latency_s"] += elapsed
+        if getattr(completion, "usage", None):
+            LLM_USAGE["prompt_tokens"] += completion.usage.prompt_tokens
+    return json.loads(completion.choices[0].message.content)
 
-# 2. Optimized Node: IntakeNode (Groq + RapidFuzz Fallback)
+def llm_extract(raw_input: str, detected_patient: str, shortlist: List[str]):
+    """Groq extraction over the shortlist, retried on the full list if the answer falls outside it."""
+    data = groq_extract(raw_input, detected_patient, format_product_list(shortlist) if shortlist else lazy("PRODUCT_LIST_STR"))
+    fell_back = bool(shortlist) and data.get('product_id') not in shortlist
+    if fell_back:
+        with _stats_lock:
+            LLM_USAGE["shortlist_fallbacks"] += 1
+        data = groq_extract(raw_input, detected_patient, lazy("PRODUCT_LIST_STR"))
+    cache = lazy("LLM_CACHE")
+    if cache:
+        cache.set(raw_input, data)
+    return data, fell_back
+
+# 2. Optimized Node: IntakeNode (rules fast path, then Groq + RapidFuzz Fallback)
 def intake_node(state: PharmacyState):
     print("--- GROQ INTAKE NODE ---")
+    with tracing.span("intake") as span:
+        start = time.perf_counter()
+        span.status = intake(state)
+        record_intake(span.status, start)
+    return state
+
+def intake(state: PharmacyState) -> str:
+    """Fills patient_id, product_id and quantity in state; returns the tier that answered."""
     if 'cot_logic' not in state: state['cot_logic'] = []
     state['cot_logic'].append("Thinking: Extracting patient_id and mapping medication using Groq + RapidFuzz fallback...")
     
@@ -47,21 +191,39 @@ def intake_node(state: PharmacyState):
     patient_match = re.search(r'(PAT\d+)', state['raw_input'], re.IGNORECASE)
     detected_patient = patient_match.group(1).upper() if patient_match else "Unknown"
 
-    # 2. RapidFuzz Prep
-    choices = {name: name.split(',')[0].replace('®', '') for name in PRODUCT_NAMES}
-    fuzzy_match = process.extractOne(state['raw_input'], choices, scorer=fuzz.partial_ratio)
-    detected_product = fuzzy_match[2] if fuzzy_match and fuzzy_match[1] > 50 else "Unknown"
+    # 2. RapidFuzz over the precomputed product index (at least two results so the runner-up is known)
+    with tracing.span("rapidfuzz"):
+        matches = lazy("PRODUCT_INDEX").match(state['raw_input'], k=max(INTAKE_SHORTLIST_SIZE, 2))
+    fuzzy_match = matches[0] if matches else None
+    detected_product = fuzzy_match[0] if fuzzy_match and fuzzy_match[1] > 50 else "Unknown"
+
+    # 3. Tier 1: unambiguous requests are answered without the LLM
+    data, reason = intake_rules.fast_path(state['raw_input'], matches)
+    if data is not None:
+        state.update(data)
+        state['cot_logic'].append(f"Observation: Rule-based intake {reason}: {state['product_id']} x{state['quantity']} for {state['patient_id']}.")
+        return "rules"
+    state['cot_logic'].append(f"Observation: Escalating to Groq ({reason}).")
 
+    # 4. Tier 2: Groq
     try:
-        completion = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are an expert pharmacist AI. Output JSON ONLY."},
-                {"role": "user", "content": f"Match request to inventory:\nRequest: {state['raw_input']}\nInventory: {PRODUCT_LIST_STR}\nReturn JSON: {{\"patient_id\": \"{detected_patient}\", \"product_id\": \"EXACT_NAME\", \"quantity\": 1}}"}
-            ],
-            response_format={"type": "json_object"}
-        )
-        data = json.loads(completion.choices[0].message.content)
+        cache = lazy("LLM_CACHE")
+        data = cache.get(state['raw_input']) if cache else None
+        if cache:
+            tracing.record_cache("llm", data is not None)
+        if data is not None:
+            state['cot_logic'].append("Observation: Reusing cached Groq extraction for an identical request.")
+            tier = "cache"
+        else:
+            # Retrieval stage: the fuzzy top-N becomes the prompt's inventory
+            shortlist = [name for name, _ in matches] if INTAKE_SHORTLIST_SIZE else []
+            data, fell_back = INTAKE_FLIGHTS.do(
+                normalize_request(state['raw_input']),
+                lambda: llm_extract(state['raw_input'], detected_patient, shortlist),
+            )
+            if fell_back:
+                state['cot_logic'].append("Observation: Groq answer is outside the shortlist. Retrying with the full inventory.")
+            tier = "llm"
         state['patient_id'] = data.get('patient_id', detected_patient)
         state['product_id'] = data.get('product_id', detected_product)
         state['quantity'] = data.get('quantity', 1)
@@ -70,33 +232,62 @@ def intake_node(state: PharmacyState):
         state['cot_logic'].append(f"Observation: Groq failed ({str(e)}). Using RapidFuzz Optimization.")
         state['patient_id'] = detected_patient
         state['product_id'] = detected_product
-        state['quantity'] = 1
+        state['quantity'] = intake_rules.parse_quantity(state['raw_input']) or 1
         state['cot_logic'].append(f"Observation: RapidFuzz extracted {state['product_id']} (Confidence: {int(fuzzy_match[1]) if fuzzy_match else 0}%).")
-    
-    return state
+        tier = "fuzzy"
+    return tier
+
+# 3. Lookup branches: both start right after intake and run in parallel
+def lookup(name: str, fn) -> dict:
+    try:
+        return {"lookups": {name: fn()}}
+    except Exception as e:
+        return {"lookups": {name: None, f"{name}_error": str(e)}}
+
+def lookup_outcome(update: dict) -> str:
+    return "error" if any(key.endswith("_error") for key in update["lookups"]) else "ok"
+
+def state_outcome(state: PharmacyState) -> str:
+    return state['status'].lower()
 
-# 3. Node: SafetyNode (Inventory & Rx Check)
+@tracing.traced("inventory_lookup", outcome=lookup_outcome)
+def inventory_lookup_node(state: PharmacyState, config: RunnableConfig = None):
+    print("--- INVENTORY LOOKUP ---")
+    return lookup("inventory", lambda: node_backend(config).get_inventory(state['product_id']))
+
+@tracing.traced("predictions_lookup", outcome=lookup_outcome)
+def predictions_lookup_node(state: PharmacyState, config: RunnableConfig = None):
+    # Fetched before we know whether the item needs a prescription, so Rx items
+    # wait for the slower of the two lookups instead of both in turn
+    print("--- PREDICTIONS LOOKUP ---")
+    if state['patient_id'] == "Unknown":
+        return {"lookups": {"predictions": []}}
+    return lookup("predictions", lambda: node_backend(config).get_predictions(state['patient_id']))
+
+# 4. Node: SafetyNode (Inventory & Rx Check), joins the lookup branches
+@tracing.traced("safety", outcome=state_outcome)
 def safety_node(state: PharmacyState):
     print("--- SAFETY NODE ---")
     state['cot_logic'].append(f"Thinking: Checking inventory and prescription requirements for {state['product_id']}...")
+    lookups = state.get('lookups') or {}
     try:
-        # Use URL encoding for special characters
-        encoded_product_id = urllib.parse.quote(state['product_id'])
-        inv_res = requests.get(f"{API_BASE_URL}/inventory", params={"product_id": state['product_id']})
-        if inv_res.status_code != 200:
+        if lookups.get('inventory_error'):
+            raise RuntimeError(lookups['inventory_error'])
+        inv_data = lookups.get('inventory')
+        if inv_data is None:
             state['status'] = "REJECTED"
             state['cot_logic'].append(f"Observation: Medicine '{state['product_id']}' not in formulary.")
             return state
-            
-        inv_data = inv_res.json()
+
         state['is_rx_required'] = inv_data.get('prescription_required') == 'Yes'
         state['stock_level'] = int(inv_data.get('stock_level', 0))
 
         if state['is_rx_required']:
             state['cot_logic'].append("Observation: This medication requires a prescription.")
             # Trigger "Prescription Missing" check (simplified for now: check predictions)
-            pred_res = requests.get(f"{API_BASE_URL}/patient/{state['patient_id']}/predictions")
-            predictions = pred_res.json()
+            if lookups.get('predictions_error'):
+                raise RuntimeError(lookups['predictions_error'])
+            predictions = lookups.get('predictions') or []
             match = next((p for p in predictions if p['product_name'] == state['product_id']), None)
             
             if not match:
@@ -117,67 +308,59 @@ def safety_node(state: PharmacyState):
     
     return state
 
-# 4. Node: ActionNode (Order & SNS)
-def action_node(state: PharmacyState):
+# 5. Node: ActionNode (Order & SNS)
+@tracing.traced("action", outcome=state_outcome)
+def action_node(state: PharmacyState, config: RunnableConfig = None):
     print("--- ACTION NODE ---")
     if state['status'] != "SAFETY_CLEARED":
         return state
     
     state['cot_logic'].append("Thinking: Executing order and sending AWS SNS notification...")
+    from backend_client import BackendError
     try:
-        payload = {
-            "patient_id": state['patient_id'],
-            "product_id": state['product_id'],
-            "quantity": state['quantity']
-        }
-        response = requests.post(f"{API_BASE_URL}/order/execute", json=payload)
-        if response.status_code == 200:
-            state['status'] = "COMPLETED"
-            state['cot_logic'].append("Observation: Order processed and SNS triggered.")
-        else:
-            state['status'] = "FAILED"
-            state['cot_logic'].append(f"Error: {response.json().get('detail')}")
+        node_backend(config).execute_order(state['patient_id'], state['product_id'], state['quantity'])
+        state['status'] = "COMPLETED"
+        state['cot_logic'].append("Observation: Order processed and SNS triggered.")
+    except BackendError as e:
+        state['status'] = "FAILED"
+        state['cot_logic'].append(f"Error: {e.detail}")
     except Exception as e:
         state['status'] = "ERROR"
         state['cot_logic'].append(f"Error: Order execution failed: {str(e)}")
     
     return state
 
-# 5. Build the Graph
-workflow = StateGraph(PharmacyState)
-
-workflow.add_node("intake", intake_node)
-workflow.add_node("safety", safety_node)
-workflow.add_node("action", action_node)
-
-workflow.set_entry_point("intake")
-workflow.add_edge("intake", "safety")
-
+# 6. Build the Graph
 # Conditional Edges for Branching
 def route_safety(state: PharmacyState) -> Literal["action", "end"]:
     if state['status'] == "SAFETY_CLEARED":
         return "action"
     return "end"
 
-workflow.add_conditional_edges("safety", route_safety, {"action": "action", "end": END})
-workflow.add_edge("action", END)
+def build_workflow():
+    from langgraph.graph import StateGraph, END
 
-app = workflow.compile()
+    workflow = StateGraph(PharmacyState)
+
+    workflow.add_node("intake", intake_node)
+    workflow.add_node("inventory_lookup", inventory_lookup_node)
+    workflow.add_node("predictions_lookup", predictions_lookup_node)
+    workflow.add_node("safety", safety_node)
+    workflow.add_node("action", action_node)
+
+    workflow.set_entry_point("intake")
+    # Fan out after intake, join at the safety decision once both lookups are back
+    workflow.add_edge("intake", "inventory_lookup")
+    workflow.add_edge("intake", "predictions_lookup")
+    workflow.add_edge(["inventory_lookup", "predictions_lookup"], "safety")
+
+    workflow.add_conditional_edges("safety", route_safety, {"action": "action", "end": END})
+    workflow.add_edge("action", END)
+    return workflow
 
 if __name__ == "__main__":
     test_input = "Hi, I am PAT001 and I need refill of Panthenol spray"
-    initial_state = {
-        "raw_input": test_input,
-        "patient_id": "Unknown",
-        "product_id": "Unknown",
-        "quantity": 0,
-        "is_rx_required": False,
-        "stock_level": 0,
-        "status": "STARTING",
-        "messages": [],
-        "cot_logic": []
-    }
-    final_output = app.invoke(initial_state)
+    final_output = lazy("app").invoke(initial_state(test_input))
     print("\n--- FINAL CHAIN OF THOUGHT ---")
     for step in final_output['cot_logic']:
         print(step)
@@ -187,19 +370,7 @@ if __name__ == "__main__":
 if __name__ == "__main__":
     # Test with natural language
     test_input = "Hi, I am PAT001 and I need refill of Panthenol spray"
-    
-    initial_state = {
-        "raw_input": test_input,
-        "patient_id": "Unknown",
-        "product_id": "Unknown",
-        "quantity": 0,
-        "is_rx_required": False,
-        "stock_level": 0,
-        "status": "STARTING",
-        "messages": []
-    }
-    
-    final_output = app.invoke(initial_state)
+    final_output = lazy("app").invoke(initial_state(test_input))
     print("\n--- FINAL GRAPH STATE ---")
     print(f"Status: {final_output['status']}")
     for msg in final_output['messages']:
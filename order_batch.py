@@ -0,0 +1,77 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Iterator, List, Tuple
+
+import orchestrator
+from backend_client import MemoizedBackend, get_backend
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+MAX_BATCH_CONCURRENCY = 64
+# Largest batch accepted by POST /agent/order/batch (server.py)
+BATCH_MAX = int(os.getenv("BATCH_MAX", "1000"))
+
+# Batch entry points for nightly refill runs and call-center imports.
+# Every request runs through orchestrator.app on a pool bounded by `concurrency`.
+# Inventory and prediction lookups are shared across the batch through one
+# MemoizedBackend. Requests whose normalized text matches one already waiting
+# on Groq share that call (orchestrator.INTAKE_FLIGHTS); other requests are not
+# grouped. Results are yielded as (index, final_state) in completion order.
+
+
+def _run_one(raw_input: str, config: dict) -> dict:
+    try:
+        return orchestrator.app.invoke(orchestrator.initial_state(raw_input), config=config)
+    except Exception as e:
+        state = orchestrator.initial_state(raw_input)
+        state['status'] = "ERROR"
+        state['cot_logic'].append(f"Error: Batch item failed: {str(e)}")
+        return state
+
+
+def _submit_all(pool: ThreadPoolExecutor, raw_inputs: List[str], backend=None):
+    config = {"configurable": {"backend": MemoizedBackend(backend or get_backend())}}
+    return {pool.submit(_run_one, raw, config): i for i, raw in enumerate(raw_inputs)}
+
+
+def iter_batch(raw_inputs: List[str], concurrency: int = BATCH_CONCURRENCY, backend=None) -> Iterator[Tuple[int, dict]]:
+    concurrency = max(1, min(concurrency, MAX_BATCH_CONCURRENCY))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+        futures = _submit_all(pool, raw_inputs, backend)
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+async def stream_batch(raw_inputs: List[str], concurrency: int = BATCH_CONCURRENCY, backend=None) -> AsyncIterator[Tuple[int, dict]]:
+    concurrency = max(1, min(concurrency, MAX_BATCH_CONCURRENCY))
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    try:
+        futures = _submit_all(pool, raw_inputs, backend)
+        wrapped = {asyncio.wrap_future(future): i for future, i in futures.items()}
+        pending = set(wrapped)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield wrapped[future], future.result()
+    finally:
+        # Stop queued items if the consumer goes away (e.g. the HTTP client disconnects)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_batch(raw_inputs: List[str], concurrency: int = BATCH_CONCURRENCY, backend=None) -> List[dict]:
+    """Blocking convenience wrapper; returns final states in input order."""
+    results = [None] * len(raw_inputs)
+    for i, state in iter_batch(raw_inputs, concurrency, backend):
+        results[i] = state
+    return results
+
+
+def batch_result(index: int, state: dict) -> dict:
+    return {
+        "index": index,
+        "patient_id": state.get('patient_id'),
+        "product_id": state.get('product_id'),
+        "quantity": state.get('quantity'),
+        "status": state.get('status'),
+        "cot_logic": state.get('cot_logic', []),
+    }
@@ -0,0 +1,73 @@
+import json
+from typing import AsyncIterator, Iterator
+
+import orchestrator
+
+# Per-node progress for a single order. The graph runs with stream_mode="updates",
+# so an event goes out as soon as each node returns (intake first) instead of
+# after the whole intake -> safety -> action run. Each "node" event carries only
+# the cot_logic entries that node added; the closing "done" event has the final
+# state in the same shape as order_batch.batch_result.
+
+STATE_FIELDS = ("patient_id", "product_id", "quantity", "status")
+
+
+class _EventBuilder:
+    def __init__(self, raw_input: str):
+        self.state = orchestrator.initial_state(raw_input)
+        self.seen = 0
+
+    def node(self, chunk: dict) -> list:
+        events = []
+        for node, update in chunk.items():
+            update = update or {}
+            self.state.update(update)
+            cot_logic = list(self.state.get('cot_logic', []))
+            event = {"event": "node", "node": node, "cot_logic": cot_logic[self.seen:]}
+            event.update({field: self.state.get(field) for field in STATE_FIELDS})
+            self.seen = len(cot_logic)
+            events.append(event)
+        return events
+
+    def done(self) -> dict:
+        event = {"event": "done", "cot_logic": list(self.state.get('cot_logic', []))}
+        event.update({field: self.state.get(field) for field in STATE_FIELDS})
+        return event
+
+    def error(self, e: Exception) -> dict:
+        self.state['status'] = "ERROR"
+        self.state['cot_logic'] = list(self.state.get('cot_logic', [])) + [f"Error: Orchestration failed: {str(e)}"]
+        return self.done()
+
+
+def _config(backend=None) -> dict:
+    return {"configurable": {"backend": backend}} if backend is not None else {}
+
+
+def iter_events(raw_input: str, backend=None) -> Iterator[dict]:
+    """Blocking event stream, for in-process callers such as the Streamlit portal."""
+    builder = _EventBuilder(raw_input)
+    try:
+        for chunk in orchestrator.app.stream(orchestrator.initial_state(raw_input), config=_config(backend), stream_mode="updates"):
+            yield from builder.node(chunk)
+    except Exception as e:
+        yield builder.error(e)
+        return
+    yield builder.done()
+
+
+async def stream_events(raw_input: str, backend=None) -> AsyncIterator[dict]:
+    """Async event stream; the sync nodes run on LangGraph's executor so the event loop stays free."""
+    builder = _EventBuilder(raw_input)
+    try:
+        async for chunk in orchestrator.app.astream(orchestrator.initial_state(raw_input), config=_config(backend), stream_mode="updates"):
+            for event in builder.node(chunk):
+                yield event
+    except Exception as e:
+        yield builder.error(e)
+        return
+    yield builder.done()
+
+
+def sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
@@ -0,0 +1,107 @@
+import os
+from typing import List, Optional
+
+from boto3.dynamodb.conditions import Key
+
+# PatientRecords layout: one partition per patient, one item per record.
+#   sk = "ORDER#<purchase_date>#<seq>"   one order
+#   sk = "PRED#<product>#<date>"         one refill prediction
+#   sk = "SUMMARY"                       counts and last purchase date
+# Sort keys order as ORDER# < PRED# < SUMMARY, so "sk >= PRED#" returns a
+# patient's predictions plus the summary (which tells "no predictions" apart
+# from "unknown patient") in a single query.
+
+PATIENT_TABLE = os.getenv("PATIENT_TABLE", "PatientRecords")
+LEGACY_PATIENT_TABLE = "PatientState"
+
+SUMMARY_SK = "SUMMARY"
+ORDER_PREFIX = "ORDER#"
+PRED_PREFIX = "PRED#"
+
+
+def order_sk(order: dict, seq: int) -> str:
+    return f"{ORDER_PREFIX}{order['purchase_date']}#{seq:05d}"
+
+
+def prediction_sk(prediction: dict) -> str:
+    return f"{PRED_PREFIX}{prediction['product_name']}#{prediction.get('predicted_date', '')}"
+
+
+def patient_items(record: dict) -> List[dict]:
+    """Split a single-item PatientState record into PatientRecords items."""
+    patient_id = record['patient_id']
+    orders = record.get('orders', [])
+    predictions = record.get('refill_predictions', [])
+
+    summary = {'patient_id': patient_id, 'sk': SUMMARY_SK, 'order_count': len(orders), 'prediction_count': len(predictions)}
+    if orders:
+        summary['last_purchase_date'] = max(str(order['purchase_date']) for order in orders)
+
+    items = [summary]
+    items += [dict(order, patient_id=patient_id, sk=order_sk(order, seq)) for seq, order in enumerate(orders)]
+    items += [dict(prediction, patient_id=patient_id, sk=prediction_sk(prediction)) for prediction in predictions]
+    return items
+
+
+class PatientRepository:
+    """Reads patient data from the PatientRecords table.
+
+    Until every patient is moved over (migrate_patient_layout.py), patients
+    missing from the new table are read from the single-item legacy table,
+    projecting only the attribute the caller needs.
+    """
+
+    def __init__(self, table, legacy_table=None):
+        self.table = table
+        self.legacy_table = legacy_table
+
+    def _query(self, **kwargs) -> List[dict]:
+        items = []
+        while True:
+            response = self.table.query(**kwargs)
+            items.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response or len(items) >= kwargs.get('Limit', float('inf')):
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _legacy_attribute(self, patient_id: str, attribute: str):
+        if self.legacy_table is None:
+            return None
+        response = self.legacy_table.get_item(Key={'patient_id': patient_id}, ProjectionExpression='#attr',
+                                              ExpressionAttributeNames={'#attr': attribute})
+        if 'Item' not in response:
+            return None
+        return response['Item'].get(attribute, [])
+
+    def get_predictions(self, patient_id: str) -> Optional[List[dict]]:
+        """The patient's refill predictions, or None if the patient is unknown."""
+        items = self._query(
+            KeyConditionExpression=Key('patient_id').eq(patient_id) & Key('sk').gte(PRED_PREFIX),
+            ProjectionExpression="sk, product_name, predicted_date, #action",
+            ExpressionAttributeNames={'#action': 'action'},
+        )
+        if not items:
+            return self._legacy_attribute(patient_id, 'refill_predictions')
+        return [
+            {k: v for k, v in item.items() if k != 'sk'}
+            for item in items if item['sk'].startswith(PRED_PREFIX)
+        ]
+
+    def get_orders(self, patient_id: str, limit: int = None) -> Optional[List[dict]]:
+        """The patient's orders, newest first, or None if the patient is unknown."""
+        kwargs = {
+            'KeyConditionExpression': Key('patient_id').eq(patient_id) & Key('sk').begins_with(ORDER_PREFIX),
+            'ScanIndexForward': False,
+        }
+        if limit:
+            kwargs['Limit'] = limit
+        items = self._query(**kwargs)
+        if not items and self.get_summary(patient_id) is None:
+            orders = self._legacy_attribute(patient_id, 'orders')
+            if orders is None:
+                return None
+            return sorted(orders, key=lambda order: str(order['purchase_date']), reverse=True)[:limit]
+        return [{k: v for k, v in item.items() if k not in ('patient_id', 'sk')} for item in items[:limit]]
+
+    def get_summary(self, patient_id: str) -> Optional[dict]:
+        return self.table.get_item(Key={'patient_id': patient_id, 'sk': SUMMARY_SK}).get('Item')
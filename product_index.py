@@ -0,0 +1,84 @@
+import re
+from collections import Counter
+from heapq import nlargest
+from typing import Dict, Iterable, List, Tuple
+
+from rapidfuzz import fuzz, process
+
+# Dosage strengths such as "500 mg", "46,3 mg/g", "80 mg/90 mg/180 mg", "2000 I.E." or "0,25 %"
+_UNIT = r'(?:mg|mcg|µg|g|ml|l|i\.\s?e\.|ie|%)'
+DOSAGE_RE = re.compile(
+    rf'\d+(?:[.,]\d+)?\s*{_UNIT}(?:\s*/\s*(?:\d+(?:[.,]\d+)?\s*)?{_UNIT})*',
+    re.IGNORECASE,
+)
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def _clean(text: str) -> str:
+    text = text.replace('®', '').replace('™', '').lower()
+    return ' '.join(text.split())
+
+
+def normalize_name(name: str) -> str:
+    """Matching key for a catalogue name: no ®, no dosage strength, nothing after the first comma."""
+    stripped = DOSAGE_RE.sub(' ', name.replace('®', '').replace('™', ''))
+    key = _clean(stripped.split(',')[0])
+    return key or _clean(name)
+
+
+def _grams(text: str) -> List[str]:
+    """Whole tokens plus character trigrams of every token, used as inverted-list keys."""
+    grams = []
+    for token in _TOKEN_RE.findall(text):
+        if len(token) < 3:
+            continue
+        grams.append(f"w:{token}")
+        grams.extend(token[i:i + 3] for i in range(len(token) - 2))
+    return grams
+
+
+class ProductIndex:
+    """Fuzzy product matcher built once over the catalogue.
+
+    Token and trigram inverted lists narrow the catalogue to a shortlist of
+    candidates and only that shortlist is scored with RapidFuzz partial_ratio.
+    """
+
+    def __init__(self, names: Iterable[str], shortlist: int = 64, max_posting_ratio: float = 0.05):
+        self.names: List[str] = list(names)
+        self.keys: List[str] = [normalize_name(name) for name in self.names]
+        self.shortlist = shortlist
+
+        postings: Dict[str, List[int]] = {}
+        for row, key in enumerate(self.keys):
+            for gram in set(_grams(key)):
+                postings.setdefault(gram, []).append(row)
+
+        # Grams shared by a large part of the catalogue ("tab", "ten", ...) do not narrow anything
+        max_posting = max(shortlist * 8, int(len(self.names) * max_posting_ratio))
+        self.postings = {gram: rows for gram, rows in postings.items() if len(rows) <= max_posting}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _candidates(self, query: str) -> List[int]:
+        if len(self.names) <= self.shortlist:
+            return list(range(len(self.names)))
+
+        hits = Counter()
+        for gram in set(_grams(query)):
+            rows = self.postings.get(gram)
+            if rows:
+                hits.update(rows)
+        return nlargest(self.shortlist, hits, key=hits.__getitem__)
+
+    def match(self, text: str, k: int = 1, score_cutoff: float = 0) -> List[Tuple[str, float]]:
+        """Return up to k (product name, score) pairs, best first."""
+        query = _clean(text)
+        rows = self._candidates(query)
+        if not rows:
+            return []
+
+        choices = {row: self.keys[row] for row in rows}
+        results = process.extract(query, choices, scorer=fuzz.partial_ratio, limit=k, score_cutoff=score_cutoff)
+        return [(self.names[row], score) for _, score, row in results]
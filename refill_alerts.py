@@ -0,0 +1,79 @@
+import sqlite3
+from datetime import date
+from typing import Iterator, List, Optional, Tuple
+
+# Keyset pagination over refill_predictions: pages are ordered by id and the
+# cursor is the last id returned, so every page is an index range scan no
+# matter how deep the client pages (no OFFSET). data_prep updates predictions in
+# place (one row per patient and product), so a cursor stays valid across runs.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+COLUMNS = "id, patient_id as 'Patient ID', product_name as 'Product Name', predicted_date as 'Predicted Refill Date', action as 'Action'"
+
+# action_type filter -> SQL on the action column; GLOB prefixes can use the action index
+ACTION_TYPES = {
+    'overdue': ("action = ?", 'OVERDUE - Trigger Outreach'),
+    'alert': ("action GLOB ?", 'Alert in *'),
+}
+
+
+def build_filters(action_type: Optional[str] = None, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                  patient_id: Optional[str] = None) -> Tuple[List[str], list]:
+    clauses, params = [], []
+    if action_type:
+        if action_type not in ACTION_TYPES:
+            raise ValueError(f"Unknown action_type: {action_type}")
+        clause, value = ACTION_TYPES[action_type]
+        clauses.append(clause)
+        params.append(value)
+    if date_from:
+        clauses.append("predicted_date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        clauses.append("predicted_date <= ?")
+        params.append(str(date_to))
+    if patient_id:
+        clauses.append("patient_id = ?")
+        params.append(patient_id)
+    return clauses, params
+
+
+def _select(conn: sqlite3.Connection, clauses: List[str], params: list, after_id: Optional[int], limit: Optional[int]):
+    clauses, params = list(clauses), list(params)
+    if after_id is not None:
+        clauses.append("id > ?")
+        params.append(after_id)
+    query = f"SELECT {COLUMNS} FROM refill_predictions"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    conn.row_factory = sqlite3.Row
+    return conn.execute(query, params)
+
+
+def fetch_page(conn: sqlite3.Connection, cursor: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE, **filters) -> dict:
+    """One page of alerts plus the cursor for the next page (None on the last page)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    clauses, params = build_filters(**filters)
+    # One extra row tells whether another page exists without a COUNT query
+    rows = _select(conn, clauses, params, cursor, limit + 1).fetchall()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = items[-1]['id'] if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def iter_alerts(conn: sqlite3.Connection, batch_size: int = MAX_PAGE_SIZE, **filters) -> Iterator[dict]:
+    """Every matching alert in id order, fetched batch_size rows at a time."""
+    clauses, params = build_filters(**filters)
+    cur = _select(conn, clauses, params, None, None)
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(row)
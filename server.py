@@ -1,61 +1,134 @@
 import os
-import pandas as pd
+import json
+import asyncio
+import sys
+import functools
+from contextlib import asynccontextmanager
+from typing import List
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import boto3
-from decimal import Decimal
+from botocore.config import Config
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from backend_client import InProcessBackend
+from inventory_store import InventoryRepository, InsufficientStock, ItemNotFound
+from notifications import NotificationOutbox
+import order_batch
+import order_stream
+from patient_store import LEGACY_PATIENT_TABLE, PATIENT_TABLE, PatientRepository
+import tracing
 
 load_dotenv()
 
-app = FastAPI(title="Sovereign-RX Backend (Hybrid Storage)")
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-sns = boto3.client('sns', region_name='us-east-1')
+# Blocking storage calls run on a bounded pool sized to match the shared boto3 connection pools
+STORAGE_WORKERS = int(os.getenv("STORAGE_WORKERS", "32"))
+storage_executor = ThreadPoolExecutor(max_workers=STORAGE_WORKERS, thread_name_prefix="storage")
+boto_config = Config(max_pool_connections=STORAGE_WORKERS, retries={"max_attempts": 3, "mode": "standard"})
+
+dynamodb = boto3.resource('dynamodb', region_name='us-east-1', config=boto_config)
+sns = boto3.client('sns', region_name='us-east-1', config=boto_config)
+# One item per order/prediction; patients not yet moved over are read from the single-item table
+patients = PatientRepository(
+    table=dynamodb.Table(PATIENT_TABLE),
+    legacy_table=dynamodb.Table(LEGACY_PATIENT_TABLE) if os.getenv("PATIENT_LEGACY_FALLBACK", "1") == "1" else None,
+)
 
 SNS_TOPIC_ARN = os.getenv("SNS_TOPIC_ARN")
+# Order notifications go through a local durable outbox; a background worker batches them to SNS
+outbox = NotificationOutbox(sns, SNS_TOPIC_ARN) if SNS_TOPIC_ARN else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start delivering right away, including messages left over from a previous run
+    if outbox is not None:
+        outbox.start()
+    yield
+    if outbox is not None:
+        await asyncio.get_running_loop().run_in_executor(None, outbox.stop)
+
+app = FastAPI(title="Sovereign-RX Backend (Hybrid Storage)", lifespan=lifespan)
+
+# DynamoDB with a short read cache, CSV fallback parsed once per file change
+inventory = InventoryRepository(
+    table=dynamodb.Table('Inventory'),
+    csv_path='mock_inventory.csv',
+    cache_ttl=float(os.getenv("INVENTORY_CACHE_TTL", "2")),
+)
 
 # --- Storage Layer Functions ---
+# Synchronous; request handlers reach them through run_storage so the event loop never blocks.
 
+@tracing.traced("storage.get_inventory", outcome=lambda item: "ok" if item else "not_found")
 def get_inventory_item(product_id: str):
+    return inventory.get(product_id)
+
+@tracing.traced("storage.get_predictions")
+def get_patient_predictions(patient_id: str):
     try:
-        table = dynamodb.Table('Inventory')
-        response = table.get_item(Key={'product_id': product_id})
-        if 'Item' in response:
-            return response['Item']
+        with tracing.span("dynamodb.query_predictions"):
+            predictions = patients.get_predictions(patient_id)
+        if predictions is not None:
+            return predictions
     except Exception as e:
-        print(f"DynamoDB Access Error: {e}. Falling back to CSV.")
-    
-    # Local Fallback
-    df = pd.read_csv('mock_inventory.csv')
-    item = df[df['product name'] == product_id]
-    if not item.empty:
-        row = item.iloc[0]
-        return {
-            "product_id": row['product name'],
-            "prescription_required": row['prescription_required'],
-            "stock_level": int(row['stock_level'])
-        }
-    return None
+        print(f"DynamoDB Access Error: {e}. Falling back to local data.")
+
+    # Local Fallback (simplified for testing)
+    return [{"product_name": "NORSAN Omega-3 Total", "action": "No action needed yet"}]
+
+def publish_order_notification(message: str):
+    if outbox is not None:
+        outbox.enqueue(message, subject="New Pharmacy Order")
+        outbox.start()
+
+@tracing.traced("storage.place_order")
+def place_order(patient_id: str, product_id: str, quantity: int) -> dict:
+    if quantity < 1:
+        raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+
+    # 1. Check and decrement stock in one conditional write
+    try:
+        with tracing.span("inventory.decrement_stock"):
+            new_stock = inventory.decrement_stock(product_id, quantity)
+    except ItemNotFound:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    except InsufficientStock as e:
+        raise HTTPException(status_code=400, detail=f"Insufficient stock. Available: {e.available}")
+
+    # 2. Queue the SNS notification; the stock change is already committed, so a failure here is only logged
+    try:
+        message = f"Order successful for {patient_id}: {quantity}x {product_id}. Remaining stock: {new_stock}"
+        with tracing.span("outbox.enqueue"):
+            publish_order_notification(message)
+    except Exception as e:
+        print(f"Order notification could not be queued: {e}")
+
+    return {
+        "status": "Success",
+        "message": f"Order for {quantity} units of {product_id} processed.",
+        "remaining_stock": new_stock
+    }
+
+async def run_storage(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(storage_executor, functools.partial(fn, *args))
 
 @app.get("/inventory")
 async def get_med_info(product_id: str):
-    item = get_inventory_item(product_id)
+    item = await run_storage(get_inventory_item, product_id)
     if not item:
         raise HTTPException(status_code=404, detail="Medicine not found")
     return item
 
 @app.get("/patient/{patient_id}/predictions")
 async def get_refill_status(patient_id: str):
-    try:
-        table = dynamodb.Table('PatientState')
-        response = table.get_item(Key={'patient_id': patient_id})
-        if 'Item' in response:
-            return response['Item'].get('refill_predictions', [])
-    except Exception as e:
-        print(f"DynamoDB Access Error: {e}. Falling back to local data.")
-    
-    # Local Fallback (simplified for testing)
-    return [{"product_name": "NORSAN Omega-3 Total", "action": "No action needed yet"}]
+    return await run_storage(get_patient_predictions, patient_id)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: span latency histograms and cache hit/miss counters."""
+    return PlainTextResponse(tracing.render_metrics(), media_type="text/plain; version=0.0.4")
 
 class OrderRequest(BaseModel):
     patient_id: str
@@ -64,40 +137,41 @@ class OrderRequest(BaseModel):
 
 @app.post("/order/execute")
 async def execute_order(order: OrderRequest):
-    item = get_inventory_item(order.product_id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Medicine not found")
-    
-    current_stock = int(item.get('stock_level', 0))
-    if current_stock < order.quantity:
-        raise HTTPException(status_code=400, detail=f"Insufficient stock. Available: {current_stock}")
+    return await run_storage(place_order, order.patient_id, order.product_id, order.quantity)
 
-    new_stock = current_stock - order.quantity
+_local_backend = None
 
-    # 2. Attempt DynamoDB Update
-    try:
-        table = dynamodb.Table('Inventory')
-        table.update_item(
-            Key={'product_id': order.product_id},
-            UpdateExpression="SET stock_level = :val",
-            ExpressionAttributeValues={':val': Decimal(str(new_stock))}
-        )
-    except Exception as e:
-        print(f"DynamoDB Update Error: {e}. (Local stock update simulated)")
+def local_backend():
+    """Graph backend over this module's storage functions (never a second copy of the module)."""
+    global _local_backend
+    if _local_backend is None:
+        _local_backend = InProcessBackend(sys.modules[__name__])
+    return _local_backend
 
-    # 3. Trigger AWS SNS (Best Effort)
-    if SNS_TOPIC_ARN:
-        try:
-            message = f"Order successful for {order.patient_id}: {order.quantity}x {order.product_id}. Remaining stock: {new_stock}"
-            sns.publish(TopicArn=SNS_TOPIC_ARN, Message=message, Subject="New Pharmacy Order")
-        except:
-            pass
+class BatchOrderRequest(BaseModel):
+    requests: List[str]
+    concurrency: int = 16
 
-    return {
-        "status": "Success",
-        "message": f"Order for {order.quantity} units of {order.product_id} processed.",
-        "remaining_stock": new_stock
-    }
+@app.post("/agent/order/batch")
+async def batch_order(batch: BatchOrderRequest):
+    """Runs natural-language orders through the agent graph; streams one NDJSON line per finished order."""
+    if len(batch.requests) > order_batch.BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {order_batch.BATCH_MAX} requests per batch.")
+
+    async def results():
+        async for index, state in order_batch.stream_batch(batch.requests, batch.concurrency, backend=local_backend()):
+            yield json.dumps(order_batch.batch_result(index, state), default=str) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.get("/agent/order/stream")
+async def stream_order(message: str):
+    """Server-Sent Events for one natural-language order: a "node" event as each graph node finishes, then "done"."""
+    async def events():
+        async for event in order_stream.stream_events(message, backend=local_backend()):
+            yield order_stream.sse(event)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 if __name__ == "__main__":
     import uvicorn
@@ -2,32 +2,50 @@ import streamlit as st
 import os
 import requests
 import pandas as pd
-from orchestrator import app as graph_app
+from order_stream import iter_events
 from dotenv import load_dotenv
-from elevenlabs import ElevenLabs
+from audio_cache import AudioCache, audio_key
 
 load_dotenv()
 
-client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+ALERTS_PAGE_SIZE = 200
+DEFAULT_VOICE_ID = "21mOBAZ6jtBlW7lUX7eR"  # Rachel
+VOICE_MODEL_ID = "eleven_multilingual_v2"
 
 st.set_page_config(page_title="Sovereign-RX Agentic Portal", page_icon="💊", layout="wide")
 
+# One client and one audio cache per process, shared by every session
+@st.cache_resource
+def elevenlabs_client():
+    from elevenlabs import ElevenLabs
+    return ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+
+@st.cache_resource
+def audio_cache():
+    return AudioCache()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def voice_id():
+    # Rachel if the account has her, otherwise the first available voice
+    voices = elevenlabs_client().voices.get_all().voices
+    if any(v.voice_id == DEFAULT_VOICE_ID for v in voices):
+        return DEFAULT_VOICE_ID
+    return voices[0].voice_id
+
 def speak_text(text):
     try:
-        # Get available voices and use the first one if Rachel is missing
-        voices = client.voices.get_all().voices
-        voice_id = "21mOBAZ6jtBlW7lUX7eR" # Default to Rachel
-        
-        # Check if Rachel exists in user's account, otherwise pick the first
-        if not any(v.voice_id == voice_id for v in voices):
-            voice_id = voices[0].voice_id
-            
-        audio_stream = client.text_to_speech.convert(
-            text=text,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2"
-        )
-        audio_bytes = b"".join(audio_stream)
+        voice = voice_id()
+        key = audio_key(text, voice, VOICE_MODEL_ID)
+        # Repeat confirmations are played from disk without calling ElevenLabs
+        audio_bytes = audio_cache().get(key)
+        if audio_bytes is None:
+            audio_stream = elevenlabs_client().text_to_speech.convert(
+                text=text,
+                voice_id=voice,
+                model_id=VOICE_MODEL_ID
+            )
+            audio_bytes = b"".join(audio_cache().tee(key, audio_stream))
         st.audio(audio_bytes, format="audio/mp3", autoplay=True)
     except Exception as e:
         st.error(f"Voice Synthesis Error: {e}")
@@ -62,34 +80,30 @@ with tabs[0]:
         if not user_input:
             st.warning("Please enter a request.")
         else:
-            initial_state = {
-                "raw_input": user_input,
-                "patient_id": "Unknown",
-                "product_id": "Unknown",
-                "quantity": 1,
-                "is_rx_required": False,
-                "stock_level": 0,
-                "status": "STARTING",
-                "messages": [],
-                "cot_logic": []
+            # Each node's reasoning is rendered as soon as that node finishes
+            node_labels = {
+                "intake": "🏃 IntakeNode parsed the request",
+                "inventory_lookup": "📋 Inventory lookup returned",
+                "predictions_lookup": "🗂️ Refill history lookup returned",
+                "safety": "⚖️ SafetyNode verified records",
+                "action": "📦 ActionNode executed fulfillment",
             }
-
-            with st.status("Agents are collaborating...", expanded=True) as status:
-                st.write("🏃 IntakeNode parsing request...")
-                final_output = graph_app.invoke(initial_state)
-                st.write("⚖️ SafetyNode verifying records...")
-                st.write("📦 ActionNode executing fulfillment...")
-                status.update(label="Orchestration Complete!", state="complete", expanded=False)
-
             with col_out:
                 st.markdown("### 🧠 Agent Reasoning")
-                for step in final_output['cot_logic']:
-                    if "Thinking" in step:
-                        st.markdown(f"<div class='cot-step'>🔍 {step}</div>", unsafe_allow_html=True)
-                    elif "Observation" in step:
-                        st.markdown(f"<div class='observation'>📝 {step}</div>", unsafe_allow_html=True)
-                    else:
-                        st.write(step)
+                with st.status("Agents are collaborating...", expanded=True) as status:
+                    for event in iter_events(user_input):
+                        if event["event"] == "done":
+                            final_output = event
+                            break
+                        status.update(label=f"{node_labels.get(event['node'], event['node'])} ({event['status']})")
+                        for step in event['cot_logic']:
+                            if "Thinking" in step:
+                                st.markdown(f"<div class='cot-step'>🔍 {step}</div>", unsafe_allow_html=True)
+                            elif "Observation" in step:
+                                st.markdown(f"<div class='observation'>📝 {step}</div>", unsafe_allow_html=True)
+                            else:
+                                st.write(step)
+                    status.update(label="Orchestration Complete!", state="complete", expanded=True)
 
                 st.markdown("### 📊 Summary")
                 st.write(f"**Patient:** {final_output['patient_id']} | **Product:** {final_output['product_id']}")
@@ -106,17 +120,44 @@ with tabs[0]:
 
 with tabs[1]:
     st.subheader("Predictive Refill Intelligence")
-    if st.button("🔄 Refresh Alerts"):
+    # Filters are applied server-side; pages are fetched on demand and kept in the session
+    col1, col2, col3 = st.columns(3)
+    action_label = col1.selectbox("Action", ["All", "Overdue", "Upcoming alerts"])
+    patient_filter = col2.text_input("Patient ID")
+    date_range = col3.date_input("Predicted refill date", value=[])
+    params = {"limit": ALERTS_PAGE_SIZE}
+    if action_label != "All":
+        params["action_type"] = "overdue" if action_label == "Overdue" else "alert"
+    if patient_filter.strip():
+        params["patient_id"] = patient_filter.strip()
+    if len(date_range) == 2:
+        params["date_from"], params["date_to"] = str(date_range[0]), str(date_range[1])
+
+    alerts = st.session_state.setdefault("alerts", {"params": None, "rows": [], "next_cursor": None})
+
+    def fetch_alerts_page(cursor=None):
         try:
-            response = requests.get("http://127.0.0.1:8000/admin/proactive_refills")
+            response = requests.get(f"{API_BASE_URL}/admin/proactive_refills", params=dict(params, cursor=cursor), timeout=10)
             if response.status_code == 200:
-                df = pd.DataFrame(response.json())
-                st.dataframe(df, use_container_width=True)
+                page = response.json()
+                alerts["rows"].extend(page["items"])
+                alerts["next_cursor"] = page["next_cursor"]
             else:
                 st.error("Failed to fetch alerts from backend.")
         except Exception as e:
             st.error(f"Connection error: {e}")
 
+    if st.button("🔄 Refresh Alerts") or (alerts["params"] is not None and alerts["params"] != params):
+        alerts.update(params=params, rows=[], next_cursor=None)
+        fetch_alerts_page()
+    if alerts["rows"]:
+        st.dataframe(pd.DataFrame(alerts["rows"]).drop(columns="id"), use_container_width=True)
+    elif alerts["params"] is not None:
+        st.info("No alerts match these filters.")
+    if alerts["next_cursor"] is not None and st.button("Load more"):
+        fetch_alerts_page(alerts["next_cursor"])
+        st.rerun()
+
 with tabs[2]:
     st.subheader("Environment Configuration")
     st.info(f"**Backend:** Running on localhost:8000")
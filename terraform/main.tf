@@ -37,6 +37,24 @@ resource "aws_dynamodb_table" "patient_state_table" {
   }
 }
 
+# One item per order / prediction plus a SUMMARY item per patient (see patient_store.py)
+resource "aws_dynamodb_table" "patient_records_table" {
+  name           = "PatientRecords"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "patient_id"
+  range_key      = "sk"
+
+  attribute {
+    name = "patient_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "sk"
+    type = "S"
+  }
+}
+
 resource "aws_security_group" "ec2_sg" {
   name        = "agentic_apothecary_sg"
   description = "Allow SSH and Streamlit"
@@ -31,7 +31,7 @@ try:
 
     # Test Proactive Refills
     response = requests.get("http://localhost:8000/admin/proactive_refills")
-    print("Proactive Refills (first 2):", response.json()[:2])
+    print("Proactive Refills (first 2):", response.json()["items"][:2])
 
 finally:
     process.terminate()
@@ -0,0 +1,38 @@
+import os
+import time
+
+from audio_cache import AudioCache, audio_key
+
+
+def test_key_covers_text_voice_and_model():
+    key = audio_key("Order for PAT001 processed.", "voice-a", "model-1")
+    assert key == audio_key("Order for PAT001 processed.", "voice-a", "model-1")
+    assert key != audio_key("Order for PAT001 processed.", "voice-b", "model-1")
+    assert key != audio_key("Order for PAT001 processed.", "voice-a", "model-2")
+    assert key != audio_key("Order for PAT002 processed.", "voice-a", "model-1")
+
+
+def test_tee_stores_clip_only_when_fully_read(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=1024)
+    assert b"".join(cache.tee("a", [b"ab", b"cd"])) == b"abcd"
+    assert cache.get("a") == b"abcd"
+
+    stream = cache.tee("b", [b"ab", b"cd"])
+    next(stream)
+    stream.close()
+    assert cache.get("b") is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_least_recently_used_clips_are_evicted(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+    for key in ("a", "b"):
+        cache.put(key, b"x" * 100)
+        time.sleep(0.01)
+    cache.get("a")  # a is now the most recently used
+    time.sleep(0.01)
+    cache.put("c", b"x" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size() <= 250
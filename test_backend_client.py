@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+from fastapi import HTTPException
+
+from backend_client import BackendError, HttpBackend, InProcessBackend, MemoizedBackend
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """/inventory fails with 503 twice, /patient/... is slow, /order/execute always conflicts."""
+    calls = {}
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.calls[path] = self.calls.get(path, 0) + 1
+        if path == "/inventory":
+            if self.calls[path] <= 2:
+                return self.reply(503, {"detail": "busy"})
+            return self.reply(200, {"product_id": "A", "stock_level": 3})
+        time.sleep(0.5)
+        self.reply(200, [])
+
+    def do_POST(self):
+        self.calls[self.path] = self.calls.get(self.path, 0) + 1
+        self.reply(409, {"detail": "Insufficient stock. Available: 0"})
+
+
+@pytest.fixture
+def http_backend():
+    FlakyHandler.calls = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield HttpBackend(f"http://127.0.0.1:{server.server_port}", timeout=0.2, retries=2, backoff=0)
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_reads_retry_and_orders_map_errors(http_backend):
+    assert http_backend.get_inventory("A") == {"product_id": "A", "stock_level": 3}
+    assert FlakyHandler.calls["/inventory"] == 3
+
+    with pytest.raises(BackendError) as exc:
+        http_backend.execute_order("PAT001", "A", 1)
+    assert (exc.value.status_code, exc.value.detail) == (409, "Insufficient stock. Available: 0")
+    # Not idempotent, so never retried
+    assert FlakyHandler.calls["/order/execute"] == 1
+
+    # Read timeouts are retried as well; once retries run out requests reports a ConnectionError
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http_backend.get_predictions("PAT001")
+
+
+def test_in_process_backend_uses_the_given_module():
+    def place_order(patient_id, product_id, quantity):
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    module = SimpleNamespace(get_inventory_item=lambda product_id: {"product_id": product_id},
+                             get_patient_predictions=lambda patient_id: [], place_order=place_order)
+    backend = InProcessBackend(module)
+    assert backend.get_inventory("A") == {"product_id": "A"}
+    with pytest.raises(BackendError) as exc:
+        backend.execute_order("PAT001", "A", 1)
+    assert exc.value.status_code == 404
+
+    import server
+    assert server.local_backend().server is server
+
+
+class CountingBackend:
+    def __init__(self):
+        self.calls = []
+        self.fail = True
+
+    def get_inventory(self, product_id):
+        self.calls.append(("inventory", product_id))
+        time.sleep(0.05)
+        return {"product_id": product_id}
+
+    def get_predictions(self, patient_id):
+        self.calls.append(("predictions", patient_id))
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("timeout")
+        return []
+
+    def execute_order(self, patient_id, product_id, quantity):
+        self.calls.append(("order", product_id))
+        return {"status": "success"}
+
+
+def test_memoized_backend_shares_lookups_but_not_failures_or_orders():
+    inner = CountingBackend()
+    backend = MemoizedBackend(inner)
+    threads = [threading.Thread(target=backend.get_inventory, args=("A",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert inner.calls == [("inventory", "A")]
+
+    with pytest.raises(RuntimeError):
+        backend.get_predictions("PAT001")
+    assert backend.get_predictions("PAT001") == []
+    backend.execute_order("PAT001", "A", 1)
+    backend.execute_order("PAT001", "A", 1)
+    assert inner.calls.count(("predictions", "PAT001")) == 2 and inner.calls.count(("order", "A")) == 2
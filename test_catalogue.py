@@ -0,0 +1,61 @@
+import csv
+import os
+
+import catalogue
+
+
+def write_inventory(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["product name", "prescription_required", "stock_level"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_load_builds_artifact_and_rebuilds_when_source_changes(tmp_path):
+    inventory = tmp_path / "inventory.csv"
+    artifact = str(tmp_path / "catalogue.bin")
+    write_inventory(inventory, [{"product name": "Aspirin 100mg", "prescription_required": "No", "stock_level": "12.0"}])
+
+    loaded = catalogue.load(artifact, str(tmp_path / "missing.xlsx"), str(inventory))
+    assert os.path.exists(artifact)
+    assert loaded.names(in_inventory=True) == ["Aspirin 100mg"]
+    assert loaded.get("Aspirin 100mg")["stock_level"] == 12
+    assert catalogue.load(artifact, str(tmp_path / "missing.xlsx"), str(inventory)) is loaded
+
+    write_inventory(inventory, [{"product name": "Ibuprofen 400mg", "prescription_required": "Yes", "stock_level": "3"}])
+    os.utime(inventory, ns=(os.stat(artifact).st_mtime_ns + 10**9,) * 2)
+    catalogue._loaded.clear()
+    rebuilt = catalogue.load(artifact, str(tmp_path / "missing.xlsx"), str(inventory))
+    assert rebuilt.names() == ["Ibuprofen 400mg"]
+    assert rebuilt.version != loaded.version
+    catalogue._loaded.clear()
+
+
+def test_index_finds_every_row_and_round_trips_fields(tmp_path):
+    records = [{"name": f"Product {i} {'®' * (i % 3)}", "pzn": f"{i:08d}" if i % 2 else None, "price": i / 4 if i % 5 else None,
+                "package_size": "20 St", "listed": i % 7 != 0, "in_inventory": i % 3 == 0,
+                "prescription_required": "Yes" if i % 4 == 0 else "No", "stock_level": i} for i in range(500)]
+    path = str(tmp_path / "catalogue.bin")
+    catalogue.write({"version": "0123456789abcdef", "sources": [], "records": records}, path)
+
+    loaded = catalogue.Catalogue(path)
+    assert len(loaded) == 500 and loaded.version == "0123456789abcdef"
+    assert loaded.records == records
+    assert all(loaded.find(record["name"]) == i for i, record in enumerate(records))
+    assert loaded.get("Product 500") is None and "Product" not in loaded
+    assert loaded.names(in_inventory=True, listed=True) == [r["name"] for r in records if r["in_inventory"] and r["listed"]]
+
+
+
+def test_replaced_catalogue_stays_readable(tmp_path):
+    inventory = tmp_path / "inventory.csv"
+    artifact = str(tmp_path / "catalogue.bin")
+    write_inventory(inventory, [{"product name": "Aspirin 100mg", "prescription_required": "No", "stock_level": "1"}])
+    old = catalogue.load(artifact, str(tmp_path / "missing.xlsx"), str(inventory))
+    rows = iter(old)
+
+    os.utime(inventory, ns=(os.stat(artifact).st_mtime_ns + 10**9,) * 2)
+    new = catalogue.load(artifact, str(tmp_path / "missing.xlsx"), str(inventory))
+    # A reader still iterating the replaced catalogue finishes on its own mapping
+    assert new is not old and [row["name"] for row in rows] == ["Aspirin 100mg"]
+    catalogue._loaded.clear()
@@ -0,0 +1,91 @@
+import operator
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, StateGraph
+
+import db
+from checkpoint_retention import CheckpointRetention
+
+
+class OrderState(TypedDict):
+    status: str
+    agent_thought: Annotated[List[str], operator.add]
+
+
+def build_graph(saver):
+    workflow = StateGraph(OrderState)
+    workflow.add_node("validator", lambda state: {"status": "hold" if state["agent_thought"][0] == "rx" else "approved",
+                                                  "agent_thought": ["validator" + "x" * 2000]})
+    workflow.add_node("action", lambda state: {"status": "completed", "agent_thought": ["action"]})
+    workflow.set_entry_point("validator")
+    workflow.add_conditional_edges("validator", lambda state: END if state["status"] == "hold" else "action")
+    workflow.add_edge("action", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def checkpoint_counts(conn):
+    return dict(conn.execute("SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id").fetchall())
+
+
+@pytest.fixture
+def graph(tmp_path):
+    conn = db.connect(str(tmp_path / "checkpoints.db"))
+    graph = build_graph(SqliteSaver(conn))
+    for i in range(40):
+        graph.invoke({"status": "pending", "agent_thought": ["rx" if i % 10 == 0 else "otc"]}, {"configurable": {"thread_id": f"order_{i}"}})
+    yield graph, conn
+    conn.close()
+
+
+def test_compacts_finished_threads_and_keeps_holds(graph, tmp_path):
+    graph, conn = graph
+    before = checkpoint_counts(conn)
+    retention = CheckpointRetention(str(tmp_path / "checkpoints.db"), grace_seconds=0)
+    report = retention.run_once()
+
+    after = checkpoint_counts(conn)
+    holds = {f"order_{i}" for i in range(0, 40, 10)}
+    assert all(after[t] == before[t] > 1 for t in holds)
+    assert all(after[t] == 1 for t in after if t not in holds)
+    assert report["threads_compacted"] == 36 and report["threads_expired"] == 0
+    assert report["reclaimed_bytes"] > 0
+
+    # The remaining checkpoint still carries the full final state
+    state = graph.get_state({"configurable": {"thread_id": "order_1"}})
+    assert state.values["status"] == "completed" and len(state.values["agent_thought"]) == 3
+
+
+def test_expires_threads_after_ttl(graph, tmp_path):
+    graph, conn = graph
+    retention = CheckpointRetention(str(tmp_path / "checkpoints.db"), ttl_hours=1, hold_ttl_hours=48)
+    report = retention.run_once(now=datetime.now(timezone.utc) + timedelta(hours=2))
+
+    assert report["threads_expired"] == 36
+    assert set(checkpoint_counts(conn)) == {f"order_{i}" for i in range(0, 40, 10)}
+    assert conn.execute("SELECT COUNT(*) FROM writes WHERE thread_id = 'order_1'").fetchone()[0] == 0
+
+
+def test_background_loop_runs_in_one_process_and_never_full_vacuums(graph, tmp_path):
+    graph, conn = graph
+    path = str(tmp_path / "checkpoints.db")
+    first, second = CheckpointRetention(path), CheckpointRetention(path)
+    assert first.start(interval=3600)
+    assert not second.start(interval=3600)
+    first.stop()
+    assert second.start(interval=3600)
+    second.stop()
+
+    def auto_vacuum():
+        fresh = db.connect(path)
+        try:
+            return fresh.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            fresh.close()
+
+    first.run_once(now=datetime.now(timezone.utc) + timedelta(hours=200))
+    assert auto_vacuum() == 0
+    first.run_once(full_vacuum=True)
+    assert auto_vacuum() == 2
@@ -0,0 +1,118 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import data_prep
+import migrate_data
+from benchmarks.bench_refill_engine import legacy_refill_predictions, synthetic_history
+from data_prep import CURRENT_DATE, compute_refill_predictions
+
+
+def real_history():
+    history = pd.read_excel('db/Consumer Order History 1.xlsx', header=4)
+    products = pd.read_excel('db/products-export.xlsx')
+    orders_df = pd.DataFrame({
+        'patient_id': history['Patient ID'],
+        'product_name': history['Product Name'],
+        'purchase_date': history['Purchase Date'].astype(str),
+        'quantity': history['Quantity'],
+        'dosage_frequency': history['Dosage Frequency'],
+    })
+    products_df = pd.DataFrame({'name': products['product name'], 'package_size': products['package size']})
+    return orders_df, products_df
+
+
+@pytest.mark.parametrize("current_date", [CURRENT_DATE, pd.Timestamp("2024-04-20"), pd.Timestamp("2024-06-01")])
+def test_matches_legacy_engine_on_order_history(current_date):
+    orders_df, products_df = real_history()
+    expected = legacy_refill_predictions(orders_df, products_df, current_date)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(compute_refill_predictions(orders_df, products_df, current_date), expected)
+
+
+def test_matches_legacy_engine_on_repeat_purchases():
+    orders_df, products_df = synthetic_history(5_000, n_patients=400, n_products=60)
+    # Unknown dosage strings and same-day repeat orders must be handled the same way
+    orders_df.loc[orders_df.index % 11 == 0, 'dosage_frequency'] = 'Every other day'
+    orders_df.loc[orders_df.index % 13 == 0, 'purchase_date'] = str(CURRENT_DATE.date())
+    expected = legacy_refill_predictions(orders_df, products_df)
+    pd.testing.assert_frame_equal(compute_refill_predictions(orders_df, products_df), expected)
+
+
+def load_orders(db_path, orders_df):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO orders (patient_id, product_name, purchase_date, quantity, dosage_frequency) VALUES (?, ?, ?, ?, ?)",
+        list(orders_df[['patient_id', 'product_name', 'purchase_date', 'quantity', 'dosage_frequency']].itertuples(index=False, name=None)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def refill_tables(db_path):
+    conn = sqlite3.connect(db_path)
+    predictions = pd.read_sql_query("SELECT patient_id, product_name, predicted_date, action FROM refill_predictions ORDER BY patient_id, product_name", conn)
+    stats = pd.read_sql_query("SELECT * FROM refill_stats ORDER BY patient_id, product_name", conn)
+    conn.close()
+    return predictions, stats
+
+
+def test_incremental_run_matches_full_rebuild(tmp_path, monkeypatch):
+    orders_df, products_df = synthetic_history(6_000, n_patients=300, n_products=40)
+    orders_df['quantity'] = orders_df['quantity'].astype(int).tolist()
+    # Mostly chronological arrivals, with the last batch mixing in back-dated orders
+    orders_df = orders_df.sort_values('purchase_date', kind='mergesort').reset_index(drop=True)
+    batches = [orders_df.iloc[:4_000], orders_df.iloc[4_000:5_000], orders_df.iloc[5_000:].sample(frac=1, random_state=1)]
+    batches[2] = pd.concat([batches[2], orders_df.iloc[:300]])
+
+    def run(db_path, chunks):
+        monkeypatch.setattr(migrate_data, 'DB_PATH', str(db_path))
+        monkeypatch.setattr(data_prep, 'DB_PATH', str(db_path))
+        conn = migrate_data.init_db()
+        conn.executemany("INSERT INTO products (name, package_size) VALUES (?, ?)", list(products_df.itertuples(index=False, name=None)))
+        conn.commit()
+        conn.close()
+        for chunk in chunks:
+            load_orders(db_path, chunk)
+            data_prep.calculate_probabilistic_refills()
+
+    run(tmp_path / "incremental.db", batches)
+    run(tmp_path / "full.db", [pd.concat(batches)])
+
+    incremental = refill_tables(tmp_path / "incremental.db")
+    full = refill_tables(tmp_path / "full.db")
+    assert len(full[0]) > 0
+    pd.testing.assert_frame_equal(incremental[0], full[0])
+    pd.testing.assert_frame_equal(incremental[1], full[1])
+
+
+def test_reruns_keep_prediction_ids(tmp_path, monkeypatch):
+    orders_df, products_df = synthetic_history(3_000, n_patients=150, n_products=30)
+    orders_df['quantity'] = orders_df['quantity'].astype(int).tolist()
+    orders_df = orders_df.sort_values('purchase_date', kind='mergesort').reset_index(drop=True)
+    db_path = str(tmp_path / "pharmacy.db")
+    monkeypatch.setattr(migrate_data, 'DB_PATH', db_path)
+    monkeypatch.setattr(data_prep, 'DB_PATH', db_path)
+    conn = migrate_data.init_db()
+    conn.executemany("INSERT INTO products (name, package_size) VALUES (?, ?)", list(products_df.itertuples(index=False, name=None)))
+    conn.commit()
+
+    def ids():
+        return dict(((patient, product), id) for id, patient, product in
+                    conn.execute("SELECT id, patient_id, product_name FROM refill_predictions"))
+
+    load_orders(db_path, orders_df.iloc[:2_500])
+    data_prep.calculate_probabilistic_refills()
+    before = ids()
+    load_orders(db_path, orders_df.iloc[2_500:])
+    data_prep.calculate_probabilistic_refills()
+    after = ids()
+    data_prep.calculate_probabilistic_refills(full=True)
+    rebuilt = ids()
+    conn.close()
+
+    kept = before.keys() & after.keys()
+    assert kept and len(kept) < len(before)
+    assert all(after[key] == before[key] for key in kept)
+    assert rebuilt == after
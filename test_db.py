@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from db import ConnectionPool
+
+
+def test_pool_is_bounded_reused_and_wal(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pharmacy.db"), size=3)
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+
+    def use(i):
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO t VALUES (?)", (i,))
+            conn.commit()
+            return id(conn)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        used = set(executor.map(use, range(200)))
+    assert len(used) <= 3
+
+    # An open transaction is rolled back when the connection goes back to the pool
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO t VALUES (-1)")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 200
+    pool.close()
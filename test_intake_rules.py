@@ -0,0 +1,51 @@
+import intake_rules
+from product_index import ProductIndex
+
+CATALOGUE = ["NORSAN Omega-3 Total", "NORSAN Omega-3 Vegan", "Sinupret® Saft", "Vitasprint B12 Kapseln",
+             "Vitasprint Pro Energie", "Vitasprint Duo Energie", "Panthenol Spray", "Bepanthen Wund- und Heilsalbe"]
+INDEX = ProductIndex(CATALOGUE)
+
+
+def fast(text):
+    return intake_rules.fast_path(text, INDEX.match(text, k=5), threshold=90, margin=10)[0]
+
+
+def test_quantity_parser():
+    assert intake_rules.parse_quantity("2 packs of Sinupret") == 2
+    assert intake_rules.parse_quantity("Sinupret x3") == 3
+    assert intake_rules.parse_quantity("3x Sinupret") == 3
+    assert intake_rules.parse_quantity("two bottles please") == 2
+    assert intake_rules.parse_quantity("qty: 4") == 4
+    assert intake_rules.parse_quantity("NORSAN Omega-3 Total") == 1
+    assert intake_rules.parse_quantity("Vitasprint B12, 500 mg") == 1
+    assert intake_rules.parse_quantity("2 packs, qty 3") is None
+
+
+def test_unambiguous_request_skips_llm():
+    assert fast("PAT002 here, two bottles of NORSAN Omega-3 Total please") == {
+        "patient_id": "PAT002", "product_id": "NORSAN Omega-3 Total", "quantity": 2}
+    assert fast("pat7 Sinupret Saft x2") == {"patient_id": "PAT7", "product_id": "Sinupret® Saft", "quantity": 2}
+
+
+def test_ambiguous_requests_escalate():
+    assert fast("Sinupret Saft please") is None  # no patient id
+    assert fast("PAT001 and PAT002 want Sinupret Saft") is None
+    assert fast("PAT001 needs Vitasprint") is None  # three products match equally
+    assert fast("PAT001 Sinupret juice") is None  # low confidence
+    assert fast("PAT001 Sinupret Saft 4") is None  # stray number
+    assert fast("PAT001 2 packs Sinupret Saft, qty 3") is None
+    assert fast("PAT001 Panthenol Spray and Sinupret Saft") is None  # two products
+
+
+def test_negated_or_cancelled_requests_escalate():
+    assert fast("PAT001 Panthenol Spray please") == {"patient_id": "PAT001", "product_id": "Panthenol Spray", "quantity": 1}
+    assert fast("PAT001 I do NOT want Panthenol spray, I want Bepanthen") is None
+    assert fast("PAT001 cancel my Panthenol spray order") is None
+    assert fast("PAT001 I don't need Panthenol Spray anymore") is None
+    assert fast("PAT001 Sinupret Saft instead of Panthenol Spray") is None
+
+
+def test_second_product_above_floor_escalates():
+    matches = [("Panthenol Spray", 100.0), ("Bepanthen Wund- und Heilsalbe", 86.0)]
+    assert intake_rules.fast_path("PAT001 Panthenol Spray, Bepanthen", matches, threshold=90, margin=10, other_score=85)[0] is None
+    assert intake_rules.fast_path("PAT001 Panthenol Spray", matches[:1], threshold=90, margin=10, other_score=85)[0] is not None
@@ -0,0 +1,92 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.moto_aws import create_table
+from inventory_store import InventoryRepository, InsufficientStock, ItemNotFound
+
+ORDERS = 60
+STOCK = 25
+
+
+@pytest.fixture
+def inventory_table(dynamodb):
+    table = create_table(dynamodb, 'Inventory', 'product_id')
+    table.put_item(Item={'product_id': 'NORSAN Omega-3 Total', 'prescription_required': 'No', 'stock_level': STOCK})
+    return table
+
+
+@pytest.fixture
+def inventory_csv(tmp_path):
+    path = tmp_path / "mock_inventory.csv"
+    path.write_text(f"product name,prescription_required,stock_level\nMucosolvan,Yes,{STOCK}\n")
+    return str(path)
+
+
+def place_orders(repo, product_id, quantity=1):
+    def order(_):
+        try:
+            return repo.decrement_stock(product_id, quantity)
+        except InsufficientStock:
+            return None
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        return list(pool.map(order, range(ORDERS)))
+
+
+def test_parallel_orders_never_oversell_dynamodb(inventory_table, inventory_csv):
+    repo = InventoryRepository(inventory_table, inventory_csv)
+    results = place_orders(repo, 'NORSAN Omega-3 Total')
+
+    succeeded = [r for r in results if r is not None]
+    assert len(succeeded) == STOCK
+    assert sorted(succeeded) == list(range(STOCK))
+    item = inventory_table.get_item(Key={'product_id': 'NORSAN Omega-3 Total'})['Item']
+    assert item['stock_level'] == 0
+
+
+def test_parallel_orders_never_oversell_local_fallback(inventory_csv):
+    repo = InventoryRepository(None, inventory_csv)
+    results = place_orders(repo, 'Mucosolvan')
+
+    assert len([r for r in results if r is not None]) == STOCK
+    assert repo.get('Mucosolvan')['stock_level'] == 0
+
+
+def orders_from_one_worker(csv_path):
+    # A separate process, like one gunicorn worker with its own repository
+    return sum(r is not None for r in place_orders(InventoryRepository(None, csv_path), 'Mucosolvan'))
+
+
+def test_worker_processes_never_oversell_local_fallback(inventory_csv):
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        succeeded = pool.map(orders_from_one_worker, [inventory_csv] * 4)
+    assert sum(succeeded) == STOCK
+    assert InventoryRepository(None, inventory_csv).get('Mucosolvan')['stock_level'] == 0
+
+
+def test_insufficient_and_missing_items(inventory_table, inventory_csv):
+    repo = InventoryRepository(inventory_table, inventory_csv)
+    with pytest.raises(InsufficientStock) as exc:
+        repo.decrement_stock('NORSAN Omega-3 Total', STOCK + 1)
+    assert exc.value.available == STOCK
+
+    # Not in DynamoDB: served from the CSV fallback
+    assert repo.decrement_stock('Mucosolvan', 2) == STOCK - 2
+    with pytest.raises(ItemNotFound):
+        repo.decrement_stock('Unknown Medicine', 1)
+
+
+def test_local_stock_taken_survives_csv_reload(tmp_path):
+    path = tmp_path / "mock_inventory.csv"
+    path.write_text(f"product name,prescription_required,stock_level\nMucosolvan,Yes,{STOCK}\n")
+    repo = InventoryRepository(None, str(path), reload_check_interval=0)
+    assert repo.decrement_stock('Mucosolvan', 5) == STOCK - 5
+
+    # Rewritten (e.g. by data_prep) with the original level and a new product
+    path.write_text(f"product name,prescription_required,stock_level\nMucosolvan,Yes,{STOCK}\nAspirin,No,3\n")
+    assert repo.get('Aspirin')['stock_level'] == 3
+    assert repo.get('Mucosolvan')['stock_level'] == STOCK - 5
+    with pytest.raises(InsufficientStock):
+        repo.decrement_stock('Mucosolvan', STOCK)
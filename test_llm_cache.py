@@ -0,0 +1,108 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from llm_cache import CatalogueVersion, MemoryCache, ResponseCache, SingleFlight, SQLiteCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_tier(request, tmp_path):
+    counter = itertools.count()
+
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemoryCache(**kwargs)
+        return SQLiteCache(str(tmp_path / f"llm_cache_{next(counter)}.db"), **kwargs)
+    return make
+
+
+def test_entries_expire_after_ttl(make_tier):
+    expired, fresh = make_tier(ttl=-1), make_tier(ttl=60)
+    expired.set("k", {"product_id": "A"})
+    fresh.set("k", {"product_id": "A"})
+    assert expired.get("k") is None
+    assert fresh.get("k") == {"product_id": "A"}
+
+
+def test_memory_lru_cap_keeps_recently_used():
+    cache = MemoryCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_sqlite_row_cap_and_purge(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "llm_cache.db"), max_rows=10)
+    for i in range(100):
+        cache.set(f"k{i}", i, version="v1")
+    # Eviction runs every 100 writes and keeps the most recently used rows
+    assert cache._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 10
+    assert cache.get("k99") == 99 and cache.get("k0") is None
+
+    cache.set("new", 1, version="v2")
+    cache.purge("v2")
+    assert cache.get("k99") is None and cache.get("new") == 1
+
+
+def test_catalogue_change_invalidates_keys(tmp_path):
+    csv_path = tmp_path / "inventory.csv"
+    csv_path.write_text("product name,prescription_required,stock_level\nA,No,1\n")
+    version = CatalogueVersion(["A"], str(csv_path))
+    tier = MemoryCache()
+    cache = ResponseCache([tier], version.current)
+    cache.set("I need A", {"product_id": "A"})
+    assert cache.get("i need a!") == {"product_id": "A"}
+
+    csv_path.write_text("product name,prescription_required,stock_level\nA,No,1\nB,No,1\n")
+    assert cache.get("I need A") is None
+    assert cache.stats()["misses"] == 1 and not tier._data
+
+
+def test_single_flight_runs_one_call_per_key():
+    flight = SingleFlight()
+    start = threading.Barrier(5)
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"product_id": "A"}
+
+    def request():
+        start.wait()
+        results.append(flight.do("k", slow))
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"product_id": "A"}] * 5
+
+    def failing():
+        raise RuntimeError("groq down")
+    with pytest.raises(RuntimeError):
+        flight.do("k", failing)
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_hit_and_miss_counters_are_thread_safe():
+    cache = ResponseCache([MemoryCache()])
+    cache.set("I need A", {"product_id": "A"})
+
+    def lookups():
+        for _ in range(2_000):
+            cache.get("I need A")
+            cache.get("I need B")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["hits"] == {"memory": 16_000} and cache.stats()["misses"] == 16_000
@@ -0,0 +1,85 @@
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend_client
+import db
+from benchmarks.moto_aws import create_table
+import main
+import migrate_data
+import orchestrator
+
+
+class RxBackend:
+    def __init__(self):
+        self.orders = []
+
+    def get_inventory(self, product_id):
+        return {"prescription_required": "Yes", "stock_level": 5}
+
+    def get_predictions(self, patient_id):
+        return []
+
+    def execute_order(self, patient_id, product_id, quantity):
+        self.orders.append((patient_id, product_id, quantity))
+        return {"status": "success"}
+
+
+def use_database(tmp_path, monkeypatch):
+    path = str(tmp_path / "pharmacy.db")
+    monkeypatch.setattr(migrate_data, "DB_PATH", path)
+    conn = migrate_data.init_db()
+    conn.execute("INSERT INTO refill_predictions (patient_id, product_name, predicted_date, action) "
+                 "VALUES ('PAT001', 'Mucosolvan', '2024-03-01', 'OVERDUE - Trigger Outreach')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(main, "pool", db.ConnectionPool(path))
+    monkeypatch.setattr(db, "CHECKPOINT_DB_PATH", path)
+    monkeypatch.setattr(orchestrator, "llm_extract",
+                        lambda raw, patient, shortlist: ({"patient_id": "PAT001", "product_id": "Mucosolvan", "quantity": 1}, False))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    use_database(tmp_path, monkeypatch)
+    backend = RxBackend()
+    monkeypatch.setattr(backend_client, "get_backend", lambda mode=None: backend)
+    with TestClient(main.app) as client:
+        client.backend = backend
+        yield client
+
+
+def test_startup_serves_orders_holds_and_alerts(client):
+    alerts = client.get("/admin/proactive_refills").json()
+    assert [row["Product Name"] for row in alerts["items"]] == ["Mucosolvan"]
+
+    held = client.post("/agent/order", json={"message": "I need Mucosolvan", "patient_id": "PAT001"}).json()
+    assert held["status"] == "PRESCRIPTION_MISSING"
+    assert client.backend.orders == []
+
+    approved = client.post("/admin/approve_hold", json={"thread_id": held["thread_id"], "admin_notes": "Rx on file"}).json()
+    assert approved["status"] == "COMPLETED"
+    assert "Pharmacist: Rx on file" in approved["agent_thought"]
+    assert client.backend.orders == [("PAT001", "Mucosolvan", 1)]
+
+    metrics = client.get("/metrics").text
+    assert 'span="intake"' in metrics and 'span="action",status="completed"' in metrics
+
+
+def test_orders_reach_storage_without_a_separate_backend(tmp_path, monkeypatch, dynamodb):
+    # The documented setup: only main.py runs, so the graph must not call itself over HTTP
+    use_database(tmp_path, monkeypatch)
+    table = create_table(dynamodb, "Inventory", "product_id")
+    table.put_item(Item={"product_id": "Mucosolvan", "prescription_required": "No", "stock_level": 5})
+    # server.py may have been imported (and built its boto3 resource) before moto started
+    import server
+    monkeypatch.setattr(server.inventory, "table", table)
+    server.inventory.invalidate()
+    with TestClient(main.app) as client:
+        result = client.post("/agent/order", json={"message": "I need Mucosolvan", "patient_id": "PAT001"}).json()
+    assert result["status"] == "COMPLETED", result["agent_thought"]
+    assert table.get_item(Key={"product_id": "Mucosolvan"})["Item"]["stock_level"] == 4
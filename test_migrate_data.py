@@ -0,0 +1,36 @@
+import sqlite3
+
+import pandas as pd
+
+import catalogue
+import migrate_data
+from benchmarks.bench_migrate import legacy_migrate, write_workbooks
+
+
+def tables(db_path):
+    conn = sqlite3.connect(db_path)
+    orders = conn.execute("SELECT patient_id, product_name, purchase_date, quantity, dosage_frequency FROM orders ORDER BY id").fetchall()
+    products = conn.execute("SELECT name, pzn, price, package_size, prescription_required FROM products ORDER BY name").fetchall()
+    conn.close()
+    return orders, products
+
+
+def test_migrates_a_workbook_like_the_previous_loader(tmp_path, monkeypatch):
+    history_path, products_path = write_workbooks(str(tmp_path), 300, 20)
+    monkeypatch.setattr(catalogue, "_loaded", {})
+
+    monkeypatch.setattr(migrate_data, "DB_PATH", str(tmp_path / "legacy.db"))
+    legacy_migrate(history_path, products_path)
+    monkeypatch.setattr(migrate_data, "DB_PATH", str(tmp_path / "pharmacy.db"))
+    migrate_data.migrate_data(history_path, products_path)
+
+    orders, products = tables(tmp_path / "pharmacy.db")
+    assert len(orders) == 300
+    assert orders == tables(tmp_path / "legacy.db")[0]
+
+    # Products as exported (PZNs keep their leading zeros), Rx flag from the first order of each
+    history = pd.read_excel(history_path, header=4)
+    rx = dict(zip(history['Product Name'][::-1], history['Prescription Required'][::-1]))
+    export = pd.read_excel(products_path, dtype={'pzn': str})
+    assert products == sorted((row['product name'], row['pzn'], row['price rec'], row['package size'], rx.get(row['product name'], 'No'))
+                              for _, row in export.iterrows())
@@ -0,0 +1,60 @@
+import pytest
+
+import catalogue
+from benchmarks.moto_aws import create_table
+from migrate_to_dynamo import Checkpoint, inventory_items, item_fingerprint, segment_of, write_items
+
+SEGMENTS = 8
+
+
+@pytest.fixture
+def patient_table(dynamodb):
+    return create_table(dynamodb, 'PatientState', 'patient_id')
+
+
+def patients(n):
+    return [{'patient_id': f"PAT{i:05d}", 'orders': [{'product_name': 'NORSAN Omega-3 Total', 'quantity': 1, 'price': 27.5}]}
+            for i in range(n)]
+
+
+def stored_ids(table):
+    ids, kwargs = set(), {}
+    while True:
+        page = table.scan(ProjectionExpression='patient_id', **kwargs)
+        ids.update(item['patient_id'] for item in page['Items'])
+        if 'LastEvaluatedKey' not in page:
+            return ids
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+def test_parallel_batched_write(patient_table, tmp_path):
+    items = patients(1_200)
+    write_items('PatientState', items, 'patient_id', workers=4, segments=SEGMENTS, checkpoint_dir=str(tmp_path), chunk_size=100)
+
+    assert stored_ids(patient_table) == {item['patient_id'] for item in items}
+    item = patient_table.get_item(Key={'patient_id': 'PAT00042'})['Item']
+    assert str(item['orders'][0]['price']) == '27.5'
+    # Completed runs leave no checkpoint behind
+    assert not (tmp_path / "PatientState.json").exists()
+
+
+def test_resumes_from_checkpoint(patient_table, tmp_path):
+    items = patients(600)
+    # Simulate an interrupted run that already finished segment 0 (but nothing actually reached the table)
+    checkpoint_items = [item for item in items if segment_of(item['patient_id'], SEGMENTS) == 0]
+    Checkpoint(str(tmp_path / "PatientState.json"), item_fingerprint(items, 'patient_id'), SEGMENTS).advance(0, len(checkpoint_items))
+
+    write_items('PatientState', items, 'patient_id', workers=4, segments=SEGMENTS, checkpoint_dir=str(tmp_path), chunk_size=50)
+
+    skipped = {item['patient_id'] for item in checkpoint_items}
+    assert skipped
+    assert stored_ids(patient_table) == {item['patient_id'] for item in items} - skipped
+
+
+def test_inventory_items_omit_missing_pzn(monkeypatch):
+    rows = [{"name": name, "pzn": pzn, "price": 1.0, "package_size": "20 St", "listed": True, "in_inventory": True,
+             "prescription_required": "No", "stock_level": 5} for name, pzn in (("A", "01234567"), ("B", None))]
+    monkeypatch.setattr(catalogue, "load", lambda: rows)
+    items = inventory_items()
+    assert items[0]["pzn"] == "01234567"
+    assert "pzn" not in items[1]
@@ -0,0 +1,96 @@
+import json
+import time
+
+import boto3
+import pytest
+
+from notifications import NotificationOutbox
+
+
+@pytest.fixture
+def sns_topic(dynamodb):
+    sns = boto3.client('sns', region_name='us-east-1')
+    sqs = boto3.client('sqs', region_name='us-east-1')
+    topic_arn = sns.create_topic(Name='order-notifications')['TopicArn']
+    queue_url = sqs.create_queue(QueueName='order-notifications')['QueueUrl']
+    queue_arn = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['QueueArn'])['Attributes']['QueueArn']
+    sns.subscribe(TopicArn=topic_arn, Protocol='sqs', Endpoint=queue_arn)
+    return sns, topic_arn, sqs, queue_url
+
+
+class CountingSNS:
+    def __init__(self, sns, fail_calls=0):
+        self.sns = sns
+        self.batch_sizes = []
+        self.fail_calls = fail_calls
+
+    def publish_batch(self, **kwargs):
+        if self.fail_calls:
+            self.fail_calls -= 1
+            raise ConnectionError("SNS unreachable")
+        self.batch_sizes.append(len(kwargs['PublishBatchRequestEntries']))
+        return self.sns.publish_batch(**kwargs)
+
+
+def received(sqs, queue_url):
+    messages = []
+    while True:
+        batch = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10).get('Messages', [])
+        if not batch:
+            return messages
+        messages += [json.loads(m['Body'])['Message'] for m in batch]
+
+
+def wait_for_empty(outbox, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while outbox.pending() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return outbox.pending()
+
+
+def test_worker_delivers_in_batches(sns_topic, tmp_path):
+    sns, topic_arn, sqs, queue_url = sns_topic
+    client = CountingSNS(sns)
+    outbox = NotificationOutbox(client, topic_arn, path=str(tmp_path / "outbox.db"))
+    for i in range(25):
+        outbox.enqueue(f"order {i}", subject="New Pharmacy Order")
+    outbox.start()
+    assert wait_for_empty(outbox) == 0
+    outbox.close()
+
+    assert sorted(received(sqs, queue_url)) == sorted(f"order {i}" for i in range(25))
+    assert max(client.batch_sizes) <= 10 and len(client.batch_sizes) == 3
+
+
+def test_undelivered_messages_survive_restart(sns_topic, tmp_path):
+    sns, topic_arn, sqs, queue_url = sns_topic
+    path = str(tmp_path / "outbox.db")
+    # SNS is down: the message is retried with backoff and still queued at shutdown
+    down = NotificationOutbox(CountingSNS(sns, fail_calls=1000), topic_arn, path=path, base_delay=0.01)
+    down.enqueue("order while SNS is down")
+    down.start()
+    time.sleep(0.2)
+    down.close()
+    assert received(sqs, queue_url) == []
+
+    restarted = NotificationOutbox(CountingSNS(sns), topic_arn, path=path, base_delay=0.01, max_delay=0.05)
+    restarted.start()
+    assert wait_for_empty(restarted) == 0
+    restarted.close()
+    assert received(sqs, queue_url) == ["order while SNS is down"]
+
+
+def test_workers_sharing_an_outbox_publish_each_message_once(sns_topic, tmp_path):
+    sns, topic_arn, sqs, queue_url = sns_topic
+    path = str(tmp_path / "outbox.db")
+    workers = [NotificationOutbox(CountingSNS(sns), topic_arn, path=path) for _ in range(3)]
+    for i in range(40):
+        workers[i % 3].enqueue(f"order {i}")
+    for worker in workers:
+        worker.start()
+    assert wait_for_empty(workers[0]) == 0
+    for worker in workers:
+        worker.close()
+
+    assert sorted(received(sqs, queue_url)) == sorted(f"order {i}" for i in range(40))
+    assert sum(sum(worker.sns.batch_sizes) for worker in workers) == 40
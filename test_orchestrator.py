@@ -0,0 +1,97 @@
+import os
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+import orchestrator
+import tracing
+
+
+class BarrierBackend:
+    """Each lookup waits for the other one, so the graph only finishes if they run at the same time."""
+
+    def __init__(self, inventory, predictions, fail_predictions=False):
+        self.barrier = threading.Barrier(2, timeout=5)
+        self.inventory = inventory
+        self.predictions = predictions
+        self.fail_predictions = fail_predictions
+
+    def get_inventory(self, product_id):
+        self.barrier.wait()
+        return self.inventory
+
+    def get_predictions(self, patient_id):
+        self.barrier.wait()
+        if self.fail_predictions:
+            raise RuntimeError("predictions unavailable")
+        return self.predictions
+
+    def execute_order(self, patient_id, product_id, quantity):
+        return {"status": "success"}
+
+
+def run(monkeypatch, backend, product="Panthenol Spray"):
+    monkeypatch.setattr(orchestrator, "llm_extract",
+                        lambda raw, patient, shortlist: ({"patient_id": "PAT001", "product_id": product, "quantity": 1}, False))
+    return orchestrator.app.invoke(orchestrator.initial_state(f"PAT001 needs {product}"),
+                                   config={"configurable": {"backend": backend}})
+
+
+def test_lookups_run_concurrently(monkeypatch):
+    backend = BarrierBackend({"prescription_required": "Yes", "stock_level": 5},
+                             [{"product_name": "Panthenol Spray"}])
+    tracing.REGISTRY.reset()
+    state = run(monkeypatch, backend)
+    assert state['status'] == "COMPLETED"
+    assert state['is_rx_required'] is True
+    spans = tracing.REGISTRY.snapshot()
+    assert ("safety", "safety_cleared") in spans and ("action", "completed") in spans
+    assert ("inventory_lookup", "ok") in spans and ("predictions_lookup", "ok") in spans
+
+
+def test_rx_item_without_history_is_flagged(monkeypatch):
+    state = run(monkeypatch, BarrierBackend({"prescription_required": "Yes", "stock_level": 5}, []))
+    assert state['status'] == "PRESCRIPTION_MISSING"
+
+
+def test_predictions_failure_only_matters_for_rx_items(monkeypatch):
+    otc = run(monkeypatch, BarrierBackend({"prescription_required": "No", "stock_level": 5}, [], fail_predictions=True))
+    assert otc['status'] == "COMPLETED"
+
+    rx = run(monkeypatch, BarrierBackend({"prescription_required": "Yes", "stock_level": 5}, [], fail_predictions=True))
+    assert rx['status'] == "ERROR"
+    assert "predictions unavailable" in rx['cot_logic'][-1]
+
+
+def test_intake_counters_are_thread_safe(monkeypatch):
+    monkeypatch.setattr(orchestrator, "INTAKE_TIERS", {tier: {"hits": 0, "latency_s": 0.0} for tier in orchestrator.INTAKE_TIERS})
+
+    def record():
+        for _ in range(2_000):
+            orchestrator.record_intake("rules", 0.0)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert orchestrator.intake_stats()["rules"]["hits"] == 16_000
+
+
+def test_intake_is_exported_as_a_span(monkeypatch):
+    exported = []
+
+    @contextmanager
+    def start_as_current_span(name):
+        attributes = {}
+        yield SimpleNamespace(set_attribute=attributes.__setitem__)
+        exported.append((name, attributes.get("status")))
+
+    monkeypatch.setattr(tracing, "_tracer", SimpleNamespace(start_as_current_span=start_as_current_span))
+    tracing.REGISTRY.reset()
+    run(monkeypatch, BarrierBackend({"prescription_required": "No", "stock_level": 5}, []))
+    assert ("intake", "llm") in exported
+    assert ("intake", "llm") in tracing.REGISTRY.snapshot()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+from fastapi.testclient import TestClient
+
+import order_batch
+import orchestrator
+
+
+class FakeBackend:
+    def __init__(self):
+        self.lookups = []
+        self.orders = []
+        self._lock = threading.Lock()
+
+    def get_inventory(self, product_id):
+        with self._lock:
+            self.lookups.append(product_id)
+        return {"prescription_required": "No", "stock_level": 100}
+
+    def get_predictions(self, patient_id):
+        return []
+
+    def execute_order(self, patient_id, product_id, quantity):
+        with self._lock:
+            self.orders.append((patient_id, product_id, quantity))
+        return {"status": "success"}
+
+
+class SlowLLM:
+    """Extracts 'PATnnn ... <product>' and records how many extractions overlap."""
+
+    def __init__(self, products):
+        self.products = products
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, raw_input, detected_patient, shortlist):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        patient = raw_input.split()[0]
+        return {"patient_id": patient, "product_id": self.products[int(patient[3:]) % len(self.products)], "quantity": 1}, False
+
+
+def requests_for(n):
+    return [f"PAT{i:03d} needs their usual refill" for i in range(n)]
+
+
+def test_run_batch_keeps_input_order_bounds_concurrency_and_shares_lookups(monkeypatch):
+    llm = SlowLLM(["Product A", "Product B"])
+    monkeypatch.setattr(orchestrator, "llm_extract", llm)
+    backend = FakeBackend()
+
+    results = order_batch.run_batch(requests_for(12), concurrency=3, backend=backend)
+
+    assert [r['patient_id'] for r in results] == [f"PAT{i:03d}" for i in range(12)]
+    assert [r['product_id'] for r in results] == ["Product A", "Product B"] * 6
+    assert all(r['status'] == "COMPLETED" for r in results)
+    assert 1 < llm.peak <= 3
+    # One inventory lookup per product for the whole batch; every order still executes
+    assert sorted(backend.lookups) == ["Product A", "Product B"]
+    assert len(backend.orders) == 12
+
+
+def test_stream_batch_yields_every_index(monkeypatch):
+    monkeypatch.setattr(orchestrator, "llm_extract", SlowLLM(["Product A"]))
+
+    async def collect():
+        return [index async for index, state in order_batch.stream_batch(requests_for(5), 2, backend=FakeBackend())]
+
+    assert sorted(asyncio.run(collect())) == list(range(5))
+
+
+def test_batch_endpoint_streams_ndjson_and_enforces_limit(monkeypatch):
+    import server
+
+    backend = FakeBackend()
+    monkeypatch.setattr(orchestrator, "llm_extract", SlowLLM(["Product A"]))
+    monkeypatch.setattr(server, "local_backend", lambda: backend)
+    monkeypatch.setattr(order_batch, "BATCH_MAX", 4)
+    client = TestClient(server.app)
+
+    response = client.post("/agent/order/batch", json={"requests": requests_for(4), "concurrency": 2})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert {line["status"] for line in lines} == {"COMPLETED"}
+
+    assert client.post("/agent/order/batch", json={"requests": requests_for(5)}).status_code == 413
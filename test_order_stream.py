@@ -0,0 +1,63 @@
+import asyncio
+import json
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+
+import orchestrator
+import order_stream
+
+
+class FakeBackend:
+    def __init__(self, stock=10):
+        self.stock = stock
+        self.orders = []
+
+    def get_inventory(self, product_id):
+        return {"prescription_required": "No", "stock_level": self.stock}
+
+    def get_predictions(self, patient_id):
+        return []
+
+    def execute_order(self, patient_id, product_id, quantity):
+        self.orders.append((patient_id, product_id, quantity))
+        return {"status": "success"}
+
+
+def stub_llm(monkeypatch):
+    monkeypatch.setattr(orchestrator, "llm_extract",
+                        lambda raw, patient, shortlist: ({"patient_id": "PAT001", "product_id": "Panthenol Spray", "quantity": 2}, False))
+
+
+def test_events_follow_the_graph(monkeypatch):
+    stub_llm(monkeypatch)
+    backend = FakeBackend()
+    events = list(order_stream.iter_events("PAT001 needs 2 Panthenol Spray", backend=backend))
+
+    nodes = [e.get("node", e["event"]) for e in events]
+    assert nodes[0] == "intake" and set(nodes[1:3]) == {"inventory_lookup", "predictions_lookup"}
+    assert nodes[3:] == ["safety", "action", "done"]
+    assert events[0]["product_id"] == "Panthenol Spray" and events[0]["status"] == "STARTING"
+    assert events[3]["status"] == "SAFETY_CLEARED"
+    # Node events carry only their own entries; "done" has all of them
+    assert sum((e["cot_logic"] for e in events[:-1]), []) == events[-1]["cot_logic"]
+    assert events[-1]["status"] == "COMPLETED"
+    assert backend.orders == [("PAT001", "Panthenol Spray", 2)]
+
+
+def test_async_stream_stops_after_safety(monkeypatch):
+    stub_llm(monkeypatch)
+
+    async def collect():
+        return [e async for e in order_stream.stream_events("PAT001 needs 2 Panthenol Spray", backend=FakeBackend(stock=1))]
+
+    events = asyncio.run(collect())
+    assert [e.get("node", e["event"]) for e in events][3:] == ["safety", "done"]
+    assert events[-1]["status"] == "OUT_OF_STOCK"
+
+
+def test_sse_format():
+    frame = order_stream.sse({"event": "node", "node": "intake", "cot_logic": []})
+    assert frame.startswith("event: node\ndata: ") and frame.endswith("\n\n")
+    assert json.loads(frame.split("data: ", 1)[1])["node"] == "intake"
@@ -0,0 +1,55 @@
+import pytest
+
+from benchmarks.moto_aws import create_table
+from migrate_patient_layout import relayout
+from patient_store import PatientRepository, patient_items
+
+# With ~250 bytes per order this is past DynamoDB's 400 KB limit for a single item
+HEAVY_ORDERS = 2_000
+
+
+@pytest.fixture
+def tables(dynamodb):
+    legacy = create_table(dynamodb, 'PatientState', 'patient_id')
+    records = create_table(dynamodb, 'PatientRecords', 'patient_id', 'sk')
+    orders = [{'product_name': 'NORSAN Omega-3 Total', 'purchase_date': f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 00:00:00",
+               'quantity': 1, 'dosage_frequency': 'Once daily'} for i in range(HEAVY_ORDERS // 20)]
+    predictions = [{'product_name': 'NORSAN Omega-3 Total', 'predicted_date': '2024-04-12', 'action': 'Alert in 4 days'}]
+    for i in range(30):
+        legacy.put_item(Item={'patient_id': f"PAT{i:03d}", 'orders': orders, 'refill_predictions': predictions if i % 2 else []})
+    return legacy, records
+
+
+def test_relayout_preserves_predictions_and_orders(tables, tmp_path):
+    legacy, records = tables
+    assert relayout(workers=3, segments=4, checkpoint_dir=str(tmp_path)) == 30
+
+    repo = PatientRepository(records)
+    assert repo.get_predictions('PAT001') == legacy.get_item(Key={'patient_id': 'PAT001'})['Item']['refill_predictions']
+    # Migrated patients without predictions are known, not missing
+    assert repo.get_predictions('PAT000') == []
+    assert repo.get_predictions('PAT999') is None
+
+    orders = repo.get_orders('PAT001')
+    assert len(orders) == HEAVY_ORDERS // 20
+    assert [o['purchase_date'] for o in orders] == sorted((o['purchase_date'] for o in orders), reverse=True)
+    assert repo.get_summary('PAT001')['order_count'] == HEAVY_ORDERS // 20
+    assert not (tmp_path / "PatientState-to-PatientRecords.json").exists()
+
+
+def test_heavy_patient_and_legacy_fallback(tables):
+    legacy, records = tables
+    heavy = {'patient_id': 'PATBIG', 'orders': [
+        {'product_name': 'Mucosolvan Kinder Hustensaft 15 mg/5 ml', 'purchase_date': f"2023-{1 + i % 12:02d}-{1 + i % 28:02d} 00:00:00",
+         'quantity': 1, 'dosage_frequency': 'Three times daily', 'notes': 'x' * 200} for i in range(HEAVY_ORDERS)]}
+    # Far beyond what fits in one item, but fine as one item per order
+    with records.batch_writer() as batch:
+        for item in patient_items(heavy):
+            batch.put_item(Item=item)
+
+    repo = PatientRepository(records, legacy_table=legacy)
+    assert len(repo.get_orders('PATBIG', limit=25)) == 25
+    assert repo.get_predictions('PATBIG') == []
+    # Not migrated yet: served from the single-item table
+    assert repo.get_predictions('PAT001')[0]['action'] == 'Alert in 4 days'
+    assert len(repo.get_orders('PAT003', limit=5)) == 5
@@ -0,0 +1,29 @@
+from product_index import ProductIndex, normalize_name
+
+
+def test_normalize_name_strips_marks_dosages_and_variants():
+    assert normalize_name("Mucosolvan® Hustensaft 15 mg/5 ml") == "mucosolvan hustensaft"
+    assert normalize_name("Vitamin D3 2000 I.E., 60 Kapseln") == "vitamin d3"
+    assert normalize_name("Panthenol Spray, 46,3 mg/g Schaum") == "panthenol spray"
+    # A name that is only a dosage keeps its cleaned original
+    assert normalize_name("500 mg") == "500 mg"
+
+
+def test_match_ranks_best_first_and_applies_cutoff():
+    names = ["Paracetamol 500 mg Tabletten", "Paracodin Tropfen", "Ibuprofen 400 mg", "NORSAN Omega-3 Total"]
+    index = ProductIndex(names)
+
+    ranked = index.match("paracetamol", k=3)
+    assert ranked[0] == ("Paracetamol 500 mg Tabletten", 100.0)
+    assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+    assert index.match("omega 3 total")[0][0] == "NORSAN Omega-3 Total"
+
+    assert index.match("paracetamol", k=3, score_cutoff=95) == [("Paracetamol 500 mg Tabletten", 100.0)]
+    assert index.match("xylometazolin", score_cutoff=90) == []
+
+
+def test_shortlist_finds_names_in_a_large_catalogue():
+    names = [f"Filler Product {i} Tabletten" for i in range(2_000)] + ["Mucosolvan® Hustensaft 15 mg/5 ml"]
+    index = ProductIndex(names, shortlist=16)
+    assert index.match("I need Mucosolvan Hustensaft")[0][0] == "Mucosolvan® Hustensaft 15 mg/5 ml"
+    assert index.match("qqqq zzzz") == []
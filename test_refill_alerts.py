@@ -0,0 +1,55 @@
+import pytest
+
+import migrate_data
+from refill_alerts import fetch_page, iter_alerts
+
+ACTIONS = ['OVERDUE - Trigger Outreach', 'Alert in 2 days', 'Alert in 5 days']
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrate_data, 'DB_PATH', str(tmp_path / "pharmacy.db"))
+    conn = migrate_data.init_db()
+    conn.executemany(
+        "INSERT INTO refill_predictions (patient_id, product_name, predicted_date, action) VALUES (?, ?, ?, ?)",
+        [(f"PAT{i % 50:03d}", f"Product {i // 50}", f"2024-03-{1 + i % 28:02d}", ACTIONS[i % 3]) for i in range(1_000)],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def all_pages(conn, **kwargs):
+    rows, cursor = [], None
+    while True:
+        page = fetch_page(conn, cursor, **kwargs)
+        rows += page['items']
+        cursor = page['next_cursor']
+        if cursor is None:
+            return rows
+
+
+def test_pages_cover_every_row_once(conn):
+    rows = all_pages(conn, limit=64)
+    assert [row['id'] for row in rows] == list(range(1, 1_001))
+    assert set(rows[0]) == {'id', 'Patient ID', 'Product Name', 'Predicted Refill Date', 'Action'}
+    assert fetch_page(conn, limit=1_000)['next_cursor'] is None
+
+
+def test_filters_match_between_pages_and_stream(conn):
+    filters = {'action_type': 'alert', 'date_from': '2024-03-05', 'date_to': '2024-03-20', 'patient_id': 'PAT007'}
+    rows = all_pages(conn, limit=3, **filters)
+    assert rows
+    assert all(r['Action'].startswith('Alert in') and '2024-03-05' <= r['Predicted Refill Date'] <= '2024-03-20'
+               and r['Patient ID'] == 'PAT007' for r in rows)
+    assert list(iter_alerts(conn, batch_size=2, **filters)) == rows
+    assert {r['Action'] for r in all_pages(conn, action_type='overdue')} == {'OVERDUE - Trigger Outreach'}
+
+
+def test_filtered_queries_use_indexes(conn):
+    plan = " ".join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM refill_predictions WHERE action GLOB 'Alert in *' ORDER BY id"))
+    assert "idx_refill_predictions_action" in plan
+    plan = " ".join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM refill_predictions WHERE patient_id = 'PAT001' ORDER BY id"))
+    assert "idx_refill_predictions_unique_key" in plan
@@ -0,0 +1,56 @@
+import pytest
+
+import tracing
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = tracing.Registry(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.01, 0.05, 2.0):
+        registry.observe("groq", "ok", seconds)
+    text = registry.render()
+    assert 'pharmacy_span_duration_seconds_bucket{span="groq",status="ok",le="0.01"} 2' in text
+    assert 'pharmacy_span_duration_seconds_bucket{span="groq",status="ok",le="0.1"} 3' in text
+    assert 'pharmacy_span_duration_seconds_bucket{span="groq",status="ok",le="+Inf"} 4' in text
+    assert 'pharmacy_span_duration_seconds_count{span="groq",status="ok"} 4' in text
+
+
+def test_span_records_outcome_and_errors():
+    tracing.REGISTRY.reset()
+
+    @tracing.traced("lookup", outcome=lambda result: "not_found" if result is None else None)
+    def lookup(value):
+        return value
+
+    lookup(None)
+    lookup(1)
+    with pytest.raises(ValueError):
+        with tracing.span("dynamodb.get_item"):
+            raise ValueError("throttled")
+
+    class HTTPError(Exception):
+        status_code = 404
+
+    with pytest.raises(HTTPError):
+        with tracing.span("storage.place_order"):
+            raise HTTPError()
+
+    tracing.record_cache("inventory", True)
+    tracing.record_cache("inventory", False)
+    snapshot = tracing.REGISTRY.snapshot()
+    assert snapshot[("lookup", "not_found")]["count"] == 1
+    assert snapshot[("lookup", "ok")]["count"] == 1
+    assert snapshot[("dynamodb.get_item", "error")]["count"] == 1
+    assert snapshot[("storage.place_order", "http_404")]["count"] == 1
+    assert snapshot[("cache", "inventory", "hit")] == 1 and snapshot[("cache", "inventory", "miss")] == 1
+
+
+def test_metrics_endpoint():
+    from fastapi.testclient import TestClient
+    import server
+
+    tracing.REGISTRY.reset()
+    tracing.REGISTRY.observe("safety", "safety_cleared", 0.02)
+    response = TestClient(server.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'pharmacy_span_duration_seconds_count{span="safety",status="safety_cleared"} 1' in response.text
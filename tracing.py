@@ -0,0 +1,167 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Tuple
+
+# Spans for the agent pipeline and the storage layer. Every span is timed into
+# an in-process histogram keyed by (span, status) and rendered in Prometheus
+# text format by render_metrics() (served on GET /metrics). Recording is a
+# perf_counter pair, one bisect and one locked increment, so it stays on in
+# production. Set TRACING_EXPORTER to also send each span to OpenTelemetry:
+#   otel      the globally configured tracer provider (e.g. opentelemetry-instrument)
+#   langfuse  Langfuse's tracer provider, configured with the usual LANGFUSE_* variables
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "").lower()
+# Seconds; covers fuzzy matching (sub-ms) up to slow Groq calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # (span, status) -> [per-bucket counts..., +Inf count, sum]
+        self._spans: Dict[Tuple[str, str], list] = {}
+        self._cache: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, name: str, status: str, seconds: float):
+        index = bisect_left(self.buckets, seconds)
+        key = (name, status)
+        with self._lock:
+            series = self._spans.get(key)
+            if series is None:
+                series = self._spans[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += seconds
+
+    def count_cache(self, name: str, hit: bool):
+        key = (name, "hit" if hit else "miss")
+        with self._lock:
+            self._cache[key] = self._cache.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        """{(span, status): {"count", "sum"}} plus {("cache", name, result): count}, for tests and benchmarks."""
+        with self._lock:
+            spans = {key: {"count": sum(series[:-1]), "sum": series[-1]} for key, series in self._spans.items()}
+            spans.update({("cache",) + key: count for key, count in self._cache.items()})
+        return spans
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._cache.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            spans = {key: list(series) for key, series in self._spans.items()}
+            cache = dict(self._cache)
+        lines = [
+            "# HELP pharmacy_span_duration_seconds Duration of agent pipeline and storage steps.",
+            "# TYPE pharmacy_span_duration_seconds histogram",
+        ]
+        for (name, status), series in sorted(spans.items()):
+            labels = f'span="{name}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'pharmacy_span_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'pharmacy_span_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"pharmacy_span_duration_seconds_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"pharmacy_span_duration_seconds_count{{{labels}}} {cumulative}")
+        lines += [
+            "# HELP pharmacy_cache_requests_total Cache lookups by result.",
+            "# TYPE pharmacy_cache_requests_total counter",
+        ]
+        for (name, result), count in sorted(cache.items()):
+            lines.append(f'pharmacy_cache_requests_total{{cache="{name}",result="{result}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _load_tracer():
+    if TRACING_EXPORTER not in ("otel", "langfuse"):
+        return None
+    try:
+        from opentelemetry import trace
+        if TRACING_EXPORTER == "langfuse":
+            from langfuse import get_client
+            # Registers Langfuse's span processor on the OpenTelemetry tracer provider
+            get_client()
+        return trace.get_tracer("sovereign-rx")
+    except Exception as e:
+        print(f"Tracing exporter '{TRACING_EXPORTER}' unavailable ({e}); keeping local metrics only.")
+        return None
+
+
+_tracer = _load_tracer()
+
+
+def _error_status(e: Exception) -> str:
+    # HTTPException / BackendError carry the HTTP status the caller saw
+    code = getattr(e, "status_code", None)
+    return f"http_{code}" if code else "error"
+
+
+class span:
+    """Time a block; set .status to record an outcome other than ok (exceptions record error / http_<code>)."""
+
+    __slots__ = ("name", "status", "attributes", "_start", "_exported", "_otel_span")
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.status = "ok"
+        self.attributes = attributes
+        self._exported = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def cache(self, cache_name: str, hit: bool):
+        record_cache(cache_name, hit)
+        self.attributes[f"cache.{cache_name}"] = "hit" if hit else "miss"
+
+    def __enter__(self):
+        if _tracer is not None:
+            self._exported = _tracer.start_as_current_span(self.name)
+            self._otel_span = self._exported.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        if exc is not None and isinstance(exc, Exception):
+            self.status = _error_status(exc)
+        REGISTRY.observe(self.name, self.status, elapsed)
+        if self._exported is not None:
+            for key, value in self.attributes.items():
+                self._otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+            self._otel_span.set_attribute("status", self.status)
+            self._exported.__exit__(exc_type, exc, tb)
+        return False
+
+
+def traced(name: str, outcome: Optional[Callable] = None):
+    """Decorator form of span(); outcome(result) may return the status to record."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name) as current:
+                result = fn(*args, **kwargs)
+                if outcome is not None:
+                    current.status = outcome(result) or current.status
+                return result
+        return wrapper
+    return decorate
+
+
+def record_cache(name: str, hit: bool):
+    REGISTRY.count_cache(name, hit)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()